@@ -0,0 +1,50 @@
+"""add_license_usage_rollups
+
+Revision ID: 0a6e7f8a9b0c
+Revises: f25d6e7f8a9b
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6e7f8a9b0c'
+down_revision: Union[str, Sequence[str], None] = 'f25d6e7f8a9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('license_usage_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('license_id', sa.Integer(), nullable=False, comment='授权ID'),
+    sa.Column('granularity', sa.String(length=5), nullable=False, comment='粒度: day / month'),
+    sa.Column('period', sa.String(length=10), nullable=False, comment='统计周期(UTC): YYYY-MM-DD / YYYY-MM'),
+    sa.Column('sample_count', sa.Integer(), nullable=False, comment='使用日志条数'),
+    sa.Column('max_active_users', sa.Integer(), nullable=False, comment='活跃用户数峰值'),
+    sa.Column('sum_active_users', sa.BigInteger(), nullable=False, comment='活跃用户数累计'),
+    sa.Column('max_active_coaches', sa.Integer(), nullable=False, comment='活跃教练数峰值'),
+    sa.Column('sum_active_coaches', sa.BigInteger(), nullable=False, comment='活跃教练数累计'),
+    sa.Column('max_active_students', sa.Integer(), nullable=False, comment='活跃学员数峰值'),
+    sa.Column('sum_active_students', sa.BigInteger(), nullable=False, comment='活跃学员数累计'),
+    sa.Column('max_bookings', sa.Integer(), nullable=False, comment='预约次数峰值'),
+    sa.Column('sum_bookings', sa.BigInteger(), nullable=False, comment='预约次数累计'),
+    sa.Column('max_competitions', sa.Integer(), nullable=False, comment='比赛次数峰值'),
+    sa.Column('sum_competitions', sa.BigInteger(), nullable=False, comment='比赛次数累计'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='更新时间'),
+    sa.ForeignKeyConstraint(['license_id'], ['licenses.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('license_id', 'granularity', 'period', name='uq_license_usage_rollups_key')
+    )
+    op.create_index(op.f('ix_license_usage_rollups_id'), 'license_usage_rollups', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_license_usage_rollups_id'), table_name='license_usage_rollups')
+    op.drop_table('license_usage_rollups')
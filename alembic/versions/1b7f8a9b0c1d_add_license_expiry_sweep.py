@@ -0,0 +1,32 @@
+"""add_license_expiry_sweep
+
+Revision ID: 1b7f8a9b0c1d
+Revises: 0a6e7f8a9b0c
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7f8a9b0c1d'
+down_revision: Union[str, Sequence[str], None] = '0a6e7f8a9b0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('licenses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('renewal_reminded_at', sa.DateTime(timezone=True), nullable=True, comment='续费提醒时间(续费或修改结束日期后清空)'))
+        batch_op.create_index('ix_licenses_status_end_date', ['status', 'end_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('licenses', schema=None) as batch_op:
+        batch_op.drop_index('ix_licenses_status_end_date')
+        batch_op.drop_column('renewal_reminded_at')
@@ -0,0 +1,41 @@
+"""add_background_jobs_and_booking_indexes
+
+Revision ID: 3c1d2e4f5a6b
+Revises: 88242fafa1f3
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d2e4f5a6b'
+down_revision: Union[str, Sequence[str], None] = '88242fafa1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('background_jobs',
+    sa.Column('name', sa.String(length=50), nullable=False, comment='任务名称'),
+    sa.Column('owner', sa.String(length=100), nullable=True, comment='当前持有租约的工作进程'),
+    sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True, comment='租约过期时间'),
+    sa.Column('cursor', sa.Text(), nullable=True, comment='增量处理游标'),
+    sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=True, comment='上次运行时间'),
+    sa.Column('last_result', sa.Text(), nullable=True, comment='上次运行结果'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='更新时间'),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('ix_bookings_status_start_time', 'bookings', ['status', 'start_time'], unique=False)
+    op.create_index('ix_bookings_status_end_time', 'bookings', ['status', 'end_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_status_end_time', table_name='bookings')
+    op.drop_index('ix_bookings_status_start_time', table_name='bookings')
+    op.drop_table('background_jobs')
@@ -0,0 +1,48 @@
+"""add_booking_daily_stats
+
+Revision ID: 4d5e6f7a8b9c
+Revises: 3c1d2e4f5a6b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d5e6f7a8b9c'
+down_revision: Union[str, Sequence[str], None] = '3c1d2e4f5a6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('booking_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campus_id', sa.Integer(), nullable=False, comment='校区ID'),
+    sa.Column('coach_id', sa.Integer(), nullable=False, comment='教练ID'),
+    sa.Column('day', sa.Date(), nullable=False, comment='日期(UTC，按开始时间)'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='预约状态'),
+    sa.Column('booking_count', sa.Integer(), nullable=True, comment='预约数'),
+    sa.Column('total_hours', sa.Numeric(precision=10, scale=1), nullable=True, comment='预约总时长(小时)'),
+    sa.Column('total_revenue', sa.Numeric(precision=12, scale=2), nullable=True, comment='预约总金额'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='更新时间'),
+    sa.ForeignKeyConstraint(['campus_id'], ['campuses.id'], ),
+    sa.ForeignKeyConstraint(['coach_id'], ['coaches.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('campus_id', 'coach_id', 'day', 'status', name='uq_booking_daily_stats_key')
+    )
+    op.create_index(op.f('ix_booking_daily_stats_id'), 'booking_daily_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_booking_daily_stats_day'), 'booking_daily_stats', ['day'], unique=False)
+    op.create_index('ix_bookings_coach_start_time', 'bookings', ['coach_id', 'start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_coach_start_time', table_name='bookings')
+    op.drop_index(op.f('ix_booking_daily_stats_day'), table_name='booking_daily_stats')
+    op.drop_index(op.f('ix_booking_daily_stats_id'), table_name='booking_daily_stats')
+    op.drop_table('booking_daily_stats')
@@ -0,0 +1,30 @@
+"""add_payment_summary_indexes
+
+Revision ID: 5e6f7a8b9c0d
+Revises: 4d5e6f7a8b9c
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e6f7a8b9c0d'
+down_revision: Union[str, Sequence[str], None] = '4d5e6f7a8b9c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_payments_user_type_status', 'payments', ['user_id', 'type', 'status'], unique=False)
+    op.create_index('ix_payments_created_at', 'payments', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payments_created_at', table_name='payments')
+    op.drop_index('ix_payments_user_type_status', table_name='payments')
@@ -0,0 +1,46 @@
+"""add_idempotency_keys
+
+Revision ID: 6f7a8b9c0d1e
+Revises: 5e6f7a8b9c0d
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f7a8b9c0d1e'
+down_revision: Union[str, Sequence[str], None] = '5e6f7a8b9c0d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('idempotency_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False, comment='请求用户ID'),
+    sa.Column('key', sa.String(length=100), nullable=False, comment='客户端提供的幂等键'),
+    sa.Column('endpoint', sa.String(length=100), nullable=False, comment='接口标识'),
+    sa.Column('request_hash', sa.String(length=64), nullable=False, comment='请求内容哈希'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='状态: in_progress/completed'),
+    sa.Column('response_code', sa.Integer(), nullable=True, comment='响应状态码'),
+    sa.Column('response_body', sa.Text(), nullable=True, comment='响应内容(JSON)'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='创建时间'),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False, comment='过期时间'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key')
+    )
+    op.create_index(op.f('ix_idempotency_keys_id'), 'idempotency_keys', ['id'], unique=False)
+    op.create_index(op.f('ix_idempotency_keys_expires_at'), 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_idempotency_keys_expires_at'), table_name='idempotency_keys')
+    op.drop_index(op.f('ix_idempotency_keys_id'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,91 @@
+"""add_ledger_tables
+
+Revision ID: 7a8b9c0d1e2f
+Revises: 6f7a8b9c0d1e
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a8b9c0d1e2f'
+down_revision: Union[str, Sequence[str], None] = '6f7a8b9c0d1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ledger_accounts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False, comment='账户编码，如 user_wallet:12'),
+    sa.Column('account_type', sa.String(length=20), nullable=False, comment='账户类型'),
+    sa.Column('owner_id', sa.Integer(), nullable=True, comment='所属用户ID/校区ID'),
+    sa.Column('normal_side', sa.String(length=10), nullable=False, comment='余额方向: debit/credit'),
+    sa.Column('balance', sa.Numeric(precision=14, scale=2), nullable=False, comment='当前余额'),
+    sa.Column('entry_count', sa.Integer(), nullable=False, comment='已记账分录行数'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='创建时间'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    op.create_index(op.f('ix_ledger_accounts_id'), 'ledger_accounts', ['id'], unique=False)
+    op.create_table('journal_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payment_id', sa.Integer(), nullable=True, comment='来源支付记录ID'),
+    sa.Column('entry_type', sa.String(length=20), nullable=False, comment='分录类型(对应支付类型)'),
+    sa.Column('description', sa.Text(), nullable=True, comment='摘要'),
+    sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False, comment='业务发生时间'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='记账时间'),
+    sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('payment_id')
+    )
+    op.create_index(op.f('ix_journal_entries_id'), 'journal_entries', ['id'], unique=False)
+    op.create_table('journal_lines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False, comment='分录ID'),
+    sa.Column('account_id', sa.Integer(), nullable=False, comment='账户ID'),
+    sa.Column('sequence', sa.Integer(), nullable=False, comment='账户内序号(从1开始)'),
+    sa.Column('debit', sa.Numeric(precision=14, scale=2), nullable=False, comment='借方金额'),
+    sa.Column('credit', sa.Numeric(precision=14, scale=2), nullable=False, comment='贷方金额'),
+    sa.Column('posted_at', sa.DateTime(timezone=True), nullable=False, comment='业务发生时间'),
+    sa.ForeignKeyConstraint(['account_id'], ['ledger_accounts.id'], ),
+    sa.ForeignKeyConstraint(['entry_id'], ['journal_entries.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('account_id', 'sequence', name='uq_journal_lines_account_sequence')
+    )
+    op.create_index(op.f('ix_journal_lines_id'), 'journal_lines', ['id'], unique=False)
+    op.create_index(op.f('ix_journal_lines_entry_id'), 'journal_lines', ['entry_id'], unique=False)
+    op.create_table('ledger_balance_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False, comment='账户ID'),
+    sa.Column('sequence', sa.Integer(), nullable=False, comment='快照对应的分录行序号'),
+    sa.Column('balance', sa.Numeric(precision=14, scale=2), nullable=False, comment='该序号之后的余额'),
+    sa.Column('as_of', sa.DateTime(timezone=True), nullable=False, comment='快照对应的业务时间'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='创建时间'),
+    sa.ForeignKeyConstraint(['account_id'], ['ledger_accounts.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('account_id', 'sequence', name='uq_ledger_snapshots_account_sequence')
+    )
+    op.create_index(op.f('ix_ledger_balance_snapshots_id'), 'ledger_balance_snapshots', ['id'], unique=False)
+    op.create_index('ix_ledger_snapshots_account_as_of', 'ledger_balance_snapshots', ['account_id', 'as_of'], unique=False)
+
+    # 已有的成功支付记录不在迁移中补记（避免依赖应用代码），升级后运行 scripts/backfill_ledger.py
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ledger_snapshots_account_as_of', table_name='ledger_balance_snapshots')
+    op.drop_index(op.f('ix_ledger_balance_snapshots_id'), table_name='ledger_balance_snapshots')
+    op.drop_table('ledger_balance_snapshots')
+    op.drop_index(op.f('ix_journal_lines_entry_id'), table_name='journal_lines')
+    op.drop_index(op.f('ix_journal_lines_id'), table_name='journal_lines')
+    op.drop_table('journal_lines')
+    op.drop_index(op.f('ix_journal_entries_id'), table_name='journal_entries')
+    op.drop_table('journal_entries')
+    op.drop_index(op.f('ix_ledger_accounts_id'), table_name='ledger_accounts')
+    op.drop_table('ledger_accounts')
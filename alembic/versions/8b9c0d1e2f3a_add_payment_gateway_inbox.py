@@ -0,0 +1,47 @@
+"""add_payment_gateway_inbox
+
+Revision ID: 8b9c0d1e2f3a
+Revises: 7a8b9c0d1e2f
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b9c0d1e2f3a'
+down_revision: Union[str, Sequence[str], None] = '7a8b9c0d1e2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payment_gateway_inbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('gateway', sa.String(length=20), nullable=False, comment='支付网关: wechat/alipay'),
+    sa.Column('notify_id', sa.String(length=64), nullable=False, comment='网关通知ID'),
+    sa.Column('payment_id', sa.Integer(), nullable=False, comment='支付记录ID'),
+    sa.Column('transaction_id', sa.String(length=100), nullable=True, comment='网关交易号'),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False, comment='网关通知金额'),
+    sa.Column('trade_status', sa.String(length=20), nullable=False, comment='网关交易状态: success/failed'),
+    sa.Column('payload', sa.Text(), nullable=True, comment='原始通知内容'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='处理状态'),
+    sa.Column('error', sa.Text(), nullable=True, comment='处理失败原因'),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='接收时间'),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True, comment='处理时间'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('gateway', 'notify_id', name='uq_payment_gateway_inbox_notify')
+    )
+    op.create_index(op.f('ix_payment_gateway_inbox_id'), 'payment_gateway_inbox', ['id'], unique=False)
+    op.create_index('ix_payment_gateway_inbox_status_id', 'payment_gateway_inbox', ['status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payment_gateway_inbox_status_id', table_name='payment_gateway_inbox')
+    op.drop_index(op.f('ix_payment_gateway_inbox_id'), table_name='payment_gateway_inbox')
+    op.drop_table('payment_gateway_inbox')
@@ -0,0 +1,28 @@
+"""add_competition_match_bracket_index
+
+Revision ID: ad0e1f2a3b4c
+Revises: 9c0d1e2f3a4b
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ad0e1f2a3b4c'
+down_revision: Union[str, Sequence[str], None] = '9c0d1e2f3a4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_competition_matches_bracket', 'competition_matches', ['competition_id', 'group_type', 'round_number', 'match_number'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_competition_matches_bracket', table_name='competition_matches')
@@ -0,0 +1,32 @@
+"""add_competition_match_stage
+
+Revision ID: be1f2a3b4c5d
+Revises: ad0e1f2a3b4c
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'be1f2a3b4c5d'
+down_revision: Union[str, Sequence[str], None] = 'ad0e1f2a3b4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('competition_matches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stage', sa.String(length=20), server_default='knockout', nullable=False, comment='赛段: group/knockout'))
+        batch_op.add_column(sa.Column('pool_number', sa.Integer(), nullable=True, comment='小组赛分组编号'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('competition_matches', schema=None) as batch_op:
+        batch_op.drop_column('pool_number')
+        batch_op.drop_column('stage')
@@ -0,0 +1,40 @@
+"""add_competition_confirmed_count
+
+Revision ID: cf2a3b4c5d6e
+Revises: be1f2a3b4c5d
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cf2a3b4c5d6e'
+down_revision: Union[str, Sequence[str], None] = 'be1f2a3b4c5d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('competitions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('confirmed_count', sa.Integer(), server_default='0', nullable=False, comment='已确认参赛人数'))
+    op.create_index('ix_competition_registrations_competition_confirmed', 'competition_registrations', ['competition_id', 'is_confirmed'], unique=False)
+
+    # 按现有报名记录回填已确认人数
+    op.execute(
+        "UPDATE competitions SET confirmed_count = ("
+        "SELECT COUNT(*) FROM competition_registrations "
+        "WHERE competition_registrations.competition_id = competitions.id "
+        "AND competition_registrations.is_confirmed = true)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_competition_registrations_competition_confirmed', table_name='competition_registrations')
+    with op.batch_alter_table('competitions', schema=None) as batch_op:
+        batch_op.drop_column('confirmed_count')
@@ -0,0 +1,45 @@
+"""add_competition_seat_reservation
+
+Revision ID: d03b4c5d6e7f
+Revises: cf2a3b4c5d6e
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd03b4c5d6e7f'
+down_revision: Union[str, Sequence[str], None] = 'cf2a3b4c5d6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('competitions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reserved_count', sa.Integer(), server_default='0', nullable=False, comment='已占用名额(含待确认，不含候补)'))
+
+    with op.batch_alter_table('competition_registrations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_waitlisted', sa.Boolean(), server_default=sa.false(), nullable=False, comment='是否候补(名额已满时报名)'))
+        batch_op.create_unique_constraint('uq_competition_registrations_student', ['competition_id', 'student_id'])
+
+    # 已有报名都占用名额
+    op.execute(
+        "UPDATE competitions SET reserved_count = ("
+        "SELECT COUNT(*) FROM competition_registrations "
+        "WHERE competition_registrations.competition_id = competitions.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('competition_registrations', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_competition_registrations_student', type_='unique')
+        batch_op.drop_column('is_waitlisted')
+
+    with op.batch_alter_table('competitions', schema=None) as batch_op:
+        batch_op.drop_column('reserved_count')
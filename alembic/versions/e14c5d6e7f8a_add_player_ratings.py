@@ -0,0 +1,51 @@
+"""add_player_ratings
+
+Revision ID: e14c5d6e7f8a
+Revises: d03b4c5d6e7f
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e14c5d6e7f8a'
+down_revision: Union[str, Sequence[str], None] = 'd03b4c5d6e7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('player_ratings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False, comment='学员ID'),
+    sa.Column('rating', sa.Float(), nullable=False, comment='等级分'),
+    sa.Column('matches_played', sa.Integer(), nullable=False, comment='计分场次'),
+    sa.Column('wins', sa.Integer(), nullable=False, comment='胜场'),
+    sa.Column('losses', sa.Integer(), nullable=False, comment='负场'),
+    sa.Column('last_group_type', sa.String(length=1), nullable=True, comment='最近一场比赛的组别'),
+    sa.Column('last_match_at', sa.DateTime(timezone=True), nullable=True, comment='最近一场比赛时间'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True, comment='更新时间'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('student_id')
+    )
+    op.create_index(op.f('ix_player_ratings_id'), 'player_ratings', ['id'], unique=False)
+    op.create_index('ix_player_ratings_rating', 'player_ratings', ['rating'], unique=False)
+
+    with op.batch_alter_table('competition_matches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rated_at', sa.DateTime(timezone=True), nullable=True, comment='计入等级分的时间(同时决定重算顺序)'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('competition_matches', schema=None) as batch_op:
+        batch_op.drop_column('rated_at')
+
+    op.drop_index('ix_player_ratings_rating', table_name='player_ratings')
+    op.drop_index(op.f('ix_player_ratings_id'), table_name='player_ratings')
+    op.drop_table('player_ratings')
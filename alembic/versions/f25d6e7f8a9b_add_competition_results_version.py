@@ -0,0 +1,30 @@
+"""add_competition_results_version
+
+Revision ID: f25d6e7f8a9b
+Revises: e14c5d6e7f8a
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f25d6e7f8a9b'
+down_revision: Union[str, Sequence[str], None] = 'e14c5d6e7f8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('competitions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('results_version', sa.Integer(), server_default='0', nullable=False, comment='对阵结果版本号(实时比分缓存依据)'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('competitions', schema=None) as batch_op:
+        batch_op.drop_column('results_version')
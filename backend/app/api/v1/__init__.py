@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from ...core.deps import require_feature
 from .auth import router as auth_router
 from .users import router as users_router
 from .campus import router as campus_router
@@ -16,7 +17,7 @@ from .comments import router as comments_router
 
 api_router = APIRouter()
 
-# 注册已存在的路由
+# 注册已存在的路由（比赛、评价相关路由按校区授权的功能开关限制访问）
 api_router.include_router(auth_router, prefix="/auth", tags=["认证"])
 api_router.include_router(users_router, prefix="/users", tags=["用户管理"])
 api_router.include_router(campus_router, prefix="/campus", tags=["校区管理"])
@@ -25,9 +26,12 @@ api_router.include_router(students_router, prefix="/students", tags=["学员管
 api_router.include_router(coach_students_router, prefix="/coach-students", tags=["教练学员关系"])
 api_router.include_router(bookings_router, prefix="/bookings", tags=["课程预约"])
 api_router.include_router(payments_router, prefix="/payments", tags=["支付管理"])
-api_router.include_router(evaluations_router, prefix="/evaluations", tags=["课后评价"])
+api_router.include_router(evaluations_router, prefix="/evaluations", tags=["课后评价"],
+                          dependencies=[Depends(require_feature("evaluations"))])
 api_router.include_router(system_logs_router, prefix="/system-logs", tags=["系统日志"])
-api_router.include_router(competitions_router, prefix="/competitions", tags=["比赛管理"])
+api_router.include_router(competitions_router, prefix="/competitions", tags=["比赛管理"],
+                          dependencies=[Depends(require_feature("competitions"))])
 api_router.include_router(notifications_router, prefix="/notifications", tags=["通知管理"])
 api_router.include_router(licenses_router, prefix="/licenses", tags=["软件授权"])
-api_router.include_router(comments_router, prefix="/comments", tags=["评论管理"])
+api_router.include_router(comments_router, prefix="/comments", tags=["评论管理"],
+                          dependencies=[Depends(require_feature("evaluations"))])
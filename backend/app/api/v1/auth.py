@@ -1,25 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
-from datetime import timedelta
 
 from ...db.database import get_db
-from ...schemas.user import UserLogin, Token, UserCreate, UserRegister, UserResponse, AdminRegister
+from ...schemas.user import UserLogin, Token, UserCreate, UserRegister, UserResponse, AdminRegister, RefreshTokenRequest
 from ...services.user_service import UserService
 from ...core.deps import get_current_user
-from ...core.security import create_access_token
-from ...core.config import settings
+from ...services.auth_token_service import AuthTokenService
 
 router = APIRouter()
 security = HTTPBearer()
 
 @router.post("/login", response_model=Token, summary="用户登录")
-def login(
+async def login(
     login_data: UserLogin,
     db: Session = Depends(get_db)
 ):
-    """用户登录"""
-    user = UserService.authenticate_user(db, login_data)
+    """用户登录（返回访问令牌和刷新令牌）
+
+    异步接口：密码校验期间不占用请求线程，数据库操作在线程池中执行。
+    """
+    user = await UserService.authenticate_user(db, login_data)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,17 +29,29 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.username,
-        expires_delta=access_token_expires
-    )
+    def issue() -> Token:
+        tokens = AuthTokenService.issue_tokens(db, user)
+        return Token(user=UserResponse.from_orm(user), **tokens)
     
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        user=UserResponse.from_orm(user)
-    )
+    return await run_in_threadpool(issue)
+
+@router.post("/refresh", response_model=Token, summary="刷新令牌")
+def refresh_token(
+    refresh_data: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    """用刷新令牌换取新的访问令牌和刷新令牌（旧刷新令牌随即失效，重复使用将导致该登录会话被吊销）"""
+    user, tokens = AuthTokenService.refresh(db, refresh_data.refresh_token)
+    return Token(user=UserResponse.from_orm(user), **tokens)
+
+@router.post("/logout", summary="退出登录")
+def logout(
+    refresh_data: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    """吊销刷新令牌（访问令牌在过期前仍然有效）"""
+    AuthTokenService.revoke(db, refresh_data.refresh_token)
+    return {"message": "已退出登录"}
 
 @router.post("/register/student", response_model=UserResponse, summary="学员注册")
 def register_student(
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date
 
 from ...db.database import get_db
-from ...core.deps import get_current_user
+from ...core.deps import get_current_user, get_admin, get_super_admin, require_feature
 from ...models.user import User
 from ...schemas.booking import (
     BookingCreate, BookingUpdate, BookingResponse, 
-    BookingCancellation, BookingConfirmation
+    BookingCancellation, BookingConfirmation, AvailabilityGridResponse,
+    BookingBulkCreate, BookingBulkResponse
 )
 from ...services.booking_service import BookingService
+from ...services.idempotency_service import IdempotencyService
+from ...services.availability_service import AvailabilityService
+from ...services.booking_lifecycle_service import BookingLifecycleService
+from ...services.booking_stats_service import BookingStatsService
+from ...services.table_occupancy_service import TableOccupancyService
 
 router = APIRouter()
 
@@ -31,6 +37,21 @@ def create_booking(
     booking = BookingService.create_booking(db, booking_data, current_user)
     return BookingResponse.from_orm(booking)
 
+@router.post("/bulk", response_model=BookingBulkResponse, summary="批量/周期创建课程预约")
+def create_bulk_bookings(
+    bulk_data: BookingBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量创建课程预约
+    
+    - 支持显式时间段列表（slots）或周期规则（recurrence，如每周同一时间）
+    - 一次性检查所有时间段的冲突、分配球台并校验余额
+    - 所有预约在同一事务中创建，返回每个时间段的成功/失败结果
+    """
+    return BookingService.create_bulk_bookings(db, bulk_data, current_user)
+
 @router.get("/", response_model=List[BookingResponse], summary="获取预约列表")
 def get_bookings(
     status: Optional[str] = Query(None, description="预约状态筛选"),
@@ -75,6 +96,7 @@ def get_booking(
 def confirm_booking(
     booking_id: int,
     confirmation: BookingConfirmation,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100, description="幂等键，重试时携带相同的值"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -84,11 +106,17 @@ def confirm_booking(
     - 教练可以确认自己的预约
     - 管理员可以确认任何预约
     - 确认预约时自动扣费
+    - 携带 Idempotency-Key 时重试直接返回首次结果，不会重复扣费
     """
-    booking = BookingService.confirm_booking(
-        db, booking_id, confirmation.action, current_user, confirmation.message
+    def confirm():
+        booking = BookingService.confirm_booking(
+            db, booking_id, confirmation.action, current_user, confirmation.message
+        )
+        return BookingResponse.from_orm(booking)
+    
+    return IdempotencyService.execute(
+        db, current_user.id, idempotency_key, f"bookings.{booking_id}.confirm", confirmation, confirm
     )
-    return BookingResponse.from_orm(booking)
 
 @router.get("/my/completed", response_model=List[BookingResponse], summary="获取已完成的预约")
 def get_completed_bookings(
@@ -158,6 +186,34 @@ def get_coach_schedule(
     schedule = BookingService.get_coach_schedule(db, coach_id, date_from, date_to)
     return {"coach_id": coach_id, "schedule": schedule}
 
+@router.get("/availability/coach/{coach_id}", response_model=AvailabilityGridResponse, summary="获取教练空闲时间网格")
+def get_coach_availability(
+    coach_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取教练在可预约窗口内的占用位图
+    
+    - 每天一个十六进制位图，第i位为1表示第i个时间槽已被占用
+    - 时间按UTC计算，时间槽长度见 slot_minutes
+    """
+    return AvailabilityService.get_coach_availability(db, coach_id)
+
+@router.get("/availability/campus/{campus_id}", response_model=AvailabilityGridResponse, summary="获取校区教练空闲时间网格")
+def get_campus_availability(
+    campus_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取校区内所有教练的占用位图
+    
+    - 用于"选择教练和时间"页面一次性渲染整个校区
+    - 包含教练姓名和课时费
+    """
+    return AvailabilityService.get_campus_availability(db, campus_id)
+
 @router.get("/tables/available", summary="获取可用球台")
 def get_available_tables(
     campus_id: int = Query(..., description="校区ID"),
@@ -208,24 +264,69 @@ def get_my_pending_bookings(
     bookings = BookingService.get_bookings(db, current_user, "pending")
     return [BookingResponse.from_orm(booking) for booking in bookings]
 
-@router.get("/statistics/monthly", summary="获取月度预约统计")
+@router.post("/lifecycle/run", summary="执行预约生命周期任务")
+def run_booking_lifecycle(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin)
+):
+    """
+    立即执行一轮预约状态迁移（通常由后台任务定时执行）
+    
+    - 已确认且已结束的预约标记为已完成
+    - 开课时仍未确认的预约自动拒绝
+    - 可重复执行
+    """
+    return BookingLifecycleService.run_once(db)
+
+@router.get("/statistics/monthly", summary="获取月度预约统计",
+            dependencies=[Depends(require_feature("advanced_reports"))])
 def get_monthly_booking_statistics(
     year: int = Query(..., description="年份"),
     month: int = Query(..., ge=1, le=12, description="月份"),
+    campus_id: Optional[int] = Query(None, description="校区ID（仅超级管理员可指定）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取月度预约统计
     
-    - 管理员可以查看校区统计
+    - 管理员可以查看校区统计（校区管理员限本校区）
     - 教练可以查看自己的统计
     - 学员可以查看自己的统计
+    - 包含各状态数量、收入、取消率、教练利用率和球台占用率
     """
-    # 这里可以添加统计逻辑
-    # 暂时返回简单响应
-    return {
-        "year": year,
-        "month": month,
-        "message": "统计功能待实现"
-    }
+    return BookingStatsService.get_monthly_statistics(db, year, month, current_user, campus_id)
+
+@router.get("/analytics/table-occupancy", summary="获取球台占用热力图",
+            dependencies=[Depends(require_feature("advanced_reports"))])
+def get_table_occupancy_heatmap(
+    date_from: date = Query(..., description="开始日期"),
+    date_to: date = Query(..., description="结束日期"),
+    campus_id: Optional[int] = Query(None, description="校区ID（仅超级管理员可指定）"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin)
+):
+    """
+    获取球台 × 周内小时（168）的占用率矩阵
+    
+    - 按覆盖日期范围的自然周（周一至周日，UTC）统计已确认/已完成的预约
+    - 校区管理员限本校区，超级管理员可查看全部校区
+    - 返回每张球台的占用率、各小时平均同时占用球台数及峰值，用于评估球台配置
+    """
+    return TableOccupancyService.get_heatmap(db, date_from, date_to, current_user, campus_id)
+
+@router.post("/statistics/backfill", summary="回填预约日汇总")
+def backfill_booking_statistics(
+    date_from: date = Query(..., description="开始日期"),
+    date_to: date = Query(..., description="结束日期"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_super_admin)
+):
+    """
+    按日期范围重建预约日汇总表
+    
+    - 仅超级管理员可操作
+    - 用于历史数据初始化或汇总数据修复
+    """
+    days = BookingStatsService.backfill(db, date_from, date_to)
+    return {"message": "预约统计回填完成", "days": days}
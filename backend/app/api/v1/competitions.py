@@ -1,19 +1,26 @@
 """
 比赛管理API
 """
+from datetime import date
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 
 from ...db.database import get_db
 from ...models.user import User, UserRole
-from ...core.deps import get_current_user, get_admin
+from ...core.deps import get_current_user, get_admin, get_super_admin, require_feature
 from ...services.competition_service import CompetitionService
+from ...services.bracket_service import BracketService
+from ...services.rating_service import RatingService
+from ...services.scoreboard_service import ScoreboardService
 from ...schemas.competition import (
     CompetitionCreate, CompetitionUpdate, CompetitionResponse, CompetitionQuery,
     CompetitionRegistrationCreate, CompetitionRegistrationResponse,
     CompetitionMatchCreate, CompetitionMatchUpdate, CompetitionMatchResponse,
-    DrawRequest, CompetitionStatistics
+    DrawRequest, RoundRobinRequest, CompetitionStatistics, BracketResponse,
+    PlayerRatingResponse, RatingRecomputeResult
 )
 
 router = APIRouter()
@@ -129,8 +136,8 @@ def register_competition(
     
     - 只有学员可以报名
     - 检查比赛状态和截止时间
-    - 自动创建支付订单
-    - 检查重复报名和人数限制
+    - 原子占座并自动创建支付订单
+    - 名额已满时进入候补（不收费），有人取消后按报名先后自动递补
     """
     registration_data = CompetitionRegistrationCreate(
         competition_id=competition_id,
@@ -182,8 +189,8 @@ def generate_draw(
     生成比赛对阵
     
     - 只有管理员可以操作
-    - 随机分配对阵
-    - 处理轮空情况
+    - 按等级分决定种子顺序，一次生成所有轮次
+    - 轮空按种子排位分配，轮空选手直接晋级
     - 更新比赛状态
     """
     draw_request = DrawRequest(
@@ -194,17 +201,83 @@ def generate_draw(
     return [CompetitionMatchResponse.from_orm(match) for match in matches]
 
 
+@router.post("/{competition_id}/round-robin", response_model=List[CompetitionMatchResponse], summary="生成小组循环赛")
+def generate_round_robin(
+    competition_id: int,
+    schedule_request: RoundRobinRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin)
+):
+    """
+    生成小组循环赛对阵并排程
+    
+    - 只有管理员可以操作
+    - 按等级分种子顺序、pool_size 蛇形分组，组内轮转法生成各轮对阵
+    - 自动分配球台和开赛时间，保证选手休息时间，避开已被预约的球台
+    - 重新生成会替换该组别原有的小组赛对阵
+    """
+    matches = CompetitionService.generate_round_robin(db, competition_id, schedule_request, current_user)
+    return [CompetitionMatchResponse.from_orm(match) for match in matches]
+
+
 @router.get("/{competition_id}/matches", response_model=List[CompetitionMatchResponse], summary="获取比赛对阵")
 def get_matches(
     competition_id: int,
     group_type: str = Query(None, pattern="^[ABC]$", description="组别筛选"),
+    stage: str = Query(None, pattern="^(group|knockout)$", description="赛段筛选"),
     db: Session = Depends(get_db)
 ):
     """获取比赛对阵列表"""
-    matches = CompetitionService.get_competition_matches(db, competition_id, group_type)
+    matches = CompetitionService.get_competition_matches(db, competition_id, group_type, stage)
     return [CompetitionMatchResponse.from_orm(match) for match in matches]
 
 
+@router.get("/{competition_id}/bracket", response_model=BracketResponse, summary="获取淘汰赛签表")
+def get_bracket(
+    competition_id: int,
+    group_type: str = Query(..., pattern="^[ABC]$", description="组别"),
+    db: Session = Depends(get_db)
+):
+    """获取某组别的完整签表（按轮次分组，含选手姓名和冠军）"""
+    return BracketService.get_bracket(db, competition_id, group_type)
+
+
+@router.get("/{competition_id}/scoreboard", summary="获取实时比分快照")
+def get_scoreboard(
+    competition_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    获取比赛全部对阵的快照（所有组别和赛段，含选手姓名）
+
+    - 快照预先序列化并缓存，只有录入结果或重新生成对阵后才会重建
+    - 支持 If-None-Match，版本未变化时返回304
+    """
+    snapshot = ScoreboardService.get_snapshot(db, competition_id)
+    etag = f'"{competition_id}-{snapshot.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=snapshot.payload, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/{competition_id}/live", summary="实时比分推送（SSE）")
+async def live_scoreboard(competition_id: int, request: Request):
+    """
+    订阅比赛的实时比分（text/event-stream）
+
+    - 连接后先推送 snapshot 事件（与 /scoreboard 内容相同）
+    - 之后每当有结果录入，推送 matches 事件：有变化的对阵（完整数据）和被删除的对阵ID
+    - 消费过慢时会重新推送 snapshot 事件，客户端整体替换即可
+    """
+    await run_in_threadpool(ScoreboardService.load, competition_id)  # 比赛不存在时返回404
+    return StreamingResponse(
+        ScoreboardService.stream(competition_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.put("/matches/{match_id}", response_model=CompetitionMatchResponse, summary="录入比赛结果")
 def update_match_result(
     match_id: int,
@@ -217,6 +290,8 @@ def update_match_result(
     
     - 只有管理员可以操作
     - 自动判定获胜者
+    - 胜者自动晋级到下一轮对阵
+    - 更新双方等级分
     - 更新比赛状态
     """
     match = CompetitionService.update_match_result(db, match_id, match_data, current_user)
@@ -240,8 +315,29 @@ def confirm_registration(
     return CompetitionRegistrationResponse.from_orm(registration)
 
 
-@router.get("/statistics/summary", response_model=CompetitionStatistics, summary="获取比赛统计")
+@router.post("/registrations/{registration_id}/cancel", summary="取消报名")
+def cancel_registration(
+    registration_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    取消报名
+    
+    - 学员取消自己的报名，管理员可取消本校区的报名
+    - 抽签前可取消，已支付的报名费退回余额
+    - 释放的名额按报名先后递补给候补选手
+    """
+    CompetitionService.cancel_registration(db, registration_id, current_user)
+    return {"message": "报名已取消"}
+
+
+@router.get("/statistics/summary", response_model=CompetitionStatistics, summary="获取比赛统计",
+            dependencies=[Depends(require_feature("advanced_reports"))])
 def get_statistics(
+    campus_id: int = Query(None, description="校区筛选"),
+    date_from: date = Query(None, description="比赛日期起（含）"),
+    date_to: date = Query(None, description="比赛日期止（含）"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -251,5 +347,40 @@ def get_statistics(
     - 总比赛数、状态分布
     - 参赛人数统计
     - 热门组别分析
+    - 支持按校区、比赛日期范围筛选，校区管理员只能查看本校区
+    """
+    if current_user.role == UserRole.CAMPUS_ADMIN:
+        campus_id = current_user.campus_id
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始日期不能晚于结束日期"
+        )
+    return CompetitionService.get_competition_statistics(db, campus_id, date_from, date_to)
+
+
+@router.get("/ratings/leaderboard", response_model=List[PlayerRatingResponse], summary="等级分排行榜")
+def get_rating_leaderboard(
+    campus_id: int = Query(None, description="校区筛选"),
+    group_type: str = Query(None, pattern="^[ABC]$", description="组别筛选（按最近参赛组别）"),
+    min_matches: int = Query(0, ge=0, description="最少计分场次"),
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(50, ge=1, le=100, description="每页大小"),
+    db: Session = Depends(get_db)
+):
+    """按等级分从高到低排列学员"""
+    return RatingService.get_leaderboard(db, campus_id, group_type, min_matches, (page - 1) * size, size)
+
+
+@router.post("/ratings/recompute", response_model=RatingRecomputeResult, summary="重算等级分")
+def recompute_ratings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_super_admin)
+):
+    """
+    按计分顺序重放全部已完成对阵，重建所有学员的等级分
+    
+    - 只有超级管理员可以操作
+    - 用于调整等级分参数或导入历史对阵后
     """
-    return CompetitionService.get_competition_statistics(db)
+    return RatingService.recompute_all(db)
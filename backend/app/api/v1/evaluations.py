@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from ...db.database import get_db
-from ...core.deps import get_current_user
+from ...core.deps import get_current_user, require_feature
 from ...models.user import User
 from ...schemas.evaluation import (
     EvaluationCreate, EvaluationUpdate, EvaluationResponse
@@ -107,7 +107,8 @@ def get_pending_evaluations(
     pending_courses = EvaluationService.get_pending_evaluations(db)
     return pending_courses
 
-@router.get("/statistics/summary", summary="获取评价统计")
+@router.get("/statistics/summary", summary="获取评价统计",
+            dependencies=[Depends(require_feature("advanced_reports"))])
 def get_evaluation_statistics(
     user_id: Optional[int] = Query(None, description="用户ID"),
     db: Session = Depends(get_db)
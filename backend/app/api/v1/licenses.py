@@ -1,18 +1,22 @@
 """
 软件授权管理API
 """
+from datetime import date
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from ...db.database import get_db
 from ...models.user import User
-from ...core.deps import get_current_user
+from ...core.deps import get_current_user, get_super_admin
 from ...services.license_service import LicenseService
+from ...services.license_usage_service import LicenseUsageService
+from ...services.license_token_service import LicenseTokenService, SIGNING_ALGORITHM
 from ...schemas.license import (
     LicenseCreate, LicenseUpdate, LicenseResponse, LicenseQuery,
     LicenseValidationRequest, LicenseValidationResponse,
-    LicenseRenewalRequest, LicenseStatistics, HeartbeatRequest
+    LicenseRenewalRequest, LicenseStatistics, HeartbeatRequest, LicensePublicKeyResponse,
+    LicenseUsagePoint, LicenseQuotaViolation
 )
 
 router = APIRouter()
@@ -64,6 +68,41 @@ def get_licenses(
     return [LicenseResponse.from_orm(license) for license in licenses]
 
 
+@router.get("/public-key", response_model=LicensePublicKeyResponse, summary="获取授权令牌公钥")
+def get_public_key():
+    """
+    获取授权令牌的验签公钥
+    
+    - 公开接口，无需认证
+    - 客户端缓存公钥，在本地校验 /validate 返回的令牌签名和有效期
+    - 令牌载荷中的 kid 与 key_id 不一致时重新获取
+    """
+    return LicensePublicKeyResponse(
+        algorithm=SIGNING_ALGORITHM,
+        key_id=LicenseTokenService.key_id(),
+        public_key=LicenseTokenService.public_key_pem()
+    )
+
+
+@router.get("/usage/violations", response_model=List[LicenseQuotaViolation], summary="授权超额使用检测")
+def get_quota_violations(
+    granularity: str = Query("day", pattern="^(day|month)$", description="统计粒度"),
+    date_from: date = Query(None, description="开始日期（默认最近30天/12个月）"),
+    date_to: date = Query(None, description="结束日期（默认今天）"),
+    campus_id: int = Query(None, description="校区筛选"),
+    license_id: int = Query(None, description="授权筛选"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_super_admin)
+):
+    """
+    授权超额使用检测
+    
+    - 列出活跃用户/教练/学员峰值超过授权上限的周期
+    - 数据来自使用日志汇总，由后台任务定期增量更新
+    """
+    return LicenseUsageService.get_quota_violations(db, granularity, date_from, date_to, campus_id, license_id)
+
+
 @router.get("/{license_id}", response_model=LicenseResponse, summary="获取授权详情")
 def get_license(
     license_id: int,
@@ -104,12 +143,30 @@ def validate_license(
     - 检查授权密钥有效性
     - 验证授权状态和有效期
     - 检查激活次数限制
-    - 返回可用功能权限
-    - 更新心跳时间和激活记录
+    - 返回可用功能权限和签名的授权令牌
+    - 已激活设备只读缓存，心跳时间批量写库；新设备激活时写入激活记录
     """
     return LicenseService.validate_license(db, validation_request)
 
 
+@router.get("/{license_id}/usage", response_model=List[LicenseUsagePoint], summary="授权使用趋势")
+def get_usage_trend(
+    license_id: int,
+    granularity: str = Query("day", pattern="^(day|month)$", description="统计粒度"),
+    date_from: date = Query(None, description="开始日期（默认最近30天/12个月）"),
+    date_to: date = Query(None, description="结束日期（默认今天）"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_super_admin)
+):
+    """
+    授权使用趋势（按日或按月）
+    
+    - 活跃用户/教练/学员、预约和比赛次数的峰值与平均值
+    - 数据来自使用日志汇总，由后台任务定期增量更新
+    """
+    return LicenseUsageService.get_usage_trend(db, license_id, granularity, date_from, date_to)
+
+
 @router.post("/{license_id}/renew", response_model=LicenseResponse, summary="续费授权")
 def renew_license(
     license_id: int,
@@ -138,9 +195,9 @@ def heartbeat(
     """
     授权心跳检测
     
-    - 更新授权使用状态
+    - 更新授权使用状态（内存缓冲，定期批量写库）
     - 记录使用统计数据
-    - 验证授权有效性
+    - 验证授权有效性，已激活设备顺带续签令牌
     - 客户端定期调用
     """
     return LicenseService.heartbeat(db, heartbeat_request)
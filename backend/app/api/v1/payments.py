@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import io
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from decimal import Decimal
+from datetime import date, datetime
 
 from ...db.database import get_db
-from ...core.deps import get_current_user
+from ...core.deps import get_current_user, get_super_admin
 from ...models.user import User, UserRole
 from ...schemas.payment import (
     RechargeRequest, OfflinePaymentRequest, PaymentResponse, 
-    BalanceResponse, PaymentSummary, RefundRequest, PaymentStatusUpdate
+    BalanceResponse, PaymentSummary, RefundRequest, PaymentStatusUpdate,
+    CampusPaymentSummary, PaymentTimeseriesResponse,
+    LedgerAccountResponse, LedgerBalanceResponse, JournalLineResponse,
+    ReconciliationReport
 )
 from ...services.payment_service import PaymentService
+from ...services.idempotency_service import IdempotencyService
+from ...services.payment_gateway_service import PaymentGatewayService
+from ...services.qrcode_service import QRCodeService
+from ...services.reconciliation_service import ReconciliationService
+from ...services.ledger_service import LedgerService
+from ...models.ledger import LedgerAccount
 from ...services.system_log_service import SystemLogService
 
 router = APIRouter()
@@ -18,68 +29,101 @@ router = APIRouter()
 @router.post("/recharge", response_model=PaymentResponse, summary="账户充值")
 def create_recharge(
     recharge_data: RechargeRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100, description="幂等键，重试时携带相同的值"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """创建充值订单"""
+    """创建充值订单（携带 Idempotency-Key 时重试不会重复充值）"""
     if current_user.role not in [UserRole.STUDENT, UserRole.COACH]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只有学员和教练可以充值"
         )
     
-    payment = PaymentService.create_recharge(
-        db=db,
-        user_id=current_user.id,
-        amount=recharge_data.amount,
-        payment_method=recharge_data.payment_method,
-        description=recharge_data.description
-    )
+    def recharge():
+        payment = PaymentService.create_recharge(
+            db=db,
+            user_id=current_user.id,
+            amount=recharge_data.amount,
+            payment_method=recharge_data.payment_method,
+            description=recharge_data.description
+        )
+        return PaymentResponse.from_orm(payment)
     
-    return PaymentResponse.from_orm(payment)
+    return IdempotencyService.execute(
+        db, current_user.id, idempotency_key, "payments.recharge", recharge_data, recharge
+    )
 
 @router.post("/wechat-qr/{payment_id}", summary="生成微信支付二维码")
-def generate_wechat_qr(
+async def generate_wechat_qr(
     payment_id: int,
+    format: str = Query("png", pattern="^(png|svg)$", description="二维码图片格式"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """生成微信支付二维码"""
-    qr_url = PaymentService.generate_wechat_qr(db, payment_id)
-    return {"qr_code_url": qr_url}
+    """生成微信支付二维码（返回支付地址及服务端渲染的二维码图片地址）"""
+    qr_url = await run_in_threadpool(PaymentService.generate_wechat_qr, db, payment_id)
+    qr_image_url = await QRCodeService.get_image_url(qr_url, format)
+    return {"qr_code_url": qr_url, "qr_image_url": qr_image_url}
 
 @router.post("/alipay-qr/{payment_id}", summary="生成支付宝支付二维码")
-def generate_alipay_qr(
+async def generate_alipay_qr(
     payment_id: int,
+    format: str = Query("png", pattern="^(png|svg)$", description="二维码图片格式"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """生成支付宝支付二维码"""
-    qr_url = PaymentService.generate_alipay_qr(db, payment_id)
-    return {"qr_code_url": qr_url}
+    """生成支付宝支付二维码（返回支付地址及服务端渲染的二维码图片地址）"""
+    qr_url = await run_in_threadpool(PaymentService.generate_alipay_qr, db, payment_id)
+    qr_image_url = await QRCodeService.get_image_url(qr_url, format)
+    return {"qr_code_url": qr_url, "qr_image_url": qr_image_url}
+
+@router.post("/callbacks/{gateway}", summary="支付网关回调")
+async def payment_gateway_callback(
+    gateway: str,
+    request: Request,
+    x_gateway_timestamp: Optional[str] = Header(None, alias="X-Gateway-Timestamp"),
+    x_gateway_signature: Optional[str] = Header(None, alias="X-Gateway-Signature"),
+    db: Session = Depends(get_db)
+):
+    """接收微信/支付宝支付结果通知（无需登录，按签名校验）
+
+    只验签并写入收件箱后立即应答，支付确认由后台任务批量完成；重复通知同样应答成功。
+    """
+    body = await request.body()
+    accepted = await run_in_threadpool(
+        PaymentGatewayService.receive_notification,
+        db, gateway, body, x_gateway_timestamp, x_gateway_signature
+    )
+    return {"code": "SUCCESS", "message": "OK" if accepted else "DUPLICATE"}
 
 @router.post("/offline", response_model=PaymentResponse, summary="线下充值录入")
 def create_offline_payment(
     payment_data: OfflinePaymentRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100, description="幂等键，重试时携带相同的值"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """管理员录入线下充值"""
+    """管理员录入线下充值（携带 Idempotency-Key 时重试不会重复录入）"""
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CAMPUS_ADMIN]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只有管理员可以录入线下充值"
         )
     
-    payment = PaymentService.create_offline_payment(
-        db=db,
-        user_id=payment_data.user_id,
-        amount=payment_data.amount,
-        operator_id=current_user.id,
-        description=payment_data.description
-    )
+    def offline_payment():
+        payment = PaymentService.create_offline_payment(
+            db=db,
+            user_id=payment_data.user_id,
+            amount=payment_data.amount,
+            operator_id=current_user.id,
+            description=payment_data.description
+        )
+        return PaymentResponse.from_orm(payment)
     
-    return PaymentResponse.from_orm(payment)
+    return IdempotencyService.execute(
+        db, current_user.id, idempotency_key, "payments.offline", payment_data, offline_payment
+    )
 
 @router.put("/{payment_id}/status", response_model=PaymentResponse, summary="更新支付状态")
 def update_payment_status(
@@ -219,68 +263,157 @@ def get_payment_summary(
     db: Session = Depends(get_db)
 ):
     """获取当前用户的支付汇总信息"""
-    from ...models.payment import Payment, PaymentType, PaymentStatus
+    totals = PaymentService.get_user_totals(db, current_user.id)
     
-    # 计算各类金额
-    recharge_total = db.query(Payment).filter(
-        Payment.user_id == current_user.id,
-        Payment.type == str(PaymentType.RECHARGE),
-        Payment.status == str(PaymentStatus.SUCCESS)
-    ).with_entities(Payment.amount).all()
+    return PaymentSummary(
+        total_recharge=totals["recharge"],
+        total_expense=totals["expense"],
+        total_refund=totals["refund"],
+        current_balance=totals["balance"],
+        payment_count=totals["count"]
+    )
 
-    expense_total = db.query(Payment).filter(
-        Payment.user_id == current_user.id,
-        Payment.type.in_([str(PaymentType.BOOKING), str(PaymentType.COMPETITION)]),
-        Payment.status == str(PaymentStatus.SUCCESS)
-    ).with_entities(Payment.amount).all()
+@router.get("/summary/campus", response_model=List[CampusPaymentSummary], summary="获取校区支付汇总")
+def get_campus_payment_summary(
+    campus_id: Optional[int] = Query(None, description="校区ID（仅超级管理员可指定）"),
+    date_from: Optional[date] = Query(None, description="开始日期"),
+    date_to: Optional[date] = Query(None, description="结束日期"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按校区汇总充值、消费、退费金额（管理员，校区管理员限本校区）"""
+    return PaymentService.get_campus_summary(db, current_user, campus_id, date_from, date_to)
 
-    refund_total = db.query(Payment).filter(
-        Payment.user_id == current_user.id,
-        Payment.type == str(PaymentType.REFUND),
-        Payment.status == str(PaymentStatus.SUCCESS)
-    ).with_entities(Payment.amount).all()
-    
-    payment_count = db.query(Payment).filter(
-        Payment.user_id == current_user.id
-    ).count()
-    
-    recharge_sum = sum([p.amount for p in recharge_total]) if recharge_total else Decimal('0')
-    expense_sum = sum([p.amount for p in expense_total]) if expense_total else Decimal('0')
-    refund_sum = sum([p.amount for p in refund_total]) if refund_total else Decimal('0')
+@router.get("/summary/timeseries", response_model=PaymentTimeseriesResponse, summary="获取支付时间序列")
+def get_payment_timeseries(
+    granularity: str = Query("day", description="统计粒度: day/month"),
+    date_from: Optional[date] = Query(None, description="开始日期"),
+    date_to: Optional[date] = Query(None, description="结束日期"),
+    campus_id: Optional[int] = Query(None, description="校区ID（仅超级管理员可指定）"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按日/月统计成功支付的金额（管理员财务看板）"""
+    return PaymentService.get_payment_timeseries(db, current_user, granularity, date_from, date_to, campus_id)
+
+@router.get("/ledger/balance", response_model=LedgerBalanceResponse, summary="获取账本余额")
+def get_ledger_balance(
+    at: Optional[datetime] = Query(None, description="查询时间点，为空时返回当前余额"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取当前用户余额账户在指定时间点的余额"""
+    account = LedgerService.get_user_wallet(db, current_user.id)
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="暂无账本记录"
+        )
+    return LedgerService.get_balance(db, account.id, at)
+
+@router.get("/ledger/accounts", response_model=List[LedgerAccountResponse], summary="获取记账账户列表")
+def get_ledger_accounts(
+    account_type: Optional[str] = Query(None, description="账户类型: user_wallet/campus_revenue/platform_revenue/external_cash"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取记账账户列表（超级管理员）"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足"
+        )
+    query = db.query(LedgerAccount)
+    if account_type:
+        query = query.filter(LedgerAccount.account_type == account_type)
+    return query.order_by(LedgerAccount.id).offset(skip).limit(limit).all()
+
+@router.get("/ledger/accounts/{account_id}/balance", response_model=LedgerBalanceResponse, summary="获取账户余额")
+def get_ledger_account_balance(
+    account_id: int,
+    at: Optional[datetime] = Query(None, description="查询时间点，为空时返回当前余额"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取指定账户在指定时间点的余额（超级管理员）"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足"
+        )
+    return LedgerService.get_balance(db, account_id, at)
+
+@router.get("/ledger/accounts/{account_id}/lines", response_model=List[JournalLineResponse], summary="获取账户分录明细")
+def get_ledger_account_lines(
+    account_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取指定账户的分录明细（超级管理员）"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足"
+        )
+    return LedgerService.get_account_lines(db, account_id, skip, limit)
+
+@router.post("/reconciliation", response_model=ReconciliationReport, summary="支付对账")
+def reconcile_payments(
+    statement: UploadFile = File(..., description="网关对账单CSV，需包含 transaction_id、amount 列"),
+    gateway: Optional[str] = Query(None, description="支付网关: wechat/alipay，为空时对账全部网关"),
+    date_from: Optional[date] = Query(None, description="支付开始日期"),
+    date_to: Optional[date] = Query(None, description="支付结束日期"),
+    presorted: bool = Query(False, description="对账单已按交易号排序时跳过外部排序"),
+    current_user: User = Depends(get_super_admin),
+    db: Session = Depends(get_db)
+):
+    """上传网关对账单，与系统支付记录按交易号流式比对（超级管理员）"""
+    lines = io.TextIOWrapper(statement.file, encoding="utf-8-sig", newline="")
+    report = ReconciliationService.reconcile(db, lines, gateway, date_from, date_to, presorted)
     
-    return PaymentSummary(
-        total_recharge=recharge_sum,
-        total_expense=expense_sum,
-        total_refund=refund_sum,
-        current_balance=recharge_sum - expense_sum + refund_sum,
-        payment_count=payment_count
+    SystemLogService.log_action(
+        db=db,
+        user_id=current_user.id,
+        action="payment_reconciliation",
+        target_type="payment",
+        description=f"支付对账: {statement.filename}, 匹配 {report['matched']} 笔, 差异 {sum(report['counts'].values())} 笔"
     )
+    return report
 
 @router.post("/refund", response_model=PaymentResponse, summary="申请退款")
 def request_refund(
     refund_data: RefundRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100, description="幂等键，重试时携带相同的值"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """申请退款（管理员操作）"""
+    """申请退款（管理员操作，携带 Idempotency-Key 时重试不会重复退款）"""
     if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CAMPUS_ADMIN]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只有管理员可以处理退款"
         )
     
-    # 检查用户余额是否足够退款
-    if not PaymentService.check_balance(db, current_user.id, refund_data.amount):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="余额不足，无法退款"
+    def refund():
+        # 检查用户余额是否足够退款
+        if not PaymentService.check_balance(db, current_user.id, refund_data.amount):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="余额不足，无法退款"
+            )
+        
+        payment = PaymentService.refund_balance(
+            db=db,
+            user_id=current_user.id,
+            amount=refund_data.amount,
+            description=f"管理员退款: {refund_data.reason}"
         )
+        return PaymentResponse.from_orm(payment)
     
-    payment = PaymentService.refund_balance(
-        db=db,
-        user_id=current_user.id,
-        amount=refund_data.amount,
-        description=f"管理员退款: {refund_data.reason}"
+    return IdempotencyService.execute(
+        db, current_user.id, idempotency_key, "payments.refund", refund_data, refund
     )
-    
-    return PaymentResponse.from_orm(payment)
@@ -0,0 +1,82 @@
+"""
+进程内缓存工具
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class TTLCache:
+    """带过期时间的线程安全进程内缓存
+
+    - 多个工作进程之间不共享，失效只作用于当前进程，过期时间兜底
+    - ttl_seconds 为 None 时永不过期，仅依赖显式失效
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期返回默认值"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """写入缓存"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else 0
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                self._evict()
+            self._data[key] = (expires_at, value)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """读取缓存，未命中时调用 factory 生成并写入"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """使单个键失效"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_many(self, keys: Iterable[Hashable]) -> None:
+        """批量失效"""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """按条件失效（用于复合键）"""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self) -> None:
+        """容量已满时先清理过期项，仍不足则淘汰最早写入的一半"""
+        now = time.monotonic()
+        expired = [k for k, (exp, _) in self._data.items() if exp and exp < now]
+        for key in expired:
+            del self._data[key]
+        if len(self._data) >= self.max_entries:
+            for key in list(self._data)[: self.max_entries // 2]:
+                del self._data[key]
@@ -11,29 +11,120 @@ class Settings(BaseSettings):
     SECRET_KEY: str = config("SECRET_KEY", default="your-secret-key-here")
     ALGORITHM: str = config("ALGORITHM", default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
+    REFRESH_TOKEN_EXPIRE_DAYS: int = config("REFRESH_TOKEN_EXPIRE_DAYS", default=14, cast=int)
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = config("TOKEN_VERSION_CACHE_TTL_SECONDS", default=30, cast=int)  # 角色变更后旧令牌在其他进程中最长仍有效的时间
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: int = config("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", default=86400, cast=int)
+
+    # 密码哈希与登录配置
+    PASSWORD_HASH_ROUNDS: int = config("PASSWORD_HASH_ROUNDS", default=29000, cast=int)  # pbkdf2_sha256 迭代次数，修改后旧哈希在下次登录时自动升级
+    PASSWORD_HASH_WORKERS: int = config("PASSWORD_HASH_WORKERS", default=4, cast=int)  # 密码校验线程数（独立于请求线程池）
+    PASSWORD_HASH_QUEUE_SIZE: int = config("PASSWORD_HASH_QUEUE_SIZE", default=64, cast=int)  # 排队上限（排队的登录请求在事件循环中等待，不占用请求线程），超出时返回503
+    LOGIN_RATE_LIMIT_ATTEMPTS: int = config("LOGIN_RATE_LIMIT_ATTEMPTS", default=5, cast=int)  # 单个用户名在时间窗口内的最大登录尝试次数（校验前计数，登录成功后清零）
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = config("LOGIN_RATE_LIMIT_WINDOW_SECONDS", default=300, cast=int)
     
     # 应用配置
     APP_NAME: str = "乒乓球培训管理系统"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = config("DEBUG", default=True, cast=bool)
     
+    # 生产服务器配置（uv run start）
+    SERVER_HOST: str = config("SERVER_HOST", default="0.0.0.0")
+    SERVER_PORT: int = config("SERVER_PORT", default=8000, cast=int)
+    SERVER_WORKERS: int = config("SERVER_WORKERS", default=0, cast=int)  # 工作进程数，0 表示按可用CPU核数
+    SERVER_KEEPALIVE_SECONDS: int = config("SERVER_KEEPALIVE_SECONDS", default=5, cast=int)  # HTTP keep-alive 空闲超时，应小于前端代理的超时
+    SERVER_BACKLOG: int = config("SERVER_BACKLOG", default=2048, cast=int)  # 监听队列长度
+    SERVER_MAX_REQUESTS: int = config("SERVER_MAX_REQUESTS", default=10000, cast=int)  # 单个工作进程处理该数量请求后重启（缓解内存泄漏），0 表示不限
+    SERVER_MAX_REQUESTS_JITTER: int = config("SERVER_MAX_REQUESTS_JITTER", default=1000, cast=int)  # 随机抖动，避免所有工作进程同时重启
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = config("SERVER_GRACEFUL_TIMEOUT_SECONDS", default=20, cast=int)  # 停机时等待进行中请求的时间，之后执行收尾任务
+
     # 支付配置
     WECHAT_PAY_APP_ID: str = config("WECHAT_PAY_APP_ID", default="")
     WECHAT_PAY_MCH_ID: str = config("WECHAT_PAY_MCH_ID", default="")
     ALIPAY_APP_ID: str = config("ALIPAY_APP_ID", default="")
+    PAYMENT_GATEWAY_ENABLED: bool = config("PAYMENT_GATEWAY_ENABLED", default=False, cast=bool)  # 开启后线上充值需等待网关回调确认
+    PAYMENT_GATEWAY_URL: str = config("PAYMENT_GATEWAY_URL", default="http://127.0.0.1:9000")
+    PAYMENT_CALLBACK_SECRET: str = config("PAYMENT_CALLBACK_SECRET", default="")  # 回调签名密钥(HMAC-SHA256)，为空时拒绝所有回调
+    PAYMENT_CALLBACK_TOLERANCE_SECONDS: int = config("PAYMENT_CALLBACK_TOLERANCE_SECONDS", default=300, cast=int)
+    PAYMENT_INBOX_INTERVAL_SECONDS: int = config("PAYMENT_INBOX_INTERVAL_SECONDS", default=5, cast=int)
+    PAYMENT_INBOX_BATCH_SIZE: int = config("PAYMENT_INBOX_BATCH_SIZE", default=500, cast=int)
     
     # 许可证服务器配置
     LICENSE_SERVER_URL: str = config("LICENSE_SERVER_URL", default="https://license.example.com")
     LICENSE_VALIDATION_KEY: str = config("LICENSE_VALIDATION_KEY", default="")
+    LICENSE_SIGNING_KEY: str = config("LICENSE_SIGNING_KEY", default="")  # 授权令牌签名私钥(Ed25519 PEM)，为空时使用 LICENSE_SIGNING_KEY_FILE
+    LICENSE_SIGNING_KEY_FILE: str = config("LICENSE_SIGNING_KEY_FILE", default="license_signing_key.pem")  # 文件不存在时自动生成
+    LICENSE_TOKEN_TTL_HOURS: int = config("LICENSE_TOKEN_TTL_HOURS", default=24, cast=int)  # 授权令牌有效期（不超过授权结束日期）
+    LICENSE_CACHE_TTL_SECONDS: int = config("LICENSE_CACHE_TTL_SECONDS", default=60, cast=int)  # 授权信息缓存时间，其他进程的修改最长延迟生效
+    LICENSE_ENFORCEMENT_ENABLED: bool = config("LICENSE_ENFORCEMENT_ENABLED", default=False, cast=bool)  # 开启后按校区授权限制功能和席位
+    LICENSE_HEARTBEAT_FLUSH_SECONDS: int = config("LICENSE_HEARTBEAT_FLUSH_SECONDS", default=30, cast=int)  # 心跳批量写库间隔
+    LICENSE_HEARTBEAT_BUFFER_SIZE: int = config("LICENSE_HEARTBEAT_BUFFER_SIZE", default=5000, cast=int)  # 积压的使用日志达到该数量时立即写库
+    LICENSE_ROLLUP_INTERVAL_SECONDS: int = config("LICENSE_ROLLUP_INTERVAL_SECONDS", default=300, cast=int)  # 使用日志汇总任务间隔
+    LICENSE_ROLLUP_SETTLE_SECONDS: int = config("LICENSE_ROLLUP_SETTLE_SECONDS", default=120, cast=int)  # 写入超过该时间的日志才参与汇总
+    LICENSE_ROLLUP_BATCH_SIZE: int = config("LICENSE_ROLLUP_BATCH_SIZE", default=50000, cast=int)
+    LICENSE_ROLLUP_MAX_BATCHES: int = config("LICENSE_ROLLUP_MAX_BATCHES", default=20, cast=int)  # 单次任务最多处理的批数，积压由后续运行继续处理
+    LICENSE_EXPIRY_INTERVAL_SECONDS: int = config("LICENSE_EXPIRY_INTERVAL_SECONDS", default=300, cast=int)  # 授权到期清理任务间隔
+    LICENSE_RENEWAL_REMINDER_DAYS: int = config("LICENSE_RENEWAL_REMINDER_DAYS", default=30, cast=int)  # 到期前多少天发送续费提醒
+    LICENSE_RENEWAL_REMINDER_BATCH_SIZE: int = config("LICENSE_RENEWAL_REMINDER_BATCH_SIZE", default=500, cast=int)
     
     # 文件上传配置
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
+    QR_CODE_TTL_HOURS: int = config("QR_CODE_TTL_HOURS", default=72, cast=int)  # 超过该时间未被使用的二维码图片会被清理
+    QR_CODE_RENDER_WORKERS: int = config("QR_CODE_RENDER_WORKERS", default=2, cast=int)
+    QR_CODE_PURGE_INTERVAL_SECONDS: int = config("QR_CODE_PURGE_INTERVAL_SECONDS", default=3600, cast=int)
     
     # 系统配置
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
-    
+
+    # 预约配置
+    BOOKING_WINDOW_DAYS: int = config("BOOKING_WINDOW_DAYS", default=7, cast=int)
+    AVAILABILITY_SLOT_MINUTES: int = config("AVAILABILITY_SLOT_MINUTES", default=30, cast=int)
+    AVAILABILITY_CACHE_TTL_SECONDS: int = config("AVAILABILITY_CACHE_TTL_SECONDS", default=300, cast=int)
+    CAMPUS_TABLE_COUNT: int = config("CAMPUS_TABLE_COUNT", default=20, cast=int)
+    RECURRING_BOOKING_WINDOW_DAYS: int = config("RECURRING_BOOKING_WINDOW_DAYS", default=28, cast=int)
+    BULK_BOOKING_MAX_SLOTS: int = config("BULK_BOOKING_MAX_SLOTS", default=20, cast=int)
+    BOOKING_OPEN_HOURS_PER_DAY: int = config("BOOKING_OPEN_HOURS_PER_DAY", default=14, cast=int)  # 每日营业时长，用于利用率统计
+    TABLE_OCCUPANCY_CACHE_TTL_SECONDS: int = config("TABLE_OCCUPANCY_CACHE_TTL_SECONDS", default=86400, cast=int)
+    TABLE_OCCUPANCY_MAX_DAYS: int = config("TABLE_OCCUPANCY_MAX_DAYS", default=400, cast=int)
+
+    # 后台任务配置
+    BACKGROUND_JOBS_ENABLED: bool = config("BACKGROUND_JOBS_ENABLED", default=True, cast=bool)
+    BACKGROUND_JOB_LEASE_SECONDS: int = config("BACKGROUND_JOB_LEASE_SECONDS", default=600, cast=int)
+    BOOKING_LIFECYCLE_INTERVAL_SECONDS: int = config("BOOKING_LIFECYCLE_INTERVAL_SECONDS", default=300, cast=int)
+    BOOKING_LIFECYCLE_BATCH_SIZE: int = config("BOOKING_LIFECYCLE_BATCH_SIZE", default=500, cast=int)
+
+    # 幂等键配置
+    IDEMPOTENCY_KEY_TTL_HOURS: int = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int)
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = config("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", default=3600, cast=int)
+
+    # 记账配置
+    LEDGER_SNAPSHOT_INTERVAL: int = config("LEDGER_SNAPSHOT_INTERVAL", default=100, cast=int)  # 每个账户每N行分录生成一次余额快照
+
+    # 对账配置
+    RECONCILIATION_SORT_CHUNK_ROWS: int = config("RECONCILIATION_SORT_CHUNK_ROWS", default=200000, cast=int)  # 对账单外部排序时每个分块的行数
+    RECONCILIATION_DB_BATCH_SIZE: int = config("RECONCILIATION_DB_BATCH_SIZE", default=5000, cast=int)
+    RECONCILIATION_MAX_DETAILS: int = config("RECONCILIATION_MAX_DETAILS", default=1000, cast=int)  # 每类差异最多返回的明细条数
+
+    # 比赛赛程配置
+    COMPETITION_MATCH_MINUTES: int = config("COMPETITION_MATCH_MINUTES", default=30, cast=int)  # 每场比赛占用球台的时长
+    COMPETITION_REST_MINUTES: int = config("COMPETITION_REST_MINUTES", default=30, cast=int)  # 同一选手两场比赛之间的最短休息时间
+    COMPETITION_DAY_HOURS: int = config("COMPETITION_DAY_HOURS", default=10, cast=int)  # 每个比赛日从开赛时刻起可排赛的时长
+    COMPETITION_SCHEDULE_MAX_DAYS: int = config("COMPETITION_SCHEDULE_MAX_DAYS", default=3, cast=int)
+    COMPETITION_STATS_CACHE_TTL_SECONDS: int = config("COMPETITION_STATS_CACHE_TTL_SECONDS", default=300, cast=int)  # 比赛统计缓存时间（本进程写入时立即失效）
+
+    # 等级分配置（Elo）
+    RATING_INITIAL: float = config("RATING_INITIAL", default=1500.0, cast=float)
+    RATING_K_FACTOR: float = config("RATING_K_FACTOR", default=32.0, cast=float)
+    RATING_PROVISIONAL_MATCHES: int = config("RATING_PROVISIONAL_MATCHES", default=10, cast=int)  # 前N场使用更大的K值，新选手更快收敛
+    RATING_PROVISIONAL_K_FACTOR: float = config("RATING_PROVISIONAL_K_FACTOR", default=48.0, cast=float)
+
+    # 实时比分配置
+    SCOREBOARD_POLL_SECONDS: float = config("SCOREBOARD_POLL_SECONDS", default=2.0, cast=float)  # 有观众时检查结果版本号的间隔（兼顾其他工作进程录入的结果）
+    SCOREBOARD_KEEPALIVE_SECONDS: float = config("SCOREBOARD_KEEPALIVE_SECONDS", default=15.0, cast=float)  # SSE 空闲保活间隔，避免代理断开连接
+    SCOREBOARD_QUEUE_SIZE: int = config("SCOREBOARD_QUEUE_SIZE", default=64, cast=int)  # 每个订阅者积压的增量上限，超出后改发全量快照
+    SCOREBOARD_CACHE_SIZE: int = config("SCOREBOARD_CACHE_SIZE", default=256, cast=int)  # 缓存快照的比赛数量上限
+
     class Config:
         env_file = ".env"
 
@@ -1,51 +1,87 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple, Union
 from ..db.database import get_db
 from ..models.user import User, UserRole
-from ..core.security import verify_token
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.security import decode_token
+from ..services.entitlement_service import EntitlementService
 
 security = HTTPBearer()
+_optional_security = HTTPBearer(auto_error=False)
+
+# 用户ID -> (令牌版本, 是否启用)，按角色鉴权时代替查询整个用户
+_token_versions = TTLCache(ttl_seconds=settings.TOKEN_VERSION_CACHE_TTL_SECONDS)
+
+class TokenUser:
+    """由访问令牌声明构造的当前用户（只含鉴权所需字段，不是ORM对象）"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.id: int = payload["uid"]
+        self.username: str = payload["sub"]
+        self.role = UserRole(payload["role"])
+        self.campus_id: Optional[int] = payload.get("campus_id")
+        self.student_id: Optional[int] = payload.get("student_id")
+        self.coach_id: Optional[int] = payload.get("coach_id")
+        self.token_version: int = payload.get("ver", 0)
+        self.is_active = 1
+
+    def __repr__(self):
+        return f"<TokenUser(id={self.id}, username='{self.username}', role='{self.role}')>"
+
+def _invalid_token(detail: str = "无效的认证令牌"):
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """获取当前用户"""
-    token = credentials.credentials
-    username = verify_token(token)
-    
-    if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证令牌",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    if not user.is_active:
+    payload = decode_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        _invalid_token()
+    return _load_user(db, payload)
+
+def get_token_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Union[TokenUser, User]:
+    """按令牌声明获取当前用户，只校验令牌版本（带缓存），不加载用户记录
+
+    早期签发的令牌不含角色声明，此时回退为查询用户。
+    """
+    payload = decode_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        _invalid_token()
+    if "uid" not in payload or "role" not in payload:
+        return _load_user(db, payload)
+
+    version, is_active = _token_versions.get_or_set(payload["uid"], lambda: _query_token_version(db, payload["uid"]))
+    if version is None:
+        _invalid_token("用户不存在")
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户账户已被禁用"
         )
-    
-    return user
+    if payload.get("ver", 0) != version:
+        _invalid_token("登录状态已失效，请重新登录")
+    return TokenUser(payload)
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """获取当前活跃用户"""
     return current_user
 
 def require_role(required_role: UserRole):
-    """要求特定角色"""
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    """要求特定角色（按令牌声明鉴权）"""
+    def role_checker(current_user: User = Depends(get_token_user)) -> User:
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -55,8 +91,8 @@ def require_role(required_role: UserRole):
     return role_checker
 
 def require_roles(*required_roles: UserRole):
-    """要求特定角色之一"""
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    """要求特定角色之一（按令牌声明鉴权）"""
+    def role_checker(current_user: User = Depends(get_token_user)) -> User:
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -80,3 +116,87 @@ def get_coach(current_user: User = Depends(require_role(UserRole.COACH))) -> Use
 def get_student(current_user: User = Depends(require_role(UserRole.STUDENT))) -> User:
     """获取学员"""
     return current_user
+
+def get_licensed_campus(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_optional_security),
+    db: Session = Depends(get_db)
+) -> Optional[int]:
+    """当前请求受授权限制的校区ID（同一请求只解析一次）
+
+    - 路径中带 competition_id 时按比赛所属校区判断，公开的签表、比分等接口对未登录访问同样生效
+    - 其他请求按令牌声明的校区判断，未登录（或令牌无效）时返回 401
+    - 未启用授权限制、超级管理员或未归属校区时返回 None
+    """
+    if not settings.LICENSE_ENFORCEMENT_ENABLED:
+        return None
+    role, campus_id = _token_campus(db, credentials)
+    if role == UserRole.SUPER_ADMIN:
+        return None
+
+    competition_id = request.path_params.get("competition_id")
+    if competition_id is not None:
+        competition_campus_id = EntitlementService.competition_campus(db, int(competition_id))
+        if competition_campus_id is not None:
+            return competition_campus_id
+
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="请先登录",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return campus_id
+
+def require_feature(feature: str):
+    """要求所在校区的授权包含指定功能（见 entitlement_service.FEATURES），可用作路由或接口依赖"""
+    def feature_checker(
+        campus_id: Optional[int] = Depends(get_licensed_campus),
+        db: Session = Depends(get_db)
+    ) -> None:
+        EntitlementService.check_feature(db, campus_id, feature)
+    return feature_checker
+
+def _token_campus(
+    db: Session, credentials: Optional[HTTPAuthorizationCredentials]
+) -> Tuple[Optional[UserRole], Optional[int]]:
+    """令牌声明的 (角色, 校区ID)，未登录或令牌无效时为 (None, None)"""
+    if credentials is None:
+        return None, None
+    payload = decode_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        return None, None
+    if "role" in payload:
+        return UserRole(payload["role"]), payload.get("campus_id")
+    # 早期签发的令牌不含角色声明
+    row = db.query(User.role, User.campus_id).filter(User.username == payload["sub"]).first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+def _load_user(db: Session, payload: Dict[str, Any]) -> User:
+    user = db.query(User).filter(User.username == payload["sub"]).first()
+    if user is None:
+        _invalid_token("用户不存在")
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户账户已被禁用"
+        )
+
+    if "ver" in payload and payload["ver"] != (user.token_version or 0):
+        _invalid_token("登录状态已失效，请重新登录")
+
+    return user
+
+def _query_token_version(db: Session, user_id: int) -> Tuple[Optional[int], bool]:
+    row = db.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+    if row is None:
+        return None, False
+    return row[0] or 0, bool(row[1])
+
+@event.listens_for(User, "after_update")
+def _forget_token_version(mapper, connection, target):
+    # 只能失效当前进程的缓存，其他进程依赖 TOKEN_VERSION_CACHE_TTL_SECONDS 过期
+    _token_versions.invalidate(target.id)
@@ -0,0 +1,56 @@
+"""
+进程内限流工具
+"""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Optional
+
+
+class SlidingWindowLimiter:
+    """滑动窗口计数限流（线程安全）
+
+    - 每个键在 window_seconds 内最多记录 limit 次，超出后返回需要等待的秒数
+    - 与 TTLCache 相同，多个工作进程之间不共享，实际上限为 limit x 进程数
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 100000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._hits: Dict[Hashable, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: Hashable) -> Optional[int]:
+        """记录一次；已达上限时不记录并返回需要等待的秒数，否则返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) >= self.max_keys:
+                    self._evict(now)
+                hits = self._hits[key] = deque()
+            self._prune(hits, now)
+            if len(hits) >= self.limit:
+                return max(1, int(hits[0] + self.window_seconds - now) + 1)
+            hits.append(now)
+            return None
+
+    def reset(self, key: Hashable) -> None:
+        """清除计数（如登录成功后）"""
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def _prune(self, hits: Deque[float], now: float) -> None:
+        cutoff = now - self.window_seconds
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+
+    def _evict(self, now: float) -> None:
+        """键数量已满时清理窗口外的键，仍不足则淘汰最早的一半"""
+        cutoff = now - self.window_seconds
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= cutoff]:
+            del self._hits[key]
+        if len(self._hits) >= self.max_keys:
+            for key in list(self._hits)[: len(self._hits) // 2]:
+                del self._hits[key]
@@ -0,0 +1,74 @@
+"""
+进程内周期任务调度器
+
+每个工作进程各自运行一份调度器，任务内部通过 background_jobs 表的租约
+保证同一时刻只有一个进程真正执行（见 BackgroundJobService.run_with_lease）。
+"""
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """周期任务定义"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], object]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+
+
+class Scheduler:
+    """基于 asyncio 的周期任务调度器，任务函数在线程中执行，不阻塞事件循环"""
+
+    def __init__(self):
+        self._jobs: List[PeriodicJob] = []
+        self._shutdown_hooks: List[Callable[[], object]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[], object]) -> None:
+        """注册周期任务"""
+        self._jobs.append(PeriodicJob(name, interval_seconds, func))
+
+    def add_shutdown_hook(self, func: Callable[[], object]) -> None:
+        """注册停机时执行的收尾函数（如刷新内存队列）"""
+        self._shutdown_hooks.append(func)
+
+    @property
+    def jobs(self) -> List[PeriodicJob]:
+        return list(self._jobs)
+
+    async def start(self) -> None:
+        """启动所有周期任务"""
+        loop = asyncio.get_running_loop()
+        for job in self._jobs:
+            self._tasks.append(loop.create_task(self._run_forever(job)))
+
+    async def stop(self, timeout: Optional[float] = 30) -> None:
+        """停止周期任务并执行收尾函数"""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for hook in self._shutdown_hooks:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(hook), timeout)
+            except Exception:
+                logger.exception("停机收尾任务执行失败: %s", getattr(hook, "__name__", hook))
+
+    async def _run_forever(self, job: PeriodicJob) -> None:
+        while True:
+            await asyncio.sleep(job.interval_seconds)
+            try:
+                await asyncio.to_thread(job.func)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("后台任务执行失败: %s", job.name)
+
+
+scheduler = Scheduler()
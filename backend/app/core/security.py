@@ -1,33 +1,60 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
+# 迭代次数与配置不一致的哈希（含 bcrypt 旧哈希）会被 needs_update 判定为需要升级
 pwd_context = CryptContext(
     schemes=["pbkdf2_sha256", "bcrypt"],
     default="pbkdf2_sha256",
-    deprecated="auto"
+    deprecated="auto",
+    pbkdf2_sha256__rounds=settings.PASSWORD_HASH_ROUNDS
 )
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
-    """创建访问令牌"""
+# 密码校验是CPU密集操作（hashlib 计算时释放GIL），放在独立的有界线程池中执行，由事件循环等待结果；
+# 名额（线程数 + 排队数）在事件循环中占用，登录高峰时超出的请求直接返回503，不会占用请求线程池
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE)
+
+TOKEN_TYPE_ACCESS = "access"
+TOKEN_TYPE_REFRESH = "refresh"
+
+def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[Dict[str, Any]] = None) -> str:
+    """创建访问令牌，claims 为附加声明（用户ID、角色、校区等）"""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject), "type": TOKEN_TYPE_ACCESS}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Union[str, None]:
-    """验证令牌"""
+def create_refresh_token(user_id: int, jti: str, family_id: str, expires_at: datetime) -> str:
+    """创建刷新令牌（只能用于换取新令牌，不能访问接口）"""
+    to_encode = {"exp": expires_at, "sub": str(user_id), "jti": jti, "fam": family_id, "type": TOKEN_TYPE_REFRESH}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_token(token: str, token_type: str = TOKEN_TYPE_ACCESS) -> Optional[Dict[str, Any]]:
+    """校验并解析令牌，类型不符或无效时返回 None（早期签发的访问令牌没有 type 声明）"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
+    if payload.get("type", TOKEN_TYPE_ACCESS) != token_type:
+        return None
+    return payload
+
+def verify_token(token: str) -> Union[str, None]:
+    """验证访问令牌"""
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
 
 def get_password_hash(password: str) -> str:
     """获取密码哈希"""
@@ -37,6 +64,29 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
     return pwd_context.verify(plain_password, hashed_password)
 
+@contextmanager
+def password_hash_slot() -> Iterator[None]:
+    """占用一个密码校验名额，线程池与排队均已满时抛出503（在事件循环中调用，不阻塞）"""
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="登录请求过多，请稍后重试",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        yield
+    finally:
+        _hash_slots.release()
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """在密码校验线程池中验证密码，哈希参数已变更时同时返回新哈希（否则为 None）
+
+    调用方需先通过 password_hash_slot 占用名额。
+    """
+    return await asyncio.wrap_future(
+        _hash_executor.submit(pwd_context.verify_and_update, plain_password, hashed_password)
+    )
+
 def validate_password(password: str) -> tuple[bool, str]:
     """验证密码强度"""
     if len(password) < 8 or len(password) > 16:
@@ -0,0 +1,27 @@
+"""
+静态文件服务
+"""
+import os
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+
+class CachedStaticFiles(StaticFiles):
+    """为内容寻址目录下的文件附加长期缓存响应头
+
+    这些目录中的文件名由内容哈希生成，内容变化必然换名，浏览器和 CDN 可以永久缓存。
+    """
+
+    def __init__(self, *args, immutable_prefixes=(), max_age: int = 31536000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefixes = tuple(prefix.strip("/") + "/" for prefix in immutable_prefixes)
+        self.max_age = max_age
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        path = self.get_path(scope).replace(os.sep, "/")
+        if path.startswith(self.immutable_prefixes):
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+        return response
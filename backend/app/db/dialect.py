@@ -0,0 +1,65 @@
+"""
+跨数据库的SQL表达式工具（SQLite / PostgreSQL / MySQL）
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+GRANULARITIES = ("day", "month")
+
+
+def dialect_name(db: Session) -> str:
+    """当前会话绑定的数据库方言名称"""
+    return db.get_bind().dialect.name
+
+
+def to_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """将时间统一转换为UTC时区；SQLite 读出的时间不带时区，按UTC处理"""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def date_bucket(db: Session, column, granularity: str = "day"):
+    """按UTC把时间列截断为日期字符串：day -> 'YYYY-MM-DD'，month -> 'YYYY-MM'
+
+    统一返回字符串，避免 date_trunc 等函数在 SQLite 上不可用、各库返回类型不一致。
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"不支持的时间粒度: {granularity}")
+
+    name = dialect_name(db)
+    if name == "postgresql":
+        utc_column = func.timezone("UTC", column)
+        return func.to_char(utc_column, "YYYY-MM" if granularity == "month" else "YYYY-MM-DD")
+    if name == "mysql":
+        return func.date_format(column, "%Y-%m" if granularity == "month" else "%Y-%m-%d")
+    # SQLite 以UTC文本存储时间
+    return func.strftime("%Y-%m" if granularity == "month" else "%Y-%m-%d", column)
+
+
+def epoch_seconds(db: Session, column):
+    """时间列对应的Unix时间戳（秒，UTC），便于在Python端直接做数值分桶而无需解析时间"""
+    name = dialect_name(db)
+    if name == "postgresql":
+        return func.extract("epoch", column)
+    if name == "mysql":
+        return func.unix_timestamp(column)
+    # julianday 按UTC文本计算，2440587.5 为 1970-01-01 的儒略日
+    return (func.julianday(column) - 2440587.5) * 86400.0
+
+
+def binary_order(db: Session, column):
+    """按字节序（即 Python 字符串比较顺序）排序的字符串列，避免数据库的本地化排序规则
+    与应用端归并比较不一致"""
+    name = dialect_name(db)
+    if name == "postgresql":
+        return column.collate("C")
+    if name == "mysql":
+        return func.binary(column)
+    # SQLite 默认 BINARY 排序规则
+    return column
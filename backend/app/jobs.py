@@ -0,0 +1,59 @@
+"""
+后台周期任务注册
+"""
+from .core.config import settings
+from .core.scheduler import Scheduler
+from .services.auth_token_service import AuthTokenService
+from .services.booking_lifecycle_service import BookingLifecycleService
+from .services.idempotency_service import IdempotencyService
+from .services.license_expiry_service import LicenseExpiryService
+from .services.license_service import LicenseService
+from .services.license_usage_service import LicenseUsageService
+from .services.payment_gateway_service import PaymentGatewayService
+from .services.qrcode_service import QRCodeService
+
+
+def register_jobs(scheduler: Scheduler) -> None:
+    """注册所有周期任务"""
+    scheduler.add_job(
+        "booking_lifecycle",
+        settings.BOOKING_LIFECYCLE_INTERVAL_SECONDS,
+        BookingLifecycleService.run_scheduled
+    )
+    scheduler.add_job(
+        "idempotency_purge",
+        settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+        IdempotencyService.purge_scheduled
+    )
+    # 心跳缓冲在各进程内存中，每个进程刷新自己的缓冲，不使用租约；停机时再刷新一次
+    scheduler.add_job(
+        "license_expiry",
+        settings.LICENSE_EXPIRY_INTERVAL_SECONDS,
+        LicenseExpiryService.run_scheduled
+    )
+    scheduler.add_job(
+        "license_heartbeat_flush",
+        settings.LICENSE_HEARTBEAT_FLUSH_SECONDS,
+        LicenseService.flush_heartbeats
+    )
+    scheduler.add_shutdown_hook(LicenseService.flush_heartbeats)
+    scheduler.add_job(
+        "license_usage_rollup",
+        settings.LICENSE_ROLLUP_INTERVAL_SECONDS,
+        LicenseUsageService.rollup_scheduled
+    )
+    scheduler.add_job(
+        "payment_gateway_inbox",
+        settings.PAYMENT_INBOX_INTERVAL_SECONDS,
+        PaymentGatewayService.run_scheduled
+    )
+    scheduler.add_job(
+        "qrcode_purge",
+        settings.QR_CODE_PURGE_INTERVAL_SECONDS,
+        QRCodeService.purge_scheduled
+    )
+    scheduler.add_job(
+        "refresh_token_purge",
+        settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS,
+        AuthTokenService.purge_scheduled
+    )
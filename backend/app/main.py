@@ -1,12 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 import os
 
 from .api.v1 import api_router
 from .core.config import settings
+from .core.scheduler import scheduler
+from .core.static import CachedStaticFiles
 from .db.database import engine, Base
+from .jobs import register_jobs
 
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
@@ -32,17 +34,30 @@ app.add_middleware(
 if not os.path.exists(settings.UPLOAD_DIR):
     os.makedirs(settings.UPLOAD_DIR)
 
-app.mount("/static", StaticFiles(directory=settings.UPLOAD_DIR), name="static")
+# 二维码图片按内容哈希命名，可长期缓存
+app.mount("/static", CachedStaticFiles(directory=settings.UPLOAD_DIR, immutable_prefixes=["qrcodes"]), name="static")
 
 # 注册API路由
 app.include_router(api_router, prefix="/api/v1")
 
+# 后台周期任务
+@app.on_event("startup")
+async def start_background_jobs():
+    if settings.BACKGROUND_JOBS_ENABLED:
+        register_jobs(scheduler)
+        await scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await scheduler.stop()
+
 # 全局异常处理
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"message": exc.detail, "success": False}
+        content={"message": exc.detail, "success": False},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -7,11 +7,18 @@ from .course import Course, CourseStatus
 from .booking import Booking, BookingStatus
 from .payment import Payment, PaymentMethod, PaymentStatus
 from .evaluation import Evaluation
-from .competition import Competition, CompetitionGroup, CompetitionRegistration, CompetitionMatch
+from .competition import Competition, CompetitionGroup, CompetitionRegistration, CompetitionMatch, MatchStage
 from .system_log import SystemLog
 from .notification import Notification, NotificationTemplate, UserNotificationSettings
-from .license import License, LicenseActivation, LicenseUsageLog
+from .license import License, LicenseActivation, LicenseUsageLog, LicenseUsageRollup
 from .comment import Comment
+from .background_job import BackgroundJob
+from .booking_stat import BookingDailyStat
+from .idempotency_key import IdempotencyKey
+from .ledger import LedgerAccount, LedgerAccountType, JournalEntry, JournalLine, LedgerBalanceSnapshot
+from .payment_gateway import PaymentGatewayNotification, GatewayNotificationStatus
+from .refresh_token import RefreshToken
+from .player_rating import PlayerRating
 
 __all__ = [
     "User", "UserRole",
@@ -23,9 +30,16 @@ __all__ = [
     "Booking", "BookingStatus", 
     "Payment", "PaymentMethod", "PaymentStatus",
     "Evaluation",
-    "Competition", "CompetitionGroup", "CompetitionRegistration", "CompetitionMatch",
+    "Competition", "CompetitionGroup", "CompetitionRegistration", "CompetitionMatch", "MatchStage",
     "SystemLog",
     "Notification", "NotificationTemplate", "UserNotificationSettings",
-    "License", "LicenseActivation", "LicenseUsageLog",
-    "Comment"
+    "License", "LicenseActivation", "LicenseUsageLog", "LicenseUsageRollup",
+    "Comment",
+    "BackgroundJob",
+    "BookingDailyStat",
+    "IdempotencyKey",
+    "LedgerAccount", "LedgerAccountType", "JournalEntry", "JournalLine", "LedgerBalanceSnapshot",
+    "PaymentGatewayNotification", "GatewayNotificationStatus",
+    "RefreshToken",
+    "PlayerRating"
 ]
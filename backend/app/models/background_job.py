@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime, Text
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+class BackgroundJob(Base):
+    """后台任务状态表（租约锁 + 游标）"""
+    __tablename__ = "background_jobs"
+    
+    name = Column(String(50), primary_key=True, comment="任务名称")
+    owner = Column(String(100), comment="当前持有租约的工作进程")
+    lease_expires_at = Column(DateTime(timezone=True), comment="租约过期时间")
+    cursor = Column(Text, comment="增量处理游标")
+    last_run_at = Column(DateTime(timezone=True), comment="上次运行时间")
+    last_result = Column(Text, comment="上次运行结果")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+    
+    def __repr__(self):
+        return f"<BackgroundJob(name='{self.name}', owner='{self.owner}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -15,6 +15,13 @@ class BookingStatus(enum.Enum):
 class Booking(Base):
     """预约表"""
     __tablename__ = "bookings"
+    __table_args__ = (
+        # 生命周期任务按状态+时间扫描
+        Index("ix_bookings_status_start_time", "status", "start_time"),
+        Index("ix_bookings_status_end_time", "status", "end_time"),
+        # 教练时间冲突检查与日汇总重算按教练+时间扫描
+        Index("ix_bookings_coach_start_time", "coach_id", "start_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     coach_id = Column(Integer, ForeignKey("coaches.id"), nullable=False, comment="教练ID")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Numeric, UniqueConstraint
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+class BookingDailyStat(Base):
+    """预约日汇总表（按校区、教练、日期、状态聚合）"""
+    __tablename__ = "booking_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("campus_id", "coach_id", "day", "status", name="uq_booking_daily_stats_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    campus_id = Column(Integer, ForeignKey("campuses.id"), nullable=False, comment="校区ID")
+    coach_id = Column(Integer, ForeignKey("coaches.id"), nullable=False, comment="教练ID")
+    day = Column(Date, nullable=False, index=True, comment="日期(UTC，按开始时间)")
+    status = Column(String(20), nullable=False, comment="预约状态")
+    booking_count = Column(Integer, default=0, comment="预约数")
+    total_hours = Column(Numeric(10, 1), default=0, comment="预约总时长(小时)")
+    total_revenue = Column(Numeric(12, 2), default=0, comment="预约总金额")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<BookingDailyStat(coach={self.coach_id}, day={self.day}, status='{self.status}', count={self.booking_count})>"
@@ -1,7 +1,7 @@
 """
 比赛相关数据模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum, Numeric, Index, UniqueConstraint, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..db.database import Base
@@ -25,6 +25,12 @@ class CompetitionGroup(enum.Enum):
     GROUP_C = "C"  # 丙组
 
 
+class MatchStage(enum.Enum):
+    """赛段"""
+    GROUP = "group"        # 小组循环赛
+    KNOCKOUT = "knockout"  # 单败淘汰赛
+
+
 class Competition(Base):
     """比赛表"""
     __tablename__ = "competitions"
@@ -36,7 +42,10 @@ class Competition(Base):
     registration_deadline = Column(DateTime(timezone=True), nullable=False, comment="报名截止时间")
     registration_fee = Column(Numeric(10, 2), default=30.00, comment="报名费")
     max_participants = Column(Integer, default=32, comment="最大参赛人数")
+    reserved_count = Column(Integer, nullable=False, default=0, server_default="0", comment="已占用名额(含待确认，不含候补)")
+    confirmed_count = Column(Integer, nullable=False, default=0, server_default="0", comment="已确认参赛人数")
     status = Column(String(20), default=CompetitionStatus.UPCOMING.value, comment="比赛状态")
+    results_version = Column(Integer, nullable=False, default=0, server_default="0", comment="对阵结果版本号(实时比分缓存依据)")
     campus_id = Column(Integer, ForeignKey("campuses.id"), nullable=False, comment="校区ID")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
@@ -51,6 +60,11 @@ class Competition(Base):
 class CompetitionRegistration(Base):
     """比赛报名表"""
     __tablename__ = "competition_registrations"
+    __table_args__ = (
+        UniqueConstraint("competition_id", "student_id", name="uq_competition_registrations_student"),
+        # 比赛列表按比赛分组统计报名人数，抽签时按比赛读取已确认报名
+        Index("ix_competition_registrations_competition_confirmed", "competition_id", "is_confirmed"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     competition_id = Column(Integer, ForeignKey("competitions.id"), nullable=False, comment="比赛ID")
@@ -58,6 +72,7 @@ class CompetitionRegistration(Base):
     group_type = Column(String(1), nullable=False, comment="报名组别")
     payment_id = Column(Integer, ForeignKey("payments.id"), comment="支付记录ID")
     is_confirmed = Column(Boolean, default=False, comment="是否确认参赛")
+    is_waitlisted = Column(Boolean, nullable=False, default=False, server_default=false(), comment="是否候补(名额已满时报名)")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="报名时间")
     
@@ -70,10 +85,16 @@ class CompetitionRegistration(Base):
 class CompetitionMatch(Base):
     """比赛对阵表"""
     __tablename__ = "competition_matches"
+    __table_args__ = (
+        # 对阵表按比赛+组别整体读取，晋级时按轮次+编号定位下一场
+        Index("ix_competition_matches_bracket", "competition_id", "group_type", "round_number", "match_number"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     competition_id = Column(Integer, ForeignKey("competitions.id"), nullable=False, comment="比赛ID")
     group_type = Column(String(1), nullable=False, comment="比赛组别")
+    stage = Column(String(20), nullable=False, default=MatchStage.KNOCKOUT.value, server_default=MatchStage.KNOCKOUT.value, comment="赛段: group/knockout")
+    pool_number = Column(Integer, comment="小组赛分组编号")
     round_number = Column(Integer, nullable=False, comment="轮次")
     match_number = Column(Integer, nullable=False, comment="对阵编号")
     
@@ -93,6 +114,7 @@ class CompetitionMatch(Base):
     
     table_number = Column(String(10), comment="球台编号")
     referee_notes = Column(Text, comment="裁判备注")
+    rated_at = Column(DateTime(timezone=True), comment="计入等级分的时间(同时决定重算顺序)")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, UniqueConstraint
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+class IdempotencyKey(Base):
+    """幂等键表（缓存写接口的首次响应，重试时直接返回）"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="请求用户ID")
+    key = Column(String(100), nullable=False, comment="客户端提供的幂等键")
+    endpoint = Column(String(100), nullable=False, comment="接口标识")
+    request_hash = Column(String(64), nullable=False, comment="请求内容哈希")
+    status = Column(String(20), nullable=False, default="in_progress", comment="状态: in_progress/completed")
+    response_code = Column(Integer, comment="响应状态码")
+    response_body = Column(Text, comment="响应内容(JSON)")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="过期时间")
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(user={self.user_id}, key='{self.key}', status='{self.status}')>"
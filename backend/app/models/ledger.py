@@ -0,0 +1,90 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Index, UniqueConstraint, event
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import enum
+from ..db.database import Base
+
+class LedgerAccountType(enum.Enum):
+    """账户类型枚举"""
+    USER_WALLET = "user_wallet"  # 用户余额（对用户的负债）
+    CAMPUS_REVENUE = "campus_revenue"  # 校区收入
+    PLATFORM_REVENUE = "platform_revenue"  # 平台收入（软件授权费）
+    EXTERNAL_CASH = "external_cash"  # 外部资金（微信/支付宝/线下收款）
+
+class LedgerAccount(Base):
+    """账户表"""
+    __tablename__ = "ledger_accounts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String(50), unique=True, nullable=False, comment="账户编码，如 user_wallet:12")
+    account_type = Column(String(20), nullable=False, comment="账户类型")
+    owner_id = Column(Integer, comment="所属用户ID/校区ID")
+    normal_side = Column(String(10), nullable=False, comment="余额方向: debit/credit")
+    balance = Column(Numeric(14, 2), nullable=False, default=0, comment="当前余额")
+    entry_count = Column(Integer, nullable=False, default=0, comment="已记账分录行数")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+
+    def __repr__(self):
+        return f"<LedgerAccount(code='{self.code}', balance={self.balance})>"
+
+class JournalEntry(Base):
+    """会计分录表（只增不改）"""
+    __tablename__ = "journal_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), unique=True, comment="来源支付记录ID")
+    entry_type = Column(String(20), nullable=False, comment="分录类型(对应支付类型)")
+    description = Column(Text, comment="摘要")
+    occurred_at = Column(DateTime(timezone=True), nullable=False, comment="业务发生时间")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="记账时间")
+
+    lines = relationship("JournalLine", back_populates="entry")
+
+    def __repr__(self):
+        return f"<JournalEntry(id={self.id}, type='{self.entry_type}', payment={self.payment_id})>"
+
+class JournalLine(Base):
+    """分录明细表（借贷行，只增不改）"""
+    __tablename__ = "journal_lines"
+    __table_args__ = (
+        UniqueConstraint("account_id", "sequence", name="uq_journal_lines_account_sequence"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=False, index=True, comment="分录ID")
+    account_id = Column(Integer, ForeignKey("ledger_accounts.id"), nullable=False, comment="账户ID")
+    sequence = Column(Integer, nullable=False, comment="账户内序号(从1开始)")
+    debit = Column(Numeric(14, 2), nullable=False, default=0, comment="借方金额")
+    credit = Column(Numeric(14, 2), nullable=False, default=0, comment="贷方金额")
+    posted_at = Column(DateTime(timezone=True), nullable=False, comment="业务发生时间")
+
+    entry = relationship("JournalEntry", back_populates="lines")
+
+    def __repr__(self):
+        return f"<JournalLine(account={self.account_id}, seq={self.sequence}, debit={self.debit}, credit={self.credit})>"
+
+class LedgerBalanceSnapshot(Base):
+    """账户余额快照表（每 N 行分录生成一次）"""
+    __tablename__ = "ledger_balance_snapshots"
+    __table_args__ = (
+        UniqueConstraint("account_id", "sequence", name="uq_ledger_snapshots_account_sequence"),
+        Index("ix_ledger_snapshots_account_as_of", "account_id", "as_of"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("ledger_accounts.id"), nullable=False, comment="账户ID")
+    sequence = Column(Integer, nullable=False, comment="快照对应的分录行序号")
+    balance = Column(Numeric(14, 2), nullable=False, comment="该序号之后的余额")
+    as_of = Column(DateTime(timezone=True), nullable=False, comment="快照对应的业务时间")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+
+    def __repr__(self):
+        return f"<LedgerBalanceSnapshot(account={self.account_id}, seq={self.sequence}, balance={self.balance})>"
+
+# 分录一经写入不允许修改或删除，更正需通过新的冲正分录完成
+@event.listens_for(JournalEntry, "before_update")
+@event.listens_for(JournalEntry, "before_delete")
+@event.listens_for(JournalLine, "before_update")
+@event.listens_for(JournalLine, "before_delete")
+def _reject_journal_change(mapper, connection, target):
+    raise ValueError("会计分录不可修改或删除")
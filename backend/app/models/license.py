@@ -1,7 +1,7 @@
 """
 软件授权相关数据模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Boolean, ForeignKey, Numeric, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..db.database import Base
@@ -26,6 +26,10 @@ class LicenseType(enum.Enum):
 class License(Base):
     """软件授权表"""
     __tablename__ = "licenses"
+    __table_args__ = (
+        # 到期清理和即将到期查询按 (status, end_date) 范围扫描
+        Index("ix_licenses_status_end_date", "status", "end_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     license_key = Column(String(100), unique=True, nullable=False, comment="授权密钥")
@@ -63,6 +67,7 @@ class License(Base):
     last_heartbeat = Column(DateTime(timezone=True), comment="最后心跳时间")
     activation_count = Column(Integer, default=0, comment="激活次数")
     max_activations = Column(Integer, default=3, comment="最大激活次数")
+    renewal_reminded_at = Column(DateTime(timezone=True), comment="续费提醒时间(续费或修改结束日期后清空)")
     
     # 备注和说明
     notes = Column(Text, comment="备注")
@@ -119,4 +124,35 @@ class LicenseUsageLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     
     # 关系
-    license = relationship("License")
\ No newline at end of file
+    license = relationship("License")
+
+
+class LicenseUsageRollup(Base):
+    """授权使用汇总表（按授权、日/月聚合使用日志，由后台任务增量维护）"""
+    __tablename__ = "license_usage_rollups"
+    __table_args__ = (
+        UniqueConstraint("license_id", "granularity", "period", name="uq_license_usage_rollups_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    license_id = Column(Integer, ForeignKey("licenses.id"), nullable=False, comment="授权ID")
+    granularity = Column(String(5), nullable=False, comment="粒度: day / month")
+    period = Column(String(10), nullable=False, comment="统计周期(UTC): YYYY-MM-DD / YYYY-MM")
+    sample_count = Column(Integer, nullable=False, default=0, comment="使用日志条数")
+    
+    # 各指标的峰值与累计值（平均值 = 累计值 / 日志条数，便于增量合并）
+    max_active_users = Column(Integer, nullable=False, default=0, comment="活跃用户数峰值")
+    sum_active_users = Column(BigInteger, nullable=False, default=0, comment="活跃用户数累计")
+    max_active_coaches = Column(Integer, nullable=False, default=0, comment="活跃教练数峰值")
+    sum_active_coaches = Column(BigInteger, nullable=False, default=0, comment="活跃教练数累计")
+    max_active_students = Column(Integer, nullable=False, default=0, comment="活跃学员数峰值")
+    sum_active_students = Column(BigInteger, nullable=False, default=0, comment="活跃学员数累计")
+    max_bookings = Column(Integer, nullable=False, default=0, comment="预约次数峰值")
+    sum_bookings = Column(BigInteger, nullable=False, default=0, comment="预约次数累计")
+    max_competitions = Column(Integer, nullable=False, default=0, comment="比赛次数峰值")
+    sum_competitions = Column(BigInteger, nullable=False, default=0, comment="比赛次数累计")
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+    
+    # 关系
+    license = relationship("License")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -23,10 +23,16 @@ class PaymentType(enum.Enum):
     BOOKING = "booking"  # 课程费用
     COMPETITION = "competition"  # 比赛报名费
     REFUND = "refund"  # 退款
+    LICENSE = "license"  # 软件授权费
 
 class Payment(Base):
     """支付记录表"""
     __tablename__ = "payments"
+    __table_args__ = (
+        # 余额/汇总按用户分组统计，财务看板按时间范围统计
+        Index("ix_payments_user_type_status", "user_id", "type", "status"),
+        Index("ix_payments_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="用户ID")
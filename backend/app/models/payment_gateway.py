@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Numeric, Index, UniqueConstraint
+from sqlalchemy.sql import func
+import enum
+from ..db.database import Base
+
+class GatewayNotificationStatus(enum.Enum):
+    """支付网关通知处理状态枚举"""
+    PENDING = "pending"  # 待处理
+    PROCESSED = "processed"  # 已确认支付
+    IGNORED = "ignored"  # 重复/无需处理
+    FAILED = "failed"  # 校验失败
+
+class PaymentGatewayNotification(Base):
+    """支付网关回调收件箱（按网关通知ID去重）"""
+    __tablename__ = "payment_gateway_inbox"
+    __table_args__ = (
+        UniqueConstraint("gateway", "notify_id", name="uq_payment_gateway_inbox_notify"),
+        # 工作进程按状态顺序领取待处理通知
+        Index("ix_payment_gateway_inbox_status_id", "status", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    gateway = Column(String(20), nullable=False, comment="支付网关: wechat/alipay")
+    notify_id = Column(String(64), nullable=False, comment="网关通知ID")
+    payment_id = Column(Integer, nullable=False, comment="支付记录ID")
+    transaction_id = Column(String(100), comment="网关交易号")
+    amount = Column(Numeric(10, 2), nullable=False, comment="网关通知金额")
+    trade_status = Column(String(20), nullable=False, comment="网关交易状态: success/failed")
+    payload = Column(Text, comment="原始通知内容")
+    status = Column(String(20), nullable=False, default="pending", comment="处理状态")
+    error = Column(Text, comment="处理失败原因")
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), comment="接收时间")
+    processed_at = Column(DateTime(timezone=True), comment="处理时间")
+    
+    def __repr__(self):
+        return f"<PaymentGatewayNotification(gateway='{self.gateway}', notify_id='{self.notify_id}', status='{self.status}')>"
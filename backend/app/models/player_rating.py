@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+class PlayerRating(Base):
+    """学员等级分（Elo，由比赛对阵结果计算）"""
+    __tablename__ = "player_ratings"
+    __table_args__ = (
+        # 排行榜按等级分倒序
+        Index("ix_player_ratings_rating", "rating"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), unique=True, nullable=False, comment="学员ID")
+    rating = Column(Float, nullable=False, comment="等级分")
+    matches_played = Column(Integer, nullable=False, default=0, comment="计分场次")
+    wins = Column(Integer, nullable=False, default=0, comment="胜场")
+    losses = Column(Integer, nullable=False, default=0, comment="负场")
+    last_group_type = Column(String(1), comment="最近一场比赛的组别")
+    last_match_at = Column(DateTime(timezone=True), comment="最近一场比赛时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+    
+    student = relationship("Student")
+    
+    def __repr__(self):
+        return f"<PlayerRating(student={self.student_id}, rating={self.rating:.0f})>"
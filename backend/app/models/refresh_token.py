@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+class RefreshToken(Base):
+    """刷新令牌表（每次刷新轮换，同一登录会话的令牌属于同一家族）"""
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(36), unique=True, nullable=False, comment="令牌ID")
+    family_id = Column(String(36), nullable=False, index=True, comment="令牌家族ID（同一次登录）")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True, comment="用户ID")
+    token_version = Column(Integer, nullable=False, default=0, comment="签发时的用户令牌版本")
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="过期时间")
+    revoked_at = Column(DateTime(timezone=True), comment="吊销/轮换时间")
+    replaced_by = Column(String(36), comment="轮换后的新令牌ID")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="签发时间")
+    
+    def __repr__(self):
+        return f"<RefreshToken(user={self.user_id}, jti='{self.jti}', revoked={self.revoked_at is not None})>"
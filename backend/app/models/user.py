@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Text, event, inspect
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -28,6 +28,7 @@ class User(Base):
     avatar_url = Column(String(255), comment="头像URL")
     id_number = Column(String(18), comment="身份证号")
     is_active = Column(Integer, default=1, comment="是否激活")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0", comment="令牌版本，递增后旧令牌全部失效")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
     
@@ -36,3 +37,12 @@ class User(Base):
     
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', role='{self.role}')>"
+
+# 角色、校区或启用状态变化时使已签发的令牌失效（令牌中携带的角色声明不再可信）
+TOKEN_CLAIM_FIELDS = ("role", "campus_id", "is_active")
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in TOKEN_CLAIM_FIELDS):
+        target.token_version = (target.token_version or 0) + 1
@@ -1,9 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date, datetime
 from decimal import Decimal
+from ..core.config import settings
 from .user import UserResponse
 
+# 批量预约单个时间段的最长时长（小时）
+MAX_BULK_SLOT_HOURS = 24
+
 class BookingBase(BaseModel):
     """预约基础Schema"""
     coach_id: int
@@ -55,3 +59,62 @@ class BookingConfirmation(BaseModel):
     """预约确认Schema"""
     action: str  # confirm/reject/cancel_confirm
     message: Optional[str] = None
+
+class BookingSlot(BaseModel):
+    """批量预约时间段Schema"""
+    start_time: datetime
+    end_time: datetime
+    table_number: Optional[str] = None
+
+class BookingRecurrence(BaseModel):
+    """周期预约规则Schema"""
+    first_start_time: datetime
+    duration_hours: Decimal = Field(..., gt=0, le=MAX_BULK_SLOT_HOURS, description="每次时长（小时）")
+    interval_days: int = Field(7, ge=1, le=365, description="间隔天数")
+    occurrences: int = Field(..., ge=1, le=settings.BULK_BOOKING_MAX_SLOTS, description="重复次数")
+
+class BookingBulkCreate(BaseModel):
+    """批量预约创建Schema（slots 与 recurrence 二选一）"""
+    coach_id: int
+    campus_id: int
+    slots: Optional[List[BookingSlot]] = None
+    recurrence: Optional[BookingRecurrence] = None
+    booking_message: Optional[str] = None
+
+class BookingSlotResult(BaseModel):
+    """单个时间段的预约结果"""
+    index: int
+    start_time: datetime
+    end_time: datetime
+    success: bool
+    booking_id: Optional[int] = None
+    table_number: Optional[str] = None
+    message: Optional[str] = None
+
+class BookingBulkResponse(BaseModel):
+    """批量预约响应Schema"""
+    total: int
+    succeeded: int
+    failed: int
+    total_cost: Decimal
+    results: List[BookingSlotResult]
+
+class AvailabilityDay(BaseModel):
+    """单日占用位图"""
+    date: date
+    busy_bitmap: str  # 十六进制位图，第i位为1表示第i个时间槽已占用
+
+class CoachAvailability(BaseModel):
+    """教练空闲时间网格"""
+    coach_id: int
+    coach_name: Optional[str] = None
+    hourly_rate: Optional[Decimal] = None
+    days: List[AvailabilityDay]
+
+class AvailabilityGridResponse(BaseModel):
+    """空闲时间网格响应Schema"""
+    window_start: date
+    window_days: int
+    slot_minutes: int
+    slots_per_day: int
+    coaches: List[CoachAvailability]
@@ -1,11 +1,10 @@
 """
 比赛相关的数据模型
 """
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional, List
 from pydantic import BaseModel, Field
-from .user import UserResponse
 from .student import StudentResponse
 
 
@@ -39,6 +38,8 @@ class CompetitionResponse(CompetitionBase):
     created_at: datetime
     updated_at: Optional[datetime]
     registered_count: int = Field(0, description="已报名人数")
+    reserved_count: int = Field(0, description="已占用名额（含待确认）")
+    confirmed_count: int = Field(0, description="已确认参赛人数")
     
     class Config:
         from_attributes = True
@@ -70,6 +71,7 @@ class CompetitionRegistrationResponse(CompetitionRegistrationBase):
     student_id: int
     payment_id: Optional[int]
     is_confirmed: bool
+    is_waitlisted: bool = False
     created_at: datetime
     student: Optional[StudentResponse] = None
     competition: Optional[CompetitionInfo] = None
@@ -81,6 +83,8 @@ class CompetitionRegistrationResponse(CompetitionRegistrationBase):
 class CompetitionMatchBase(BaseModel):
     competition_id: int = Field(..., description="比赛ID")
     group_type: str = Field(..., pattern="^[ABC]$", description="比赛组别")
+    stage: str = Field("knockout", description="赛段: group/knockout")
+    pool_number: Optional[int] = Field(None, description="小组赛分组编号")
     round_number: int = Field(..., description="轮次")
     match_number: int = Field(..., description="对阵编号")
     player1_id: Optional[int] = Field(None, description="选手1ID")
@@ -111,19 +115,44 @@ class CompetitionMatchResponse(CompetitionMatchBase):
     scheduled_time: Optional[datetime]
     actual_start_time: Optional[datetime]
     actual_end_time: Optional[datetime]
-    table_id: Optional[int]
+    table_number: Optional[str] = None
     referee_notes: Optional[str]
     created_at: datetime
     updated_at: Optional[datetime]
     
-    player1: Optional[UserResponse] = None
-    player2: Optional[UserResponse] = None
-    winner: Optional[UserResponse] = None
-    
     class Config:
         from_attributes = True
 
 
+class BracketMatch(BaseModel):
+    """签表中的一场对阵"""
+    id: int
+    match_number: int
+    player1_id: Optional[int] = None
+    player1_name: Optional[str] = None
+    player2_id: Optional[int] = None
+    player2_name: Optional[str] = None
+    player1_score: Optional[int] = None
+    player2_score: Optional[int] = None
+    winner_id: Optional[int] = None
+    match_status: str
+    is_bye: bool = Field(False, description="是否首轮轮空")
+
+
+class BracketRound(BaseModel):
+    round_number: int
+    matches: List[BracketMatch]
+
+
+class BracketResponse(BaseModel):
+    """单败淘汰签表"""
+    competition_id: int
+    group_type: str
+    bracket_size: int = Field(0, description="签位数")
+    rounds: List[BracketRound] = []
+    champion_id: Optional[int] = Field(None, description="冠军学员ID（决赛完成后）")
+
+
 class CompetitionQuery(BaseModel):
     status: Optional[str] = Field(None, description="比赛状态筛选")
     campus_id: Optional[int] = Field(None, description="校区筛选")
@@ -138,10 +167,41 @@ class DrawRequest(BaseModel):
     group_type: str = Field(..., pattern="^[ABC]$", description="组别")
 
 
+class RoundRobinRequest(BaseModel):
+    group_type: str = Field(..., pattern="^[ABC]$", description="组别")
+    pool_size: int = Field(4, ge=2, le=16, description="每个小组的人数上限")
+    start_time: Optional[datetime] = Field(None, description="开赛时间，默认为比赛日期")
+    table_count: Optional[int] = Field(None, ge=1, description="使用的球台数，默认使用校区全部球台")
+    match_minutes: Optional[int] = Field(None, ge=5, le=240, description="单场比赛时长(分钟)")
+    rest_minutes: Optional[int] = Field(None, ge=0, le=240, description="选手两场之间最短休息时间(分钟)")
+
+
+class PlayerRatingResponse(BaseModel):
+    """排行榜条目"""
+    rank: int
+    student_id: int
+    real_name: Optional[str] = None
+    campus_id: Optional[int] = None
+    rating: float = Field(..., description="等级分")
+    matches_played: int = Field(0, description="计分场次")
+    wins: int = 0
+    losses: int = 0
+    last_group_type: Optional[str] = Field(None, description="最近参赛组别")
+
+
+class RatingRecomputeResult(BaseModel):
+    matches: int = Field(0, description="重放的对阵数")
+    players: int = Field(0, description="计分学员数")
+    elapsed_seconds: float = 0
+
+
 class CompetitionStatistics(BaseModel):
     total_competitions: int = Field(0, description="总比赛数")
     upcoming_competitions: int = Field(0, description="即将开始的比赛数")
     ongoing_competitions: int = Field(0, description="进行中的比赛数")
     completed_competitions: int = Field(0, description="已完成的比赛数")
     total_participants: int = Field(0, description="总参赛人数")
-    popular_groups: List[dict] = Field([], description="热门组别统计")
\ No newline at end of file
+    popular_groups: List[dict] = Field([], description="热门组别统计")
+    campus_id: Optional[int] = Field(None, description="统计的校区（为空表示全部校区）")
+    date_from: Optional[date] = Field(None, description="比赛日期起")
+    date_to: Optional[date] = Field(None, description="比赛日期止")
\ No newline at end of file
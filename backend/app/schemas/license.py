@@ -90,6 +90,14 @@ class LicenseValidationResponse(BaseModel):
     license_info: Optional[LicenseResponse] = Field(None, description="授权信息")
     message: str = Field(..., description="验证消息")
     features: dict = Field({}, description="可用功能")
+    token: Optional[str] = Field(None, description="授权令牌（Ed25519 签名，客户端用公钥本地校验）")
+    token_expires_at: Optional[datetime] = Field(None, description="令牌过期时间")
+
+
+class LicensePublicKeyResponse(BaseModel):
+    algorithm: str = Field(..., description="签名算法")
+    key_id: str = Field(..., description="公钥指纹（令牌载荷中的 kid）")
+    public_key: str = Field(..., description="公钥（PEM）")
 
 
 class LicenseActivationBase(BaseModel):
@@ -145,3 +153,31 @@ class HeartbeatRequest(BaseModel):
     license_key: str = Field(..., description="授权密钥")
     hardware_fingerprint: str = Field(..., description="硬件指纹")
     usage_stats: Optional[LicenseUsageStats] = Field(None, description="使用统计")
+
+
+class LicenseUsagePoint(BaseModel):
+    period: str = Field(..., description="统计周期(UTC)：YYYY-MM-DD / YYYY-MM")
+    samples: int = Field(0, description="使用日志条数")
+    max_active_users: int = Field(0, description="活跃用户数峰值")
+    avg_active_users: float = Field(0.0, description="活跃用户数平均值")
+    max_active_coaches: int = Field(0, description="活跃教练数峰值")
+    avg_active_coaches: float = Field(0.0, description="活跃教练数平均值")
+    max_active_students: int = Field(0, description="活跃学员数峰值")
+    avg_active_students: float = Field(0.0, description="活跃学员数平均值")
+    max_bookings: int = Field(0, description="预约次数峰值")
+    avg_bookings: float = Field(0.0, description="预约次数平均值")
+    max_competitions: int = Field(0, description="比赛次数峰值")
+    avg_competitions: float = Field(0.0, description="比赛次数平均值")
+
+
+class LicenseQuotaViolation(BaseModel):
+    license_id: int
+    organization_name: str = Field(..., description="机构名称")
+    campus_id: int = Field(..., description="校区ID")
+    period: str = Field(..., description="统计周期(UTC)")
+    metric: str = Field(..., description="超限指标: active_users / active_coaches / active_students")
+    quota: int = Field(..., description="授权上限")
+    peak: int = Field(..., description="周期内峰值")
+    average: float = Field(0.0, description="周期内平均值")
+    overage_rate: Optional[float] = Field(None, description="超出比例")
+
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, validator
-from typing import Optional
-from datetime import datetime
+from typing import Optional, List, Dict
+from datetime import date, datetime
 from decimal import Decimal
 
 class PaymentBase(BaseModel):
@@ -78,6 +78,88 @@ class PaymentSummary(BaseModel):
     current_balance: Decimal
     payment_count: int
 
+class CampusPaymentSummary(BaseModel):
+    """校区支付汇总Schema"""
+    campus_id: Optional[int] = None
+    campus_name: Optional[str] = None
+    total_recharge: Decimal
+    total_expense: Decimal
+    total_refund: Decimal
+    net_amount: Decimal
+    payment_count: int
+
+class PaymentTimeseriesPoint(BaseModel):
+    """支付时间序列数据点"""
+    period: str  # day: YYYY-MM-DD, month: YYYY-MM
+    total_recharge: Decimal
+    total_expense: Decimal
+    total_refund: Decimal
+    net_amount: Decimal
+    payment_count: int
+
+class PaymentTimeseriesResponse(BaseModel):
+    """支付时间序列响应Schema"""
+    granularity: str
+    campus_id: Optional[int] = None
+    points: List[PaymentTimeseriesPoint]
+
+class LedgerAccountResponse(BaseModel):
+    """记账账户Schema"""
+    id: int
+    code: str
+    account_type: str
+    owner_id: Optional[int] = None
+    normal_side: str
+    balance: Decimal
+    entry_count: int
+    
+    class Config:
+        from_attributes = True
+
+class LedgerBalanceResponse(BaseModel):
+    """账户余额Schema（as_of 为空表示当前余额）"""
+    account_id: int
+    code: str
+    account_type: str
+    owner_id: Optional[int] = None
+    balance: Decimal
+    sequence: int
+    as_of: Optional[datetime] = None
+
+class JournalLineResponse(BaseModel):
+    """分录明细Schema"""
+    id: int
+    entry_id: int
+    account_id: int
+    sequence: int
+    debit: Decimal
+    credit: Decimal
+    posted_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ReconciliationItem(BaseModel):
+    """对账差异明细"""
+    transaction_id: str
+    statement_amount: Optional[Decimal] = None
+    payment_amount: Optional[Decimal] = None
+    payment_ids: List[int] = []
+    statement_lines: List[int] = []
+
+class ReconciliationReport(BaseModel):
+    """对账结果Schema（每类差异的明细最多 RECONCILIATION_MAX_DETAILS 条，truncated 表示有截断）"""
+    gateway: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    statement_rows: int
+    payment_rows: int
+    matched: int
+    matched_amount: Decimal
+    counts: Dict[str, int]
+    details: Dict[str, List[ReconciliationItem]]
+    truncated: bool
+
 class RefundRequest(BaseModel):
     """退款请求Schema"""
     amount: Decimal
@@ -135,6 +135,12 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # 访问令牌有效期(秒)
+
+class RefreshTokenRequest(BaseModel):
+    """刷新令牌请求Schema"""
+    refresh_token: str
 
 class PasswordChange(BaseModel):
     """密码修改Schema"""
@@ -0,0 +1,146 @@
+"""
+访问令牌与刷新令牌
+
+- 访问令牌携带用户ID、角色、校区、学员/教练ID和令牌版本，按角色鉴权时无需查库
+- 刷新令牌每次使用后轮换；已轮换的令牌被再次使用视为泄露，整个令牌家族（同一次登录）立即吊销
+- 用户角色/校区/状态变化或修改密码时令牌版本递增，旧的访问令牌和刷新令牌全部失效
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.security import TOKEN_TYPE_REFRESH, create_access_token, create_refresh_token, decode_token
+from ..models.coach import Coach
+from ..models.refresh_token import RefreshToken
+from ..models.student import Student
+from ..models.user import User
+from .background_job_service import BackgroundJobService
+
+PURGE_JOB_NAME = "refresh_token_purge"
+
+
+class AuthTokenService:
+    """令牌服务"""
+
+    @staticmethod
+    def issue_tokens(db: Session, user: User, family_id: Optional[str] = None) -> Dict[str, Any]:
+        """签发访问令牌和刷新令牌（新登录时创建新的令牌家族）"""
+        refresh_token, _ = AuthTokenService._new_refresh_token(db, user, family_id or str(uuid.uuid4()))
+        db.commit()
+        return AuthTokenService._token_pair(db, user, refresh_token)
+
+    @staticmethod
+    def refresh(db: Session, refresh_token: str) -> Tuple[User, Dict[str, Any]]:
+        """用刷新令牌换取新的令牌对，旧刷新令牌随即失效"""
+        payload = decode_token(refresh_token, TOKEN_TYPE_REFRESH)
+        if payload is None:
+            AuthTokenService._unauthorized("刷新令牌无效或已过期")
+
+        record = db.query(RefreshToken).filter(RefreshToken.jti == payload.get("jti")).first()
+        if record is None:
+            AuthTokenService._unauthorized("刷新令牌无效或已过期")
+
+        user = db.query(User).filter(User.id == record.user_id).first()
+        if user is None or not user.is_active or record.token_version != user.token_version:
+            AuthTokenService._revoke_family(db, record.family_id)
+            db.commit()
+            AuthTokenService._unauthorized("登录状态已失效，请重新登录")
+
+        now = datetime.now(timezone.utc)
+        new_token, new_record = AuthTokenService._new_refresh_token(db, user, record.family_id)
+        # 条件更新保证同一个刷新令牌只能成功轮换一次，并发重放只有一个请求能成功
+        rotated = db.query(RefreshToken).filter(
+            RefreshToken.id == record.id,
+            RefreshToken.revoked_at.is_(None)
+        ).update({"revoked_at": now, "replaced_by": new_record.jti}, synchronize_session=False)
+        if rotated != 1:
+            # 已轮换的令牌被再次使用：令牌可能已泄露，吊销整个家族
+            db.rollback()
+            AuthTokenService._revoke_family(db, record.family_id)
+            db.commit()
+            AuthTokenService._unauthorized("刷新令牌已被使用，请重新登录")
+        db.commit()
+        return user, AuthTokenService._token_pair(db, user, new_token)
+
+    @staticmethod
+    def revoke(db: Session, refresh_token: str) -> None:
+        """登出：吊销刷新令牌所在的家族（无效令牌直接忽略）"""
+        payload = decode_token(refresh_token, TOKEN_TYPE_REFRESH)
+        if payload and payload.get("fam"):
+            AuthTokenService._revoke_family(db, payload["fam"])
+            db.commit()
+
+    @staticmethod
+    def build_claims(db: Session, user: User) -> Dict[str, Any]:
+        """访问令牌中的用户声明"""
+        student_id = db.query(Student.id).filter(Student.user_id == user.id).scalar()
+        coach_id = db.query(Coach.id).filter(Coach.user_id == user.id).scalar()
+        return {
+            "uid": user.id,
+            "role": user.role.value,
+            "campus_id": user.campus_id,
+            "student_id": student_id,
+            "coach_id": coach_id,
+            "ver": user.token_version or 0,
+        }
+
+    @staticmethod
+    def purge_expired(db: Session, now: Optional[datetime] = None) -> int:
+        """删除已过期的刷新令牌"""
+        now = now or datetime.now(timezone.utc)
+        deleted = db.query(RefreshToken).filter(
+            RefreshToken.expires_at < now
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def purge_scheduled() -> Optional[int]:
+        """调度器入口"""
+        return BackgroundJobService.run_with_lease(PURGE_JOB_NAME, AuthTokenService.purge_expired)
+
+    @staticmethod
+    def _new_refresh_token(db: Session, user: User, family_id: str) -> Tuple[str, RefreshToken]:
+        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        record = RefreshToken(
+            jti=str(uuid.uuid4()),
+            family_id=family_id,
+            user_id=user.id,
+            token_version=user.token_version or 0,
+            expires_at=expires_at
+        )
+        db.add(record)
+        return create_refresh_token(user.id, record.jti, family_id, expires_at), record
+
+    @staticmethod
+    def _token_pair(db: Session, user: User, refresh_token: str) -> Dict[str, Any]:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        return {
+            "access_token": create_access_token(
+                subject=user.username,
+                expires_delta=expires_delta,
+                claims=AuthTokenService.build_claims(db, user)
+            ),
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+            "expires_in": int(expires_delta.total_seconds()),
+        }
+
+    @staticmethod
+    def _revoke_family(db: Session, family_id: str) -> None:
+        db.query(RefreshToken).filter(
+            RefreshToken.family_id == family_id,
+            RefreshToken.revoked_at.is_(None)
+        ).update({"revoked_at": datetime.now(timezone.utc)}, synchronize_session=False)
+
+    @staticmethod
+    def _unauthorized(detail: str):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=detail,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,190 @@
+"""
+教练空闲时间网格服务
+
+按固定时长（默认30分钟）把预约窗口切分为时间槽，每位教练每天用一个位图表示占用情况：
+第 i 位为 1 表示当天第 i 个时间槽已被待确认/已确认的预约占用。时间统一按UTC计算。
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..db.dialect import to_utc
+from ..models.booking import Booking, BookingStatus
+from ..models.coach import Coach
+from ..models.user import User
+from ..schemas.booking import AvailabilityDay, AvailabilityGridResponse, CoachAvailability
+
+ACTIVE_STATUSES = [BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]
+
+# coach_id -> (窗口起始日期, 整个窗口的占用位图)
+_grid_cache = TTLCache(ttl_seconds=settings.AVAILABILITY_CACHE_TTL_SECONDS)
+
+
+class AvailabilityService:
+    """教练空闲时间服务"""
+
+    @staticmethod
+    def slots_per_day() -> int:
+        return 24 * 60 // settings.AVAILABILITY_SLOT_MINUTES
+
+    @staticmethod
+    def window_days() -> int:
+        """窗口天数：今天 + 可预约的天数"""
+        return settings.BOOKING_WINDOW_DAYS + 1
+
+    @staticmethod
+    def _window_start(today: Optional[date] = None) -> date:
+        return today or datetime.now(timezone.utc).date()
+
+    @staticmethod
+    def _slot_range(window_start: date, start_time: datetime, end_time: datetime) -> Optional[tuple]:
+        """将时间段换算为窗口内的 [起始槽, 结束槽)，超出窗口的部分被裁剪"""
+        origin = datetime.combine(window_start, time.min, tzinfo=timezone.utc)
+        slot_seconds = settings.AVAILABILITY_SLOT_MINUTES * 60
+        total_slots = AvailabilityService.slots_per_day() * AvailabilityService.window_days()
+
+        start_offset = (to_utc(start_time) - origin).total_seconds()
+        end_offset = (to_utc(end_time) - origin).total_seconds()
+        first = max(int(start_offset // slot_seconds), 0)
+        # 结束时间向上取整，部分占用的时间槽也视为不可用
+        last = min(int(-(-end_offset // slot_seconds)), total_slots)
+        if first >= last:
+            return None
+        return first, last
+
+    @staticmethod
+    def _mark(bitmap: int, slot_range: Optional[tuple]) -> int:
+        if slot_range is None:
+            return bitmap
+        first, last = slot_range
+        return bitmap | (((1 << (last - first)) - 1) << first)
+
+    @staticmethod
+    def _build_grids(db: Session, coach_ids: List[int], window_start: date) -> Dict[int, int]:
+        """一次查询构建多位教练的占用位图"""
+        grids = {coach_id: 0 for coach_id in coach_ids}
+        if not coach_ids:
+            return grids
+
+        window_from = datetime.combine(window_start, time.min, tzinfo=timezone.utc)
+        window_to = window_from + timedelta(days=AvailabilityService.window_days())
+        rows = db.query(Booking.coach_id, Booking.start_time, Booking.end_time).filter(
+            Booking.coach_id.in_(coach_ids),
+            Booking.status.in_(ACTIVE_STATUSES),
+            Booking.start_time < window_to,
+            Booking.end_time > window_from
+        ).all()
+
+        for coach_id, start_time, end_time in rows:
+            grids[coach_id] = AvailabilityService._mark(
+                grids[coach_id],
+                AvailabilityService._slot_range(window_start, start_time, end_time)
+            )
+        return grids
+
+    @staticmethod
+    def _get_grids(db: Session, coach_ids: Iterable[int], today: Optional[date] = None) -> Dict[int, int]:
+        """读取占用位图，未命中缓存的教练合并为一次查询"""
+        window_start = AvailabilityService._window_start(today)
+        grids: Dict[int, int] = {}
+        missing = []
+        for coach_id in coach_ids:
+            cached = _grid_cache.get(coach_id)
+            if cached is not None and cached[0] == window_start:
+                grids[coach_id] = cached[1]
+            else:
+                missing.append(coach_id)
+
+        if missing:
+            built = AvailabilityService._build_grids(db, missing, window_start)
+            for coach_id, bitmap in built.items():
+                _grid_cache.set(coach_id, (window_start, bitmap))
+            grids.update(built)
+        return grids
+
+    @staticmethod
+    def _split_days(bitmap: int, window_start: date) -> List[AvailabilityDay]:
+        """把整个窗口的位图拆分为每天一个十六进制位图"""
+        per_day = AvailabilityService.slots_per_day()
+        day_mask = (1 << per_day) - 1
+        width = -(-per_day // 4)
+        days = []
+        for offset in range(AvailabilityService.window_days()):
+            day_bits = (bitmap >> (offset * per_day)) & day_mask
+            days.append(AvailabilityDay(
+                date=window_start + timedelta(days=offset),
+                busy_bitmap=format(day_bits, f"0{width}x")
+            ))
+        return days
+
+    @staticmethod
+    def _response(coaches: List[CoachAvailability], window_start: date) -> AvailabilityGridResponse:
+        return AvailabilityGridResponse(
+            window_start=window_start,
+            window_days=AvailabilityService.window_days(),
+            slot_minutes=settings.AVAILABILITY_SLOT_MINUTES,
+            slots_per_day=AvailabilityService.slots_per_day(),
+            coaches=coaches
+        )
+
+    @staticmethod
+    def get_coach_availability(db: Session, coach_id: int) -> AvailabilityGridResponse:
+        """获取单个教练的空闲时间网格"""
+        window_start = AvailabilityService._window_start()
+        bitmap = AvailabilityService._get_grids(db, [coach_id], window_start)[coach_id]
+        coach = CoachAvailability(
+            coach_id=coach_id,
+            days=AvailabilityService._split_days(bitmap, window_start)
+        )
+        return AvailabilityService._response([coach], window_start)
+
+    @staticmethod
+    def get_campus_availability(db: Session, campus_id: int) -> AvailabilityGridResponse:
+        """获取校区内所有已审核教练的空闲时间网格"""
+        window_start = AvailabilityService._window_start()
+        coaches = db.query(Coach.id, User.real_name, Coach.hourly_rate).join(
+            User, Coach.user_id == User.id
+        ).filter(
+            User.campus_id == campus_id,
+            Coach.approval_status == "approved"
+        ).order_by(Coach.id).all()
+
+        grids = AvailabilityService._get_grids(db, [c.id for c in coaches], window_start)
+        result = [
+            CoachAvailability(
+                coach_id=coach_id,
+                coach_name=real_name,
+                hourly_rate=hourly_rate,
+                days=AvailabilityService._split_days(grids[coach_id], window_start)
+            )
+            for coach_id, real_name, hourly_rate in coaches
+        ]
+        return AvailabilityService._response(result, window_start)
+
+    @staticmethod
+    def on_booking_changed(booking: Booking) -> None:
+        """预约状态变化时更新缓存
+
+        新增占用直接写入缓存位图；释放占用（拒绝/取消/完成）时使缓存失效，下次读取重建。
+        """
+        if booking.status not in ACTIVE_STATUSES:
+            _grid_cache.invalidate(booking.coach_id)
+            return
+
+        cached = _grid_cache.get(booking.coach_id)
+        if cached is None:
+            return
+        window_start, bitmap = cached
+        bitmap = AvailabilityService._mark(
+            bitmap,
+            AvailabilityService._slot_range(window_start, booking.start_time, booking.end_time)
+        )
+        _grid_cache.set(booking.coach_id, (window_start, bitmap))
+
+    @staticmethod
+    def invalidate(coach_ids: Iterable[int]) -> None:
+        """使指定教练的缓存失效"""
+        _grid_cache.invalidate_many(coach_ids)
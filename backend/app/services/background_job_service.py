@@ -0,0 +1,103 @@
+"""
+后台任务租约与游标管理
+"""
+import json
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.database import SessionLocal
+from ..models.background_job import BackgroundJob
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class BackgroundJobService:
+    """后台任务服务
+
+    多个工作进程/主机同时运行调度器时，通过租约行保证任务互斥：
+    只有租约过期或已由自己持有时，条件 UPDATE 才会成功。
+    """
+
+    @staticmethod
+    def acquire_lease(db: Session, name: str, owner: str = WORKER_ID, lease_seconds: Optional[int] = None) -> bool:
+        """尝试获取任务租约"""
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=lease_seconds or settings.BACKGROUND_JOB_LEASE_SECONDS)
+
+        updated = db.query(BackgroundJob).filter(
+            BackgroundJob.name == name,
+            or_(
+                BackgroundJob.lease_expires_at.is_(None),
+                BackgroundJob.lease_expires_at < now,
+                BackgroundJob.owner == owner
+            )
+        ).update({"owner": owner, "lease_expires_at": expires_at}, synchronize_session=False)
+        db.commit()
+        if updated:
+            return True
+
+        if db.query(BackgroundJob.name).filter(BackgroundJob.name == name).first():
+            return False
+
+        # 首次运行，插入租约行；并发插入时由主键冲突决定胜者
+        try:
+            db.add(BackgroundJob(name=name, owner=owner, lease_expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    @staticmethod
+    def release_lease(db: Session, name: str, result: Any = None, owner: str = WORKER_ID) -> None:
+        """释放租约并记录运行结果"""
+        db.query(BackgroundJob).filter(
+            BackgroundJob.name == name,
+            BackgroundJob.owner == owner
+        ).update({
+            "lease_expires_at": None,
+            "last_run_at": datetime.now(timezone.utc),
+            "last_result": json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+        }, synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def get_cursor(db: Session, name: str) -> Optional[str]:
+        """读取增量处理游标"""
+        row = db.query(BackgroundJob.cursor).filter(BackgroundJob.name == name).first()
+        return row[0] if row else None
+
+    @staticmethod
+    def set_cursor(db: Session, name: str, cursor: str) -> None:
+        """更新增量处理游标（不提交，随业务数据一起提交）"""
+        db.query(BackgroundJob).filter(BackgroundJob.name == name).update(
+            {"cursor": cursor}, synchronize_session=False
+        )
+
+    @staticmethod
+    def run_with_lease(name: str, func: Callable[[Session], Any], lease_seconds: Optional[int] = None) -> Any:
+        """在租约保护下执行任务，未获得租约时直接跳过
+
+        供调度器调用：自行创建数据库会话，返回任务结果（跳过时返回 None）。
+        """
+        db = SessionLocal()
+        try:
+            if not BackgroundJobService.acquire_lease(db, name, lease_seconds=lease_seconds):
+                return None
+            try:
+                result = func(db)
+            except Exception:
+                db.rollback()
+                BackgroundJobService.release_lease(db, name)
+                raise
+            BackgroundJobService.release_lease(db, name, result)
+            return result
+        finally:
+            db.close()
@@ -0,0 +1,144 @@
+"""
+预约生命周期后台任务
+
+- 已确认且结束时间已过的预约 -> 已完成
+- 待确认且开始时间已过的预约 -> 系统自动拒绝
+状态迁移使用集合式 UPDATE ... WHERE status = 原状态，重复执行不会产生副作用。
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.booking import Booking, BookingStatus
+from ..models.coach import Coach
+from ..models.notification import Notification, NotificationPriority, NotificationType
+from ..models.student import Student
+from .availability_service import AvailabilityService
+from .background_job_service import BackgroundJobService
+from .booking_stats_service import BookingStatsService
+
+JOB_NAME = "booking_lifecycle"
+AUTO_REJECT_MESSAGE = "教练未在开课前确认，系统自动拒绝"
+
+
+class BookingLifecycleService:
+    """预约生命周期服务"""
+
+    @staticmethod
+    def run_once(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """执行一轮状态迁移，返回各类迁移数量"""
+        now = now or datetime.now(timezone.utc)
+        batch_size = batch_size or settings.BOOKING_LIFECYCLE_BATCH_SIZE
+
+        completed = BookingLifecycleService._transition(
+            db,
+            from_status=BookingStatus.CONFIRMED.value,
+            to_status=BookingStatus.COMPLETED.value,
+            time_column=Booking.end_time,
+            now=now,
+            batch_size=batch_size
+        )
+        expired = BookingLifecycleService._transition(
+            db,
+            from_status=BookingStatus.PENDING.value,
+            to_status=BookingStatus.REJECTED.value,
+            time_column=Booking.start_time,
+            now=now,
+            batch_size=batch_size,
+            response_message=AUTO_REJECT_MESSAGE
+        )
+        return {"completed": completed, "expired": expired}
+
+    @staticmethod
+    def run_scheduled() -> Optional[Dict[str, int]]:
+        """调度器入口，多进程下由租约保证只有一个进程执行"""
+        return BackgroundJobService.run_with_lease(JOB_NAME, BookingLifecycleService.run_once)
+
+    @staticmethod
+    def _transition(
+        db: Session,
+        from_status: str,
+        to_status: str,
+        time_column,
+        now: datetime,
+        batch_size: int,
+        response_message: Optional[str] = None
+    ) -> int:
+        """按 (status, 时间) 索引分批迁移，每批一个事务"""
+        total = 0
+        while True:
+            batch_ids = [
+                row[0] for row in db.query(Booking.id).filter(
+                    Booking.status == from_status,
+                    time_column <= now
+                ).order_by(time_column).limit(batch_size).all()
+            ]
+            if not batch_ids:
+                break
+
+            values = {"status": to_status, "updated_at": now}
+            if response_message:
+                values["response_message"] = response_message
+            # WHERE 中重复校验原状态，并发或重复执行时只会迁移一次
+            updated = db.execute(
+                update(Booking)
+                .where(Booking.id.in_(batch_ids), Booking.status == from_status)
+                .values(**values)
+                .returning(Booking.id, Booking.coach_id, Booking.start_time)
+            ).all()
+            updated_ids = [row[0] for row in updated]
+
+            if updated_ids:
+                BookingLifecycleService._notify(db, updated_ids, to_status, now)
+                # 汇总表与状态迁移在同一事务中更新
+                BookingStatsService.refresh(db, [
+                    BookingStatsService.key_for(row[1], row[2]) for row in updated
+                ])
+            db.commit()
+
+            AvailabilityService.invalidate({row[1] for row in updated})
+            total += len(updated_ids)
+
+            if len(batch_ids) < batch_size:
+                break
+        return total
+
+    @staticmethod
+    def _notify(db: Session, booking_ids: List[int], to_status: str, now: datetime) -> None:
+        """批量写入站内通知"""
+        rows = db.query(
+            Booking.id, Booking.start_time, Student.user_id, Coach.user_id
+        ).join(
+            Student, Booking.student_id == Student.id
+        ).join(
+            Coach, Booking.coach_id == Coach.id
+        ).filter(Booking.id.in_(booking_ids)).all()
+
+        notifications = []
+        for booking_id, start_time, student_user_id, coach_user_id in rows:
+            start_text = start_time.strftime('%Y-%m-%d %H:%M')
+            if to_status == BookingStatus.COMPLETED.value:
+                title, content = "课程已完成", f"您 {start_text} 的课程已完成，欢迎对本次课程进行评价"
+                recipients = [student_user_id, coach_user_id]
+            else:
+                title, content = "预约已自动取消", f"您 {start_text} 的预约因教练未及时确认已被系统自动拒绝"
+                recipients = [student_user_id]
+
+            for recipient_id in recipients:
+                notifications.append({
+                    "title": title,
+                    "content": content,
+                    "type": NotificationType.BOOKING.value,
+                    "priority": NotificationPriority.NORMAL.value,
+                    "recipient_id": recipient_id,
+                    "resource_type": "booking",
+                    "resource_id": booking_id,
+                    "scheduled_at": now,
+                    "sent_at": now
+                })
+
+        if notifications:
+            db.execute(insert(Notification), notifications)
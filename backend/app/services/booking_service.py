@@ -9,8 +9,16 @@ from ..models.user import User, UserRole
 from ..models.coach import Coach
 from ..models.student import Student
 from ..models.comment import Comment
-from ..schemas.booking import BookingCreate, BookingUpdate, BookingCancellation
+from ..models.system_log import SystemLog
+from ..schemas.booking import (
+    BookingCreate, BookingUpdate, BookingCancellation,
+    BookingBulkCreate, BookingBulkResponse, BookingSlotResult, MAX_BULK_SLOT_HOURS
+)
 from ..services.system_log_service import SystemLogService
+from ..services.availability_service import AvailabilityService
+from ..services.booking_stats_service import BookingStatsService
+from ..core.config import settings
+from ..db.dialect import to_utc
 # PaymentService 将在方法中按需导入以避免循环导入
 
 class BookingService:
@@ -19,11 +27,7 @@ class BookingService:
     @staticmethod
     def _to_utc(dt: datetime) -> datetime:
         """将时间统一转换为UTC时区"""
-        if dt is None:
-            return None
-        if dt.tzinfo is None:
-            return dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
+        return to_utc(dt)
 
     @staticmethod
     def create_booking(db: Session, booking_data: BookingCreate, current_user: User) -> Booking:
@@ -68,7 +72,7 @@ class BookingService:
             )
         
         # 验证预约时间（不能超过7天）
-        if start_utc > now_utc + timedelta(days=7):
+        if start_utc > now_utc + timedelta(days=settings.BOOKING_WINDOW_DAYS):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="只能预约7天内的课程"
@@ -108,6 +112,8 @@ class BookingService:
         db.add(booking)
         db.commit()
         db.refresh(booking)
+        AvailabilityService.on_booking_changed(booking)
+        BookingStatsService.sync(db, [BookingStatsService.key_for(booking.coach_id, start_utc)])
         
         # 记录系统日志
         SystemLogService.log_action(
@@ -121,6 +127,216 @@ class BookingService:
         
         return booking
     
+    @staticmethod
+    def create_bulk_bookings(db: Session, bulk_data: BookingBulkCreate, current_user: User) -> BookingBulkResponse:
+        """批量/周期创建课程预约
+
+        - 所有时间段的冲突检查合并为一次区间查询
+        - 球台占用一次性加载后在内存中分配
+        - 余额只查询一次，按时间顺序预留总费用
+        - 所有预约在同一事务中写入，逐个返回成功/失败结果
+        """
+        slots = BookingService._expand_bulk_slots(bulk_data)
+
+        coach = db.query(Coach).filter(Coach.id == bulk_data.coach_id).first()
+        if not coach:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="教练不存在"
+            )
+
+        student = db.query(Student).filter(Student.user_id == current_user.id).first()
+        if not student:
+            student = Student(user_id=current_user.id)
+            db.add(student)
+            db.flush()
+
+        now_utc = datetime.now(timezone.utc)
+        latest_start = now_utc + timedelta(days=settings.RECURRING_BOOKING_WINDOW_DAYS)
+        failures: Dict[int, str] = {}
+
+        # 基本校验（时间合法性、预约窗口、批内重叠）
+        accepted_end = None
+        for index, start_utc, end_utc, _ in sorted(slots, key=lambda slot: slot[1]):
+            if end_utc <= start_utc:
+                failures[index] = "结束时间必须晚于开始时间"
+            elif end_utc - start_utc > timedelta(hours=MAX_BULK_SLOT_HOURS):
+                failures[index] = f"单个时间段不能超过{MAX_BULK_SLOT_HOURS}小时"
+            elif start_utc <= now_utc:
+                failures[index] = "不能预约过去的时间"
+            elif start_utc > latest_start:
+                failures[index] = f"只能预约{settings.RECURRING_BOOKING_WINDOW_DAYS}天内的课程"
+            elif accepted_end is not None and start_utc < accepted_end:
+                failures[index] = "与本次提交的其他时间段重叠"
+            else:
+                accepted_end = end_utc
+
+        candidates = [slot for slot in slots if slot[0] not in failures]
+        if candidates:
+            range_start = min(slot[1] for slot in candidates)
+            range_end = max(slot[2] for slot in candidates)
+
+            # 一次区间查询检查教练时间冲突
+            coach_busy = db.query(Booking.start_time, Booking.end_time).filter(
+                Booking.coach_id == coach.id,
+                Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]),
+                Booking.start_time < range_end,
+                Booking.end_time > range_start
+            ).all()
+            coach_busy = [(BookingService._to_utc(s), BookingService._to_utc(e)) for s, e in coach_busy]
+            for index, start_utc, end_utc, _ in candidates:
+                if any(s < end_utc and e > start_utc for s, e in coach_busy):
+                    failures[index] = "该时间段已有预约冲突"
+
+        candidates = [slot for slot in candidates if slot[0] not in failures]
+        assigned_tables: Dict[int, Optional[str]] = {}
+        if candidates:
+            # 一次加载校区球台占用，在内存中逐个分配
+            occupancy = db.query(Booking.table_number, Booking.start_time, Booking.end_time).filter(
+                Booking.campus_id == bulk_data.campus_id,
+                Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]),
+                Booking.start_time < max(slot[2] for slot in candidates),
+                Booking.end_time > min(slot[1] for slot in candidates),
+                Booking.table_number.isnot(None)
+            ).all()
+            occupancy = [
+                (table, BookingService._to_utc(s), BookingService._to_utc(e))
+                for table, s, e in occupancy
+            ]
+            for index, start_utc, end_utc, requested_table in candidates:
+                occupied = {t for t, s, e in occupancy if s < end_utc and e > start_utc}
+                if requested_table:
+                    if requested_table in occupied:
+                        failures[index] = "指定球台已被占用"
+                        continue
+                    table_number = requested_table
+                else:
+                    table_number = next(
+                        (t for t in BookingService._table_numbers() if t not in occupied), None
+                    )
+                assigned_tables[index] = table_number
+                if table_number:
+                    occupancy.append((table_number, start_utc, end_utc))
+
+        # 余额只查询一次，按时间顺序预留
+        from ..services.payment_service import PaymentService
+        candidates = sorted(
+            [slot for slot in candidates if slot[0] not in failures], key=lambda slot: slot[1]
+        )
+        available_balance = PaymentService.get_user_balance(db, current_user.id) if candidates else Decimal("0")
+        reserved = Decimal("0")
+        bookings: Dict[int, Booking] = {}
+        for index, start_utc, end_utc, _ in candidates:
+            duration_hours = BookingService._duration_hours(start_utc, end_utc)
+            cost = (coach.hourly_rate * duration_hours).quantize(Decimal("0.01"))
+            if reserved + cost > available_balance:
+                failures[index] = "账户余额不足，请先充值"
+                continue
+            reserved += cost
+            bookings[index] = Booking(
+                coach_id=coach.id,
+                student_id=student.id,
+                campus_id=bulk_data.campus_id,
+                start_time=start_utc,
+                end_time=end_utc,
+                duration_hours=duration_hours,
+                table_number=assigned_tables.get(index),
+                hourly_rate=coach.hourly_rate,
+                total_cost=cost,
+                status=BookingStatus.PENDING.value,
+                booking_message=bulk_data.booking_message
+            )
+
+        # 单事务写入
+        booking_ids: Dict[int, int] = {}
+        if bookings:
+            db.add_all(bookings.values())
+            db.flush()
+            booking_ids = {index: booking.id for index, booking in bookings.items()}
+            db.add(SystemLog(
+                user_id=current_user.id,
+                action="booking_bulk_create",
+                target_type="booking",
+                description=f"批量创建预约: {len(bookings)}个时间段, 教练ID {coach.id}",
+                extra_data=",".join(str(booking_id) for booking_id in booking_ids.values())
+            ))
+        db.commit()
+        if bookings:
+            AvailabilityService.invalidate([coach.id])
+            BookingStatsService.sync(db, [
+                BookingStatsService.key_for(coach.id, start_utc)
+                for index, start_utc, _, _ in slots if index in booking_ids
+            ])
+
+        results = []
+        for index, start_utc, end_utc, _ in slots:
+            results.append(BookingSlotResult(
+                index=index,
+                start_time=start_utc,
+                end_time=end_utc,
+                success=index in booking_ids,
+                booking_id=booking_ids.get(index),
+                table_number=assigned_tables.get(index) if index in booking_ids else None,
+                message=failures.get(index)
+            ))
+
+        return BookingBulkResponse(
+            total=len(slots),
+            succeeded=len(booking_ids),
+            failed=len(slots) - len(booking_ids),
+            total_cost=reserved,
+            results=results
+        )
+
+    @staticmethod
+    def _expand_bulk_slots(bulk_data: BookingBulkCreate) -> List[tuple]:
+        """将显式时间段或周期规则展开为 (序号, 开始, 结束, 指定球台) 列表"""
+        if (bulk_data.slots is None) == (bulk_data.recurrence is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="slots 与 recurrence 必须且只能提供一个"
+            )
+
+        # 先按数量检查上限再展开，避免超大的重复次数构造出海量时间段
+        count = bulk_data.recurrence.occurrences if bulk_data.recurrence is not None else len(bulk_data.slots)
+        if count < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="至少需要一个预约时间段"
+            )
+        if count > settings.BULK_BOOKING_MAX_SLOTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"单次最多批量预约{settings.BULK_BOOKING_MAX_SLOTS}个时间段"
+            )
+
+        if bulk_data.recurrence is not None:
+            rule = bulk_data.recurrence
+            if rule.interval_days < 1 or rule.duration_hours <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="无效的周期预约规则"
+                )
+            first_start = BookingService._to_utc(rule.first_start_time)
+            duration = timedelta(hours=float(rule.duration_hours))
+            slots = [
+                (i, first_start + timedelta(days=rule.interval_days * i), None)
+                for i in range(rule.occurrences)
+            ]
+            slots = [(i, start, start + duration, table) for i, start, table in slots]
+        else:
+            slots = [
+                (i, BookingService._to_utc(slot.start_time), BookingService._to_utc(slot.end_time), slot.table_number)
+                for i, slot in enumerate(bulk_data.slots)
+            ]
+        return slots
+
+    @staticmethod
+    def _duration_hours(start_time: datetime, end_time: datetime) -> Decimal:
+        """计算预约时长（小时，保留一位小数）"""
+        hours = Decimal((end_time - start_time).total_seconds()) / Decimal(3600)
+        return hours.quantize(Decimal("0.1"))
+
     @staticmethod
     def _check_time_conflict(db: Session, booking_data: BookingCreate) -> bool:
         """检查时间冲突"""
@@ -151,14 +367,18 @@ class BookingService:
         
         occupied_set = {table[0] for table in occupied_tables if table[0]}
         
-        # 简单的球台分配逻辑（1-20号球台）
-        for i in range(1, 21):
-            table_num = f"桌{i:02d}"
+        # 简单的球台分配逻辑（按编号顺序取第一个空闲球台）
+        for table_num in BookingService._table_numbers():
             if table_num not in occupied_set:
                 return table_num
         
         # 如果都被占用，返回None让用户手动选择
         return None
+
+    @staticmethod
+    def _table_numbers() -> List[str]:
+        """校区球台编号列表"""
+        return [f"桌{i:02d}" for i in range(1, settings.CAMPUS_TABLE_COUNT + 1)]
     
     @staticmethod
     def confirm_booking(db: Session, booking_id: int, action: str, current_user: User, message: Optional[str] = None) -> Booking:
@@ -181,7 +401,7 @@ class BookingService:
         if action == "confirm":
             # 确认预约 - 扣费
             from ..services.payment_service import PaymentService
-            if not PaymentService.deduct_balance(db, booking.student.user_id, booking.total_cost, f"课程预约费用 - 预约ID: {booking.id}"):
+            if not PaymentService.deduct_balance(db, booking.student.user_id, booking.total_cost, f"课程预约费用 - 预约ID: {booking.id}", booking.campus_id):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="扣费失败，账户余额不足"
@@ -197,6 +417,8 @@ class BookingService:
         
         booking.response_message = message
         db.commit()
+        AvailabilityService.on_booking_changed(booking)
+        BookingStatsService.sync(db, [BookingStatsService.key_for(booking.coach_id, BookingService._to_utc(booking.start_time))])
         
         # 记录系统日志
         SystemLogService.log_action(
@@ -254,9 +476,11 @@ class BookingService:
         # 如果已确认的预约被取消，需要退费
         if original_status == BookingStatus.CONFIRMED.value:
             from ..services.payment_service import PaymentService
-            PaymentService.refund_balance(db, booking.student.user_id, booking.total_cost, f"预约取消退费 - 预约ID: {booking.id}")
+            PaymentService.refund_balance(db, booking.student.user_id, booking.total_cost, f"预约取消退费 - 预约ID: {booking.id}", booking.campus_id)
         
         db.commit()
+        AvailabilityService.on_booking_changed(booking)
+        BookingStatsService.sync(db, [BookingStatsService.key_for(booking.coach_id, start_time_utc)])
         
         # 记录系统日志
         SystemLogService.log_action(
@@ -338,7 +562,11 @@ class BookingService:
     @staticmethod
     def get_coach_schedule(db: Session, coach_id: int, date_from: datetime, date_to: datetime) -> List[Dict[str, Any]]:
         """获取教练课表"""
-        bookings = db.query(Booking).filter(
+        from sqlalchemy.orm import joinedload
+
+        bookings = db.query(Booking).options(
+            joinedload(Booking.student).joinedload(Student.user)
+        ).filter(
             Booking.coach_id == coach_id,
             Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]),
             Booking.start_time >= date_from,
@@ -372,12 +600,11 @@ class BookingService:
         
         occupied_set = {table[0] for table in occupied_tables if table[0]}
         
-        # 返回所有可用球台（1-20号球台）
-        available_tables = []
-        for i in range(1, 21):
-            table_num = f"桌{i:02d}"
-            if table_num not in occupied_set:
-                available_tables.append(table_num)
+        # 返回所有可用球台
+        available_tables = [
+            table_num for table_num in BookingService._table_numbers()
+            if table_num not in occupied_set
+        ]
         
         return available_tables
     
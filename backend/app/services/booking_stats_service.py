@@ -0,0 +1,303 @@
+"""
+预约统计服务
+
+按 (校区, 教练, 日期, 状态) 维护预约日汇总表 booking_daily_stats：
+预约状态变化后只重算受影响的 (教练, 日期)，月度统计直接读取汇总表，不再扫描 bookings。
+"""
+import calendar
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.dialect import date_bucket
+from ..models.booking import Booking, BookingStatus
+from ..models.booking_stat import BookingDailyStat
+from ..models.coach import Coach
+from ..models.student import Student
+from ..models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# 计入收入与课时的状态
+BILLABLE_STATUSES = (BookingStatus.CONFIRMED.value, BookingStatus.COMPLETED.value)
+# 单次重算的 (教练, 日期) 数量上限，避免 OR 条件过长
+REFRESH_CHUNK_SIZE = 200
+
+StatKey = Tuple[int, date]
+
+
+class BookingStatsService:
+    """预约统计服务"""
+
+    @staticmethod
+    def key_for(coach_id: int, start_time: datetime) -> StatKey:
+        """预约对应的汇总键 (教练ID, UTC日期)"""
+        if start_time.tzinfo is not None:
+            start_time = start_time.astimezone(timezone.utc)
+        return coach_id, start_time.date()
+
+    @staticmethod
+    def refresh(db: Session, keys: Iterable[StatKey]) -> None:
+        """重算指定 (教练, 日期) 的汇总行（不提交）"""
+        keys = sorted(set(keys))
+        for offset in range(0, len(keys), REFRESH_CHUNK_SIZE):
+            chunk = keys[offset:offset + REFRESH_CHUNK_SIZE]
+            db.execute(delete(BookingDailyStat).where(or_(*[
+                and_(BookingDailyStat.coach_id == coach_id, BookingDailyStat.day == day)
+                for coach_id, day in chunk
+            ])))
+
+            booking_filter = or_(*[
+                and_(
+                    Booking.coach_id == coach_id,
+                    Booking.start_time >= BookingStatsService._day_start(day),
+                    Booking.start_time < BookingStatsService._day_start(day + timedelta(days=1))
+                )
+                for coach_id, day in chunk
+            ])
+            BookingStatsService._insert_aggregates(db, booking_filter)
+
+    @staticmethod
+    def sync(db: Session, keys: Iterable[StatKey]) -> None:
+        """预约写入提交后同步汇总表
+
+        汇总表可随时通过 backfill 重建，这里失败只记录日志，不影响预约本身。
+        并发重算同一键时可能出现唯一约束冲突，重试一次即可读到对方提交后的数据。
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        for _ in range(2):
+            try:
+                BookingStatsService.refresh(db, keys)
+                db.commit()
+                return
+            except IntegrityError:
+                db.rollback()
+            except Exception:
+                db.rollback()
+                logger.exception("预约日汇总更新失败")
+                return
+        logger.warning("预约日汇总并发冲突，稍后可通过回填修复: %s", sorted(keys))
+
+    @staticmethod
+    def backfill(db: Session, date_from: date, date_to: date) -> int:
+        """按月分段重建 [date_from, date_to] 的汇总数据，返回处理的天数"""
+        if date_from > date_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="开始日期不能晚于结束日期"
+            )
+
+        chunk_start = date_from
+        while chunk_start <= date_to:
+            last_day = calendar.monthrange(chunk_start.year, chunk_start.month)[1]
+            chunk_end = min(date(chunk_start.year, chunk_start.month, last_day), date_to)
+
+            db.execute(delete(BookingDailyStat).where(
+                BookingDailyStat.day >= chunk_start,
+                BookingDailyStat.day <= chunk_end
+            ))
+            BookingStatsService._insert_aggregates(db, and_(
+                Booking.start_time >= BookingStatsService._day_start(chunk_start),
+                Booking.start_time < BookingStatsService._day_start(chunk_end + timedelta(days=1))
+            ))
+            db.commit()
+            chunk_start = chunk_end + timedelta(days=1)
+
+        return (date_to - date_from).days + 1
+
+    @staticmethod
+    def get_monthly_statistics(db: Session, year: int, month: int, current_user: User,
+                               campus_id: Optional[int] = None) -> Dict[str, Any]:
+        """月度预约统计，按角色限定范围"""
+        if not 2000 <= year <= 2100:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="年份无效"
+            )
+        days_in_month = calendar.monthrange(year, month)[1]
+        month_start = date(year, month, 1)
+        month_end = date(year, month, days_in_month)
+
+        if current_user.role == UserRole.STUDENT:
+            return BookingStatsService._student_monthly_statistics(db, year, month, current_user)
+
+        coach_id = None
+        if current_user.role == UserRole.COACH:
+            coach = db.query(Coach).filter(Coach.user_id == current_user.id).first()
+            if not coach:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="教练信息不存在"
+                )
+            coach_id = coach.id
+            campus_id = None
+        elif current_user.role == UserRole.CAMPUS_ADMIN:
+            if current_user.campus_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="校区管理员未分配校区"
+                )
+            campus_id = current_user.campus_id
+
+        query = db.query(
+            BookingDailyStat.campus_id,
+            BookingDailyStat.coach_id,
+            BookingDailyStat.status,
+            func.sum(BookingDailyStat.booking_count),
+            func.sum(BookingDailyStat.total_hours),
+            func.sum(BookingDailyStat.total_revenue)
+        ).filter(
+            BookingDailyStat.day >= month_start,
+            BookingDailyStat.day <= month_end
+        )
+        if campus_id is not None:
+            query = query.filter(BookingDailyStat.campus_id == campus_id)
+        if coach_id is not None:
+            query = query.filter(BookingDailyStat.coach_id == coach_id)
+        rows = query.group_by(
+            BookingDailyStat.campus_id, BookingDailyStat.coach_id, BookingDailyStat.status
+        ).all()
+
+        result = BookingStatsService._summarize(year, month, [
+            (row[2], row[3], row[4], row[5]) for row in rows
+        ])
+        result["campus_id"] = campus_id
+        result["coach_id"] = coach_id
+
+        # 教练利用率 = 已确认/已完成课时 / 当月可排课时
+        available_hours = Decimal(settings.BOOKING_OPEN_HOURS_PER_DAY * days_in_month)
+        coach_hours: Dict[int, Decimal] = {}
+        campus_ids: Set[int] = set()
+        for row_campus_id, row_coach_id, row_status, _, hours, _ in rows:
+            coach_hours.setdefault(row_coach_id, Decimal("0"))
+            campus_ids.add(row_campus_id)
+            if row_status in BILLABLE_STATUSES:
+                coach_hours[row_coach_id] += Decimal(hours or 0)
+
+        coach_names = dict(db.query(Coach.id, User.real_name).join(
+            User, Coach.user_id == User.id
+        ).filter(Coach.id.in_(list(coach_hours))).all()) if coach_hours else {}
+
+        result["coach_utilization"] = [
+            {
+                "coach_id": stat_coach_id,
+                "coach_name": coach_names.get(stat_coach_id),
+                "booked_hours": hours,
+                "available_hours": available_hours,
+                "utilization_rate": BookingStatsService._ratio(hours, available_hours)
+            }
+            for stat_coach_id, hours in sorted(coach_hours.items(), key=lambda item: -item[1])
+        ]
+
+        # 球台占用率 = 已确认/已完成课时 / (球台数 × 当月营业时长)，教练视角不统计
+        if coach_id is None:
+            campus_count = 1 if campus_id is not None else max(len(campus_ids), 1)
+            table_hours = available_hours * settings.CAMPUS_TABLE_COUNT * campus_count
+            result["table_occupancy"] = {
+                "table_count": settings.CAMPUS_TABLE_COUNT * campus_count,
+                "booked_hours": result["booked_hours"],
+                "available_hours": table_hours,
+                "occupancy_rate": BookingStatsService._ratio(result["booked_hours"], table_hours)
+            }
+        return result
+
+    @staticmethod
+    def _student_monthly_statistics(db: Session, year: int, month: int, current_user: User) -> Dict[str, Any]:
+        """学员只统计自己的预约，直接按学员聚合"""
+        student = db.query(Student).filter(Student.user_id == current_user.id).first()
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="学员信息不存在"
+            )
+
+        month_start = date(year, month, 1)
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        rows = db.query(
+            Booking.status,
+            func.count(Booking.id),
+            func.sum(Booking.duration_hours),
+            func.sum(Booking.total_cost)
+        ).filter(
+            Booking.student_id == student.id,
+            Booking.start_time >= BookingStatsService._day_start(month_start),
+            Booking.start_time < BookingStatsService._day_start(next_month)
+        ).group_by(Booking.status).all()
+
+        result = BookingStatsService._summarize(year, month, rows)
+        result["student_id"] = student.id
+        return result
+
+    @staticmethod
+    def _summarize(year: int, month: int, rows: Iterable[tuple]) -> Dict[str, Any]:
+        """将 (状态, 数量, 课时, 金额) 行汇总为统计结果"""
+        by_status = {item.value: 0 for item in BookingStatus}
+        booked_hours = Decimal("0")
+        revenue = Decimal("0")
+        for row_status, count, hours, amount in rows:
+            by_status[row_status] = by_status.get(row_status, 0) + int(count or 0)
+            if row_status in BILLABLE_STATUSES:
+                booked_hours += Decimal(hours or 0)
+                revenue += Decimal(amount or 0)
+
+        total = sum(by_status.values())
+        cancelled = by_status.get(BookingStatus.CANCELLED.value, 0)
+        return {
+            "year": year,
+            "month": month,
+            "total_bookings": total,
+            "by_status": by_status,
+            "booked_hours": booked_hours,
+            "revenue": revenue.quantize(Decimal("0.01")),
+            "cancellations": cancelled,
+            "cancellation_rate": BookingStatsService._ratio(cancelled, total)
+        }
+
+    @staticmethod
+    def _insert_aggregates(db: Session, booking_filter) -> None:
+        """按 (校区, 教练, 日期, 状态) 聚合满足条件的预约并写入汇总表"""
+        day_column = date_bucket(db, Booking.start_time, "day")
+        rows = db.query(
+            Booking.campus_id,
+            Booking.coach_id,
+            day_column,
+            Booking.status,
+            func.count(Booking.id),
+            func.coalesce(func.sum(Booking.duration_hours), 0),
+            func.coalesce(func.sum(Booking.total_cost), 0)
+        ).filter(booking_filter).group_by(
+            Booking.campus_id, Booking.coach_id, day_column, Booking.status
+        ).all()
+
+        if rows:
+            db.execute(insert(BookingDailyStat), [
+                {
+                    "campus_id": row_campus_id,
+                    "coach_id": row_coach_id,
+                    "day": date.fromisoformat(day_text),
+                    "status": row_status,
+                    "booking_count": count,
+                    "total_hours": hours,
+                    "total_revenue": amount
+                }
+                for row_campus_id, row_coach_id, day_text, row_status, count, hours, amount in rows
+            ])
+
+    @staticmethod
+    def _day_start(day: date) -> datetime:
+        return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+    @staticmethod
+    def _ratio(numerator, denominator) -> float:
+        if not denominator:
+            return 0.0
+        return round(float(numerator) / float(denominator), 4)
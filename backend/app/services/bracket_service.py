@@ -0,0 +1,178 @@
+"""
+单败淘汰赛对阵（签表）
+
+- N 名选手放入 2^k 个签位（k 为满足 2^k >= N 的最小值），按种子顺序排位：
+  第 i 号种子与第 (2^k + 1 - i) 号种子在首轮相遇，空缺的种子号即轮空，因此轮空总是落在排名靠前的选手身上
+- 抽签时一次性生成所有轮次的对阵，后续轮次的选手在前一轮结果录入后自动填入
+- 第 r 轮第 k 场的胜者进入第 r+1 轮第 ceil(k/2) 场，k 为奇数时作为选手1，偶数时作为选手2
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, aliased
+
+from ..models.competition import CompetitionMatch, MatchStage
+from ..models.student import Student
+from ..models.user import User
+
+MATCH_PENDING = "pending"
+MATCH_COMPLETED = "completed"
+
+
+class BracketService:
+    """签表服务"""
+
+    @staticmethod
+    def bracket_size(entrants: int) -> int:
+        """签位数：不小于参赛人数的最小 2 的幂"""
+        size = 1
+        while size < entrants:
+            size *= 2
+        return size
+
+    @staticmethod
+    def seed_order(size: int) -> List[int]:
+        """各签位上的种子号（1 起），相邻两个签位构成首轮一场比赛
+
+        按标准种子排位逐层展开：[1, 2] -> [1, 4, 2, 3] -> [1, 8, 4, 5, 2, 7, 3, 6] ...
+        前两号种子只可能在决赛相遇，前四号种子只可能在半决赛相遇，依此类推。
+        """
+        order = [1]
+        while len(order) < size:
+            total = len(order) * 2 + 1
+            order = [seed for s in order for seed in (s, total - s)]
+        return order
+
+    @staticmethod
+    def build(competition_id: int, group_type: str, seeded_players: Sequence[int]) -> List[CompetitionMatch]:
+        """按种子顺序（seeded_players[0] 为 1 号种子）生成完整签表，首轮轮空直接晋级
+
+        只构造对象不写库，由调用方统一提交。
+        """
+        entrants = len(seeded_players)
+        size = BracketService.bracket_size(entrants)
+        slots = [seeded_players[seed - 1] if seed <= entrants else None for seed in BracketService.seed_order(size)]
+
+        rounds: List[List[CompetitionMatch]] = []
+        matches_in_round = size // 2
+        round_number = 1
+        while matches_in_round >= 1:
+            rounds.append([
+                CompetitionMatch(
+                    competition_id=competition_id,
+                    group_type=group_type,
+                    stage=MatchStage.KNOCKOUT.value,
+                    round_number=round_number,
+                    match_number=match_number,
+                    match_status=MATCH_PENDING
+                )
+                for match_number in range(1, matches_in_round + 1)
+            ])
+            matches_in_round //= 2
+            round_number += 1
+
+        for index, match in enumerate(rounds[0]):
+            match.player1_id, match.player2_id = slots[2 * index], slots[2 * index + 1]
+            if match.player2_id is None:
+                # 轮空：种子排位保证轮空不会两两相遇，选手1一定存在
+                match.winner_id = match.player1_id
+                match.match_status = MATCH_COMPLETED
+                BracketService._place(rounds, match)
+
+        return [match for matches in rounds for match in matches]
+
+    @staticmethod
+    def advance(db: Session, match: CompetitionMatch) -> Optional[CompetitionMatch]:
+        """把本场胜者填入下一轮对应签位，本场未完成或没有胜者（如撤销结果）时清空该签位，返回下一场对阵（决赛返回 None）
+
+        下一场已经录入结果时不允许再改变本场胜者。
+        """
+        if match.stage != MatchStage.KNOCKOUT.value:
+            return None
+        next_match = db.query(CompetitionMatch).filter(
+            CompetitionMatch.competition_id == match.competition_id,
+            CompetitionMatch.group_type == match.group_type,
+            CompetitionMatch.stage == MatchStage.KNOCKOUT.value,
+            CompetitionMatch.round_number == match.round_number + 1,
+            CompetitionMatch.match_number == (match.match_number + 1) // 2
+        ).first()
+        if next_match is None:
+            return None
+
+        slot = "player1_id" if match.match_number % 2 == 1 else "player2_id"
+        winner_id = match.winner_id if match.match_status == MATCH_COMPLETED else None
+        if getattr(next_match, slot) == winner_id:
+            return next_match
+        if next_match.match_status == MATCH_COMPLETED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="下一轮对阵已录入结果，不能再修改本场胜者"
+            )
+        setattr(next_match, slot, winner_id)
+        return next_match
+
+    @staticmethod
+    def query_with_names(db: Session):
+        """对阵查询，附带双方选手姓名：(CompetitionMatch, player1_name, player2_name)"""
+        player1, player2 = aliased(Student), aliased(Student)
+        user1, user2 = aliased(User), aliased(User)
+        return db.query(
+            CompetitionMatch, user1.real_name, user2.real_name
+        ).outerjoin(
+            player1, player1.id == CompetitionMatch.player1_id
+        ).outerjoin(
+            user1, user1.id == player1.user_id
+        ).outerjoin(
+            player2, player2.id == CompetitionMatch.player2_id
+        ).outerjoin(
+            user2, user2.id == player2.user_id
+        )
+
+    @staticmethod
+    def get_bracket(db: Session, competition_id: int, group_type: str) -> Dict[str, Any]:
+        """一次查询读取整个签表（含选手姓名），按轮次分组"""
+        rows = BracketService.query_with_names(db).filter(
+            CompetitionMatch.competition_id == competition_id,
+            CompetitionMatch.group_type == group_type,
+            CompetitionMatch.stage == MatchStage.KNOCKOUT.value
+        ).order_by(
+            CompetitionMatch.round_number, CompetitionMatch.match_number
+        ).all()
+
+        rounds: List[Dict[str, Any]] = []
+        for match, player1_name, player2_name in rows:
+            if not rounds or rounds[-1]["round_number"] != match.round_number:
+                rounds.append({"round_number": match.round_number, "matches": []})
+            rounds[-1]["matches"].append({
+                "id": match.id,
+                "match_number": match.match_number,
+                "player1_id": match.player1_id,
+                "player1_name": player1_name,
+                "player2_id": match.player2_id,
+                "player2_name": player2_name,
+                "player1_score": match.player1_score,
+                "player2_score": match.player2_score,
+                "winner_id": match.winner_id,
+                "match_status": match.match_status,
+                "is_bye": match.round_number == 1 and match.player2_id is None,
+            })
+
+        final = rounds[-1]["matches"][0] if rounds else None
+        return {
+            "competition_id": competition_id,
+            "group_type": group_type,
+            "bracket_size": 2 ** len(rounds) if rounds else 0,
+            "rounds": rounds,
+            "champion_id": final["winner_id"] if final and final["match_status"] == MATCH_COMPLETED else None,
+        }
+
+    @staticmethod
+    def _place(rounds: List[List[CompetitionMatch]], match: CompetitionMatch) -> None:
+        """构造签表时把胜者放入下一轮（内存中按下标定位）"""
+        if match.round_number >= len(rounds):
+            return
+        next_match = rounds[match.round_number][(match.match_number + 1) // 2 - 1]
+        if match.match_number % 2 == 1:
+            next_match.player1_id = match.winner_id
+        else:
+            next_match.player2_id = match.winner_id
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_
 from typing import List, Optional
 from datetime import datetime, date
@@ -8,6 +8,7 @@ from ..models.coach import Coach, CoachLevel
 from ..models.campus import Campus
 from ..models.coach_student import CoachStudent
 from ..models.booking import Booking
+from ..models.student import Student
 from ..schemas.coach import CoachCreate, CoachUpdate
 from .system_log_service import SystemLogService
 
@@ -188,7 +189,10 @@ class CoachService:
         date_to: Optional[str] = None
     ) -> List[dict]:
         """获取教练课表"""
-        query = db.query(Booking).filter(Booking.coach_id == coach_id)
+        query = db.query(Booking).options(
+            joinedload(Booking.student).joinedload(Student.user),
+            joinedload(Booking.campus)
+        ).filter(Booking.coach_id == coach_id)
         
         if date_from:
             query = query.filter(Booking.start_time >= datetime.fromisoformat(date_from))
@@ -206,7 +210,7 @@ class CoachService:
                 "start_time": booking.start_time.isoformat(),
                 "end_time": booking.end_time.isoformat(),
                 "table_number": booking.table_number,
-                "status": booking.status.value,
+                "status": booking.status,
                 "campus": booking.campus.name
             }
             schedule.append(schedule_item)
@@ -1,26 +1,35 @@
 """
 比赛相关业务逻辑
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal
 from typing import List, Optional, Dict
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, case, select
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-import random
 
-from ..models.competition import Competition, CompetitionRegistration, CompetitionMatch, CompetitionStatus
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..models.competition import Competition, CompetitionGroup, CompetitionRegistration, CompetitionMatch, CompetitionStatus, MatchStage
 from ..models.user import User, UserRole
 from ..models.student import Student
 from ..models.payment import Payment, PaymentType, PaymentStatus
 from ..schemas.competition import (
     CompetitionCreate, CompetitionUpdate, CompetitionQuery,
     CompetitionRegistrationCreate, CompetitionMatchCreate, CompetitionMatchUpdate,
-    DrawRequest, CompetitionStatistics
+    DrawRequest, RoundRobinRequest, CompetitionStatistics
 )
+from .bracket_service import BracketService
 from .payment_service import PaymentService
+from .rating_service import RatingService
+from .round_robin_service import RoundRobinService
+from .scoreboard_service import ScoreboardService
 from .system_log_service import SystemLogService
 
+# 比赛统计缓存，键为 (校区ID, 开始日期, 结束日期)；比赛和报名确认/取消时清空，过期时间兜底其他工作进程的写入
+_statistics_cache = TTLCache(ttl_seconds=settings.COMPETITION_STATS_CACHE_TTL_SECONDS, max_entries=1000)
+
 
 class CompetitionService:
     """比赛管理服务"""
@@ -40,6 +49,7 @@ class CompetitionService:
         db.add(competition)
         db.commit()
         db.refresh(competition)
+        _statistics_cache.clear()
         
         # 记录日志
         
@@ -47,8 +57,8 @@ class CompetitionService:
     
     @staticmethod
     def get_competitions(db: Session, query: CompetitionQuery) -> List[Competition]:
-        """获取比赛列表"""
-        q = db.query(Competition)
+        """获取比赛列表（报名人数随列表一次查出）"""
+        q = CompetitionService._query_with_registered_count(db)
         
         if query.status:
             q = q.filter(Competition.status == query.status)
@@ -61,38 +71,39 @@ class CompetitionService:
         
         # 分页
         offset = (query.page - 1) * query.size
-        competitions = q.offset(offset).limit(query.size).all()
+        rows = q.offset(offset).limit(query.size).all()
         
-        # 添加报名人数
-        for competition in competitions:
-            registered_count = db.query(CompetitionRegistration).filter(
-                CompetitionRegistration.competition_id == competition.id,
-                CompetitionRegistration.is_confirmed == True
-            ).count()
+        competitions = []
+        for competition, registered_count in rows:
             competition.registered_count = registered_count
-            
-        print(competitions)
+            competitions.append(competition)
         return competitions
     
     @staticmethod
     def get_competition(db: Session, competition_id: int) -> Competition:
         """获取比赛详情"""
-        competition = db.query(Competition).filter(Competition.id == competition_id).first()
-        if not competition:
+        row = CompetitionService._query_with_registered_count(db).filter(Competition.id == competition_id).first()
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="比赛不存在"
             )
         
-        # 添加报名人数
-        registered_count = db.query(CompetitionRegistration).filter(
-            CompetitionRegistration.competition_id == competition_id,
-            CompetitionRegistration.is_confirmed == True
-        ).count()
-        competition.registered_count = registered_count
-        
+        competition, competition.registered_count = row[0], row[1]
         return competition
     
+    @staticmethod
+    def _query_with_registered_count(db: Session):
+        """比赛查询，附带按比赛分组统计的报名人数（含未确认）"""
+        registered = db.query(
+            CompetitionRegistration.competition_id,
+            func.count(CompetitionRegistration.id).label("registered_count")
+        ).group_by(CompetitionRegistration.competition_id).subquery()
+        
+        return db.query(
+            Competition, func.coalesce(registered.c.registered_count, 0)
+        ).outerjoin(registered, registered.c.competition_id == Competition.id)
+    
     @staticmethod
     def update_competition(db: Session, competition_id: int, competition_data: CompetitionUpdate, current_user: User) -> Competition:
         """更新比赛信息"""
@@ -124,8 +135,13 @@ class CompetitionService:
             setattr(competition, field, value)
         
         competition.updated_at = datetime.now()
+        if "max_participants" in update_fields:
+            # 扩大名额后递补候补选手
+            db.flush()
+            CompetitionService._promote_waitlist(db, competition)
         db.commit()
         db.refresh(competition)
+        _statistics_cache.clear()
         
         # 记录日志
         
@@ -177,38 +193,37 @@ class CompetitionService:
                 detail="您已报名此比赛"
             )
         
-        # 检查报名人数限制
-        registered_count = db.query(CompetitionRegistration).filter(
-            CompetitionRegistration.competition_id == registration_data.competition_id,
-            CompetitionRegistration.is_confirmed == True
-        ).count()
-        
-        if registered_count >= competition.max_participants:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="报名人数已满"
-            )
-        
-        # 创建支付订单
-        payment = PaymentService.create_payment(
-            db=db,
-            user_id=current_user.id,
-            amount=competition.registration_fee,
-            payment_type=PaymentType.COMPETITION,
-            description=f"比赛报名费: {competition.title}"
-        )
-        
-        # 创建报名记录
+        # 占座：条件更新保证占用座位数不超过上限，并发报名也不会超卖；座位已满时进入候补
+        seated = CompetitionService._reserve_seat(db, competition.id)
         registration = CompetitionRegistration(
             competition_id=registration_data.competition_id,
             student_id=student.id,
             group_type=registration_data.group_type,
-            payment_id=payment.id
+            is_waitlisted=not seated
         )
+        if seated:
+            # 支付与报名在同一事务中提交，报名失败不会留下孤立的支付记录
+            payment = PaymentService.create_payment(
+                db=db,
+                user_id=current_user.id,
+                amount=competition.registration_fee,
+                payment_type=PaymentType.COMPETITION,
+                description=f"比赛报名费: {competition.title}",
+                campus_id=competition.campus_id,
+                commit=False
+            )
+            registration.payment_id = payment.id
         
         db.add(registration)
-        db.commit()
-        db.refresh(registration)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 同一学员并发重复报名
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="您已报名此比赛"
+            )
         
         # 重新查询以加载关联数据
         registration = db.query(CompetitionRegistration).options(
@@ -220,7 +235,7 @@ class CompetitionService:
             db=db,
             user_id=current_user.id,
             action="register_competition",
-            description=f"报名比赛: {competition.title} ({registration_data.group_type}组)",
+            description=f"{'候补' if registration.is_waitlisted else '报名'}比赛: {competition.title} ({registration_data.group_type}组)",
             target_type="competition_registration",
             target_id=registration.id
         )
@@ -242,7 +257,8 @@ class CompetitionService:
         
         # 检查权限
         if current_user.role == UserRole.STUDENT:
-            if registration.student_id != current_user.student.id:
+            student_id = db.query(Student.id).filter(Student.user_id == current_user.id).scalar()
+            if registration.student_id != student_id:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="只能确认自己的报名"
@@ -253,6 +269,12 @@ class CompetitionService:
                 detail="权限不足"
             )
         
+        if registration.is_waitlisted:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="候补报名需等待递补后才能确认"
+            )
+        
         # 检查支付状态
         if registration.payment:
             if registration.payment.status != str(PaymentStatus.SUCCESS):
@@ -261,12 +283,136 @@ class CompetitionService:
                     detail="报名费尚未支付"
                 )
         
-        registration.is_confirmed = True
+        # 条件更新保证重复确认不会重复计数，确认人数在数据库中原子递增
+        confirmed = db.query(CompetitionRegistration).filter(
+            CompetitionRegistration.id == registration_id,
+            CompetitionRegistration.is_confirmed == False
+        ).update({"is_confirmed": True}, synchronize_session=False)
+        if confirmed:
+            db.query(Competition).filter(
+                Competition.id == registration.competition_id
+            ).update({"confirmed_count": Competition.confirmed_count + 1}, synchronize_session=False)
         db.commit()
         db.refresh(registration)
+        _statistics_cache.clear()
         
         return registration
     
+    @staticmethod
+    def cancel_registration(db: Session, registration_id: int, current_user: User) -> None:
+        """取消报名：退还报名费、释放座位，并按报名先后递补候补选手"""
+        registration = db.query(CompetitionRegistration).filter(
+            CompetitionRegistration.id == registration_id
+        ).first()
+        if not registration:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="报名记录不存在"
+            )
+        
+        competition = db.query(Competition).filter(Competition.id == registration.competition_id).first()
+        if current_user.role == UserRole.STUDENT:
+            student_id = db.query(Student.id).filter(Student.user_id == current_user.id).scalar()
+            if registration.student_id != student_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="只能取消自己的报名"
+                )
+        elif current_user.role == UserRole.CAMPUS_ADMIN:
+            if competition.campus_id != current_user.campus_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="校区管理员只能管理自己校区的比赛"
+                )
+        elif current_user.role != UserRole.SUPER_ADMIN:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="权限不足"
+            )
+        
+        if competition.status not in [CompetitionStatus.UPCOMING.value, CompetitionStatus.REGISTRATION.value]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="抽签后不能取消报名"
+            )
+        
+        payment = registration.payment
+        
+        # 条件删除保证并发取消时座位只释放一次
+        deleted = db.query(CompetitionRegistration).filter(
+            CompetitionRegistration.id == registration.id
+        ).delete(synchronize_session=False)
+        if deleted and not registration.is_waitlisted:
+            db.query(Competition).filter(Competition.id == competition.id).update({
+                "reserved_count": Competition.reserved_count - 1,
+                "confirmed_count": Competition.confirmed_count - (1 if registration.is_confirmed else 0)
+            }, synchronize_session=False)
+            if payment and payment.status == str(PaymentStatus.SUCCESS):
+                PaymentService.refund_balance(
+                    db, payment.user_id, payment.amount,
+                    f"比赛报名费退款: {competition.title}", competition.campus_id,
+                    commit=False
+                )
+        # 删除报名、释放座位、退款与递补候补在同一事务中提交，释放的座位不会先被新报名占用
+        promoted = CompetitionService._promote_waitlist(db, competition)
+        db.commit()
+        _statistics_cache.clear()
+        
+        SystemLogService.log_action(
+            db=db,
+            user_id=current_user.id,
+            action="cancel_competition_registration",
+            description=f"取消报名: {competition.title}，递补{len(promoted)}人",
+            target_type="competition_registration",
+            target_id=registration_id
+        )
+    
+    @staticmethod
+    def _reserve_seat(db: Session, competition_id: int) -> bool:
+        """原子地占用一个座位，已满时返回 False"""
+        return db.query(Competition).filter(
+            Competition.id == competition_id,
+            Competition.reserved_count < Competition.max_participants
+        ).update({"reserved_count": Competition.reserved_count + 1}, synchronize_session=False) == 1
+    
+    @staticmethod
+    def _promote_waitlist(db: Session, competition: Competition) -> List[CompetitionRegistration]:
+        """有空余座位时按报名先后把候补转为正式报名并收取报名费，由调用方提交"""
+        promoted = []
+        while True:
+            candidate = db.query(CompetitionRegistration).filter(
+                CompetitionRegistration.competition_id == competition.id,
+                CompetitionRegistration.is_waitlisted == True
+            ).order_by(CompetitionRegistration.id).first()
+            if candidate is None or not CompetitionService._reserve_seat(db, competition.id):
+                break
+            
+            claimed = db.query(CompetitionRegistration).filter(
+                CompetitionRegistration.id == candidate.id,
+                CompetitionRegistration.is_waitlisted == True
+            ).update({"is_waitlisted": False}, synchronize_session=False)
+            if not claimed:
+                # 已被并发请求递补，归还刚占的座位
+                db.query(Competition).filter(Competition.id == competition.id).update(
+                    {"reserved_count": Competition.reserved_count - 1}, synchronize_session=False
+                )
+                continue
+            
+            payment = PaymentService.create_payment(
+                db=db,
+                user_id=candidate.student.user_id,
+                amount=competition.registration_fee,
+                payment_type=PaymentType.COMPETITION,
+                description=f"比赛报名费(候补递补): {competition.title}",
+                campus_id=competition.campus_id,
+                commit=False
+            )
+            db.query(CompetitionRegistration).filter(
+                CompetitionRegistration.id == candidate.id
+            ).update({"payment_id": payment.id}, synchronize_session=False)
+            promoted.append(candidate)
+        return promoted
+    
     @staticmethod
     def get_registrations(db: Session, competition_id: int, group_type: Optional[str] = None) -> List[CompetitionRegistration]:
         """获取比赛报名列表"""
@@ -282,13 +428,91 @@ class CompetitionService:
     @staticmethod
     def generate_draw(db: Session, draw_request: DrawRequest, current_user: User) -> List[CompetitionMatch]:
         """生成比赛对阵"""
+        competition = CompetitionService._get_drawable_competition(db, draw_request.competition_id, current_user)
+        registrations = CompetitionService._get_draw_entrants(db, draw_request.competition_id, draw_request.group_type)
+        
+        # 清除该组别现有的淘汰赛对阵（小组赛保留）
+        db.query(CompetitionMatch).filter(
+            CompetitionMatch.competition_id == draw_request.competition_id,
+            CompetitionMatch.group_type == draw_request.group_type,
+            CompetitionMatch.stage == MatchStage.KNOCKOUT.value
+        ).delete(synchronize_session=False)
+        
+        # 按等级分决定种子顺序，生成完整签表（轮空给排名靠前的种子）
+        participants = RatingService.seed(db, [reg.student_id for reg in registrations])
+        db.add_all(BracketService.build(draw_request.competition_id, draw_request.group_type, participants))
+        
+        # 更新比赛状态
+        competition.status = CompetitionStatus.DRAW_COMPLETE.value
+        ScoreboardService.mark_changed(db, competition.id)
+        db.commit()
+        ScoreboardService.notify(competition.id)
+        _statistics_cache.clear()
+        
+        # 记录日志
+        SystemLogService.log_action(
+            db=db,
+            user_id=current_user.id,
+            action="generate_draw",
+            target_type="competition",
+            target_id=competition.id,
+            description=f"生成对阵: {competition.title} {draw_request.group_type}组，{len(participants)}人"
+        )
+        
+        return CompetitionService.get_competition_matches(db, draw_request.competition_id, draw_request.group_type, MatchStage.KNOCKOUT.value)
+    
+    @staticmethod
+    def generate_round_robin(db: Session, competition_id: int, schedule_request: RoundRobinRequest, current_user: User) -> List[CompetitionMatch]:
+        """生成小组循环赛对阵并排定球台和时间"""
+        competition = CompetitionService._get_drawable_competition(db, competition_id, current_user)
+        registrations = CompetitionService._get_draw_entrants(db, competition_id, schedule_request.group_type)
+        
+        # 按等级分决定种子顺序（蛇形分组）
+        participants = RatingService.seed(db, [reg.student_id for reg in registrations])
+        matches = RoundRobinService.schedule(
+            db, competition, schedule_request.group_type, participants,
+            pool_size=schedule_request.pool_size,
+            start_time=schedule_request.start_time,
+            table_count=schedule_request.table_count,
+            match_minutes=schedule_request.match_minutes,
+            rest_minutes=schedule_request.rest_minutes
+        )
+        
+        # 清除该组别现有的小组赛对阵
+        db.query(CompetitionMatch).filter(
+            CompetitionMatch.competition_id == competition_id,
+            CompetitionMatch.group_type == schedule_request.group_type,
+            CompetitionMatch.stage == MatchStage.GROUP.value
+        ).delete(synchronize_session=False)
+        db.add_all(matches)
+        
+        competition.status = CompetitionStatus.DRAW_COMPLETE.value
+        ScoreboardService.mark_changed(db, competition.id)
+        db.commit()
+        ScoreboardService.notify(competition.id)
+        _statistics_cache.clear()
+        
+        SystemLogService.log_action(
+            db=db,
+            user_id=current_user.id,
+            action="generate_round_robin",
+            target_type="competition",
+            target_id=competition.id,
+            description=f"生成小组赛: {competition.title} {schedule_request.group_type}组，{len(participants)}人{len(matches)}场"
+        )
+        
+        return CompetitionService.get_competition_matches(db, competition_id, schedule_request.group_type, MatchStage.GROUP.value)
+    
+    @staticmethod
+    def _get_drawable_competition(db: Session, competition_id: int, current_user: User) -> Competition:
+        """获取可以生成对阵的比赛（校验管理员权限和比赛状态）"""
         if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CAMPUS_ADMIN]:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="只有管理员可以生成对阵"
             )
         
-        competition = CompetitionService.get_competition(db, draw_request.competition_id)
+        competition = CompetitionService.get_competition(db, competition_id)
         
         # 校区管理员只能管理自己校区的比赛
         if current_user.role == UserRole.CAMPUS_ADMIN:
@@ -304,11 +528,14 @@ class CompetitionService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="比赛状态不允许生成对阵"
             )
-        
-        # 获取该组别的已确认报名者
+        return competition
+    
+    @staticmethod
+    def _get_draw_entrants(db: Session, competition_id: int, group_type: str) -> List[CompetitionRegistration]:
+        """获取该组别的已确认报名者（至少2人）"""
         registrations = db.query(CompetitionRegistration).filter(
-            CompetitionRegistration.competition_id == draw_request.competition_id,
-            CompetitionRegistration.group_type == draw_request.group_type,
+            CompetitionRegistration.competition_id == competition_id,
+            CompetitionRegistration.group_type == group_type,
             CompetitionRegistration.is_confirmed == True
         ).all()
         
@@ -317,60 +544,7 @@ class CompetitionService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="报名人数不足，无法生成对阵"
             )
-        
-        # 清除该组别的现有对阵
-        db.query(CompetitionMatch).filter(
-            CompetitionMatch.competition_id == draw_request.competition_id,
-            CompetitionMatch.group_type == draw_request.group_type
-        ).delete()
-        
-        # 随机排列参赛者
-        participants = [reg.student_id for reg in registrations]
-        random.shuffle(participants)
-        
-        # 如果参赛人数为奇数，添加一个轮空
-        if len(participants) % 2 == 1:
-            participants.append(None)  # None 代表轮空
-        
-        matches = []
-        round_number = 1
-        
-        # 生成第一轮对阵
-        for i in range(0, len(participants), 2):
-            match = CompetitionMatch(
-                competition_id=draw_request.competition_id,
-                group_type=draw_request.group_type,
-                round_number=round_number,
-                match_number=i // 2 + 1,
-                player1_id=participants[i],
-                player2_id=participants[i + 1] if i + 1 < len(participants) else None
-            )
-            
-            # 如果有轮空，直接设置获胜者
-            if match.player2_id is None:
-                match.winner_id = match.player1_id
-                match.match_status = "completed"
-            
-            matches.append(match)
-            db.add(match)
-        
-        db.commit()
-        
-        # 更新比赛状态
-        competition.status = CompetitionStatus.DRAW_COMPLETE.value
-        db.commit()
-        
-        # 记录日志
-        SystemLogService.log_action(
-            db=db,
-            user_id=current_user.id,
-            action="generate_draw",
-            target_type="competition",
-            target_id=competition.id,
-            details=f"生成对阵: {competition.title} {draw_request.group_type}组"
-        )
-        
-        return matches
+        return registrations
     
     @staticmethod
     def update_match_result(db: Session, match_id: int, match_data: CompetitionMatchUpdate, current_user: User) -> CompetitionMatch:
@@ -397,6 +571,14 @@ class CompetitionService:
                     detail="校区管理员只能管理自己校区的比赛"
                 )
         
+        if match.player1_id is None or match.player2_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="对阵双方尚未确定，不能录入结果"
+            )
+        
+        previous_winner_id = match.winner_id if match.rated_at is not None else None
+        
         # 更新比赛结果
         for field, value in match_data.model_dump(exclude_unset=True).items():
             setattr(match, field, value)
@@ -411,8 +593,28 @@ class CompetitionService:
             
             match.match_status = "completed"
         
+        if match.winner_id is not None and match.winner_id not in (match.player1_id, match.player2_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="获胜者必须是对阵双方之一"
+            )
+        
+        # 胜者自动晋级到下一轮（撤销结果时从下一轮移除），并计入双方等级分
+        BracketService.advance(db, match)
+        if match.match_status == "completed" and match.winner_id is not None:
+            RatingService.apply_match(db, match)
+        
         match.updated_at = datetime.now()
+        ScoreboardService.mark_changed(db, match.competition_id)
         db.commit()
+        ScoreboardService.notify(match.competition_id)
+        
+        # 修改了已计分对阵的结果，之后的等级分都受影响，全量重算
+        if previous_winner_id is not None and (match.winner_id != previous_winner_id or match.match_status != "completed"):
+            if match.match_status != "completed" or match.winner_id is None:
+                match.rated_at = None
+                db.commit()
+            RatingService.recompute_all(db)
         db.refresh(match)
         
         # 记录日志
@@ -422,13 +624,13 @@ class CompetitionService:
             action="update_match_result",
             target_type="competition_match",
             target_id=match.id,
-            details=f"录入比赛结果: {match_data.player1_score}:{match_data.player2_score}"
+            description=f"录入比赛结果: {match_data.player1_score}:{match_data.player2_score}"
         )
         
         return match
     
     @staticmethod
-    def get_competition_matches(db: Session, competition_id: int, group_type: Optional[str] = None) -> List[CompetitionMatch]:
+    def get_competition_matches(db: Session, competition_id: int, group_type: Optional[str] = None, stage: Optional[str] = None) -> List[CompetitionMatch]:
         """获取比赛对阵列表"""
         q = db.query(CompetitionMatch).filter(
             CompetitionMatch.competition_id == competition_id
@@ -436,51 +638,88 @@ class CompetitionService:
         
         if group_type:
             q = q.filter(CompetitionMatch.group_type == group_type)
+        if stage:
+            q = q.filter(CompetitionMatch.stage == stage)
         
-        return q.order_by(CompetitionMatch.round_number, CompetitionMatch.match_number).all()
+        return q.order_by(
+            CompetitionMatch.stage, CompetitionMatch.round_number, CompetitionMatch.pool_number, CompetitionMatch.match_number
+        ).all()
     
     @staticmethod
-    def get_competition_statistics(db: Session) -> CompetitionStatistics:
-        """获取比赛统计信息"""
-        total_competitions = db.query(Competition).count()
-        upcoming_competitions = db.query(Competition).filter(
-            Competition.status == str(CompetitionStatus.UPCOMING)
-        ).count()
-        ongoing_competitions = db.query(Competition).filter(
-            Competition.status.in_([
-                str(CompetitionStatus.REGISTRATION),
-                str(CompetitionStatus.DRAW_COMPLETE),
-                str(CompetitionStatus.IN_PROGRESS)
-            ])
-        ).count()
-        completed_competitions = db.query(Competition).filter(
-            Competition.status == str(CompetitionStatus.COMPLETED)
-        ).count()
-        
-        total_participants = db.query(CompetitionRegistration).filter(
-            CompetitionRegistration.is_confirmed == True
-        ).count()
-        
-        # 热门组别统计
-        popular_groups = db.query(
-            CompetitionRegistration.group_type,
-            func.count(CompetitionRegistration.id).label('count')
-        ).filter(
-            CompetitionRegistration.is_confirmed == True
-        ).group_by(
-            CompetitionRegistration.group_type
-        ).all()
-        
-        popular_groups_data = [
-            {"group": group, "count": count} 
-            for group, count in popular_groups
+    def get_competition_statistics(
+        db: Session,
+        campus_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> CompetitionStatistics:
+        """获取比赛统计信息，可按校区、比赛日期范围（含首尾两天）筛选，结果缓存"""
+        return _statistics_cache.get_or_set(
+            (campus_id, date_from, date_to),
+            lambda: CompetitionService._compute_statistics(db, campus_id, date_from, date_to)
+        )
+    
+    @staticmethod
+    def _compute_statistics(
+        db: Session,
+        campus_id: Optional[int],
+        date_from: Optional[date],
+        date_to: Optional[date]
+    ) -> CompetitionStatistics:
+        """一次查询完成所有统计：报名按比赛预聚合后与比赛表连接，再用条件聚合计算各项数量
+        （SUM(CASE ...) 在 SQLite / PostgreSQL / MySQL 上通用）"""
+        confirmed = CompetitionRegistration.is_confirmed == True
+        group_types = [group.value for group in CompetitionGroup]
+        registrations = select(
+            CompetitionRegistration.competition_id,
+            func.sum(case((confirmed, 1), else_=0)).label("participants"),
+            *[
+                func.sum(case((and_(confirmed, CompetitionRegistration.group_type == group_type), 1), else_=0)).label(f"group_{group_type}")
+                for group_type in group_types
+            ]
+        ).group_by(CompetitionRegistration.competition_id).subquery()
+        
+        ongoing = [
+            CompetitionStatus.REGISTRATION.value,
+            CompetitionStatus.DRAW_COMPLETE.value,
+            CompetitionStatus.IN_PROGRESS.value
         ]
+        q = select(
+            func.count(Competition.id),
+            func.sum(case((Competition.status == CompetitionStatus.UPCOMING.value, 1), else_=0)),
+            func.sum(case((Competition.status.in_(ongoing), 1), else_=0)),
+            func.sum(case((Competition.status == CompetitionStatus.COMPLETED.value, 1), else_=0)),
+            func.sum(registrations.c.participants),
+            *[func.sum(registrations.c[f"group_{group_type}"]) for group_type in group_types]
+        ).select_from(Competition).outerjoin(
+            registrations, registrations.c.competition_id == Competition.id
+        )
+        if campus_id:
+            q = q.where(Competition.campus_id == campus_id)
+        if date_from:
+            q = q.where(Competition.competition_date >= datetime.combine(date_from, time.min, tzinfo=timezone.utc))
+        if date_to:
+            q = q.where(Competition.competition_date < datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc))
+        
+        total, upcoming, ongoing_count, completed, participants, *group_counts = db.execute(q).one()
+        
+        # 热门组别按参赛人数从多到少
+        popular_groups_data = sorted(
+            (
+                {"group": group_type, "count": int(count)}
+                for group_type, count in zip(group_types, group_counts) if count
+            ),
+            key=lambda item: item["count"],
+            reverse=True
+        )
         
         return CompetitionStatistics(
-            total_competitions=total_competitions,
-            upcoming_competitions=upcoming_competitions,
-            ongoing_competitions=ongoing_competitions,
-            completed_competitions=completed_competitions,
-            total_participants=total_participants,
-            popular_groups=popular_groups_data
+            total_competitions=total,
+            upcoming_competitions=upcoming or 0,
+            ongoing_competitions=ongoing_count or 0,
+            completed_competitions=completed or 0,
+            total_participants=participants or 0,
+            popular_groups=popular_groups_data,
+            campus_id=campus_id,
+            date_from=date_from,
+            date_to=date_to
         )
@@ -0,0 +1,159 @@
+"""
+校区授权权益（功能开关和席位上限）
+
+- 每个校区的有效授权（状态有效且在有效期内，多份时取结束日期最晚的一份）解析为 Entitlements 后按校区缓存在进程内，
+  缓存时间同 LICENSE_CACHE_TTL_SECONDS；创建、修改、续费授权时使本进程缓存失效，其他进程最长延迟一个缓存周期
+- 缓存中保留授权结束日期，过期后立即视为无授权，不依赖到期清理任务
+- 功能开关由路由依赖 require_feature 检查，常规请求只读缓存，不查询数据库；
+  比赛相关接口按比赛所属校区检查（比赛创建后不能更换校区，比赛ID -> 校区ID 长期缓存）
+- 席位上限只在创建用户时检查，按校区统计一次启用中的用户数
+- LICENSE_ENFORCEMENT_ENABLED 为 False（默认）时不做任何限制；超级管理员和未归属校区的用户不受限制
+"""
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..models.competition import Competition
+from ..models.license import License, LicenseStatus
+from ..models.user import User, UserRole
+
+# 功能 -> (授权字段, 名称)
+FEATURES = {
+    "competitions": ("allow_competitions", "比赛"),
+    "evaluations": ("allow_evaluations", "评价"),
+    "advanced_reports": ("allow_advanced_reports", "高级报表"),
+    "api_access": ("allow_api_access", "API访问"),
+}
+
+# 角色 -> (授权字段, 名称)，所有角色同时计入 max_users
+SEAT_LIMITS = {
+    UserRole.COACH: ("max_coaches", "教练"),
+    UserRole.STUDENT: ("max_students", "学员"),
+}
+
+
+class Entitlements(NamedTuple):
+    """校区当前有效授权的权益"""
+    license_id: int
+    license_type: str
+    end_date: datetime
+    features: Dict[str, bool]
+    max_users: Optional[int]
+    max_coaches: Optional[int]
+    max_students: Optional[int]
+
+
+_entitlements = TTLCache(ttl_seconds=settings.LICENSE_CACHE_TTL_SECONDS, max_entries=10000)
+# 比赛ID -> 校区ID，只缓存存在的比赛
+_competition_campuses = TTLCache(ttl_seconds=None, max_entries=10000)
+
+
+class EntitlementService:
+    """授权权益服务"""
+
+    @staticmethod
+    def get(db: Session, campus_id: int) -> Optional[Entitlements]:
+        """校区当前的授权权益，没有有效授权时返回 None（同样缓存）"""
+        entitlements = _entitlements.get_or_set(campus_id, lambda: EntitlementService._load(db, campus_id))
+        if entitlements is not None and entitlements.end_date < datetime.now(timezone.utc):
+            # 缓存期间授权到期，重新查找是否有其他有效授权
+            _entitlements.invalidate(campus_id)
+            entitlements = _entitlements.get_or_set(campus_id, lambda: EntitlementService._load(db, campus_id))
+        return entitlements
+
+    @staticmethod
+    def invalidate(campus_id: int) -> None:
+        """授权变更后调用"""
+        _entitlements.invalidate(campus_id)
+
+    @staticmethod
+    def competition_campus(db: Session, competition_id: int) -> Optional[int]:
+        """比赛所属校区ID，比赛不存在时返回 None"""
+        campus_id = _competition_campuses.get(competition_id)
+        if campus_id is None:
+            row = db.query(Competition.campus_id).filter(Competition.id == competition_id).first()
+            if row is None:
+                return None
+            campus_id = row[0]
+            _competition_campuses.set(competition_id, campus_id)
+        return campus_id
+
+    @staticmethod
+    def check_feature(db: Session, campus_id: Optional[int], feature: str) -> None:
+        """校区授权未包含该功能时抛出 403"""
+        if not settings.LICENSE_ENFORCEMENT_ENABLED or campus_id is None:
+            return
+        field, label = FEATURES[feature]
+        entitlements = EntitlementService._require(db, campus_id)
+        if not entitlements.features.get(field):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"当前授权未包含{label}功能"
+            )
+
+    @staticmethod
+    def check_seats(db: Session, campus_id: Optional[int], role: UserRole) -> None:
+        """在校区新增一个该角色的用户前检查席位上限，超出时抛出 403"""
+        if not settings.LICENSE_ENFORCEMENT_ENABLED or campus_id is None or role == UserRole.SUPER_ADMIN:
+            return
+        entitlements = EntitlementService._require(db, campus_id)
+
+        users, coaches, students = db.query(
+            func.count(User.id),
+            func.coalesce(func.sum(case((User.role == UserRole.COACH, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.role == UserRole.STUDENT, 1), else_=0)), 0)
+        ).filter(
+            User.campus_id == campus_id,
+            User.is_active == 1
+        ).one()
+        counts = {"max_users": users, "max_coaches": coaches, "max_students": students}
+
+        limits = [("max_users", "用户")]
+        if role in SEAT_LIMITS:
+            limits.append(SEAT_LIMITS[role])
+        for field, label in limits:
+            limit = getattr(entitlements, field)
+            if limit is not None and counts[field] >= limit:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"校区{label}数已达到授权上限（{limit}）"
+                )
+
+    @staticmethod
+    def _require(db: Session, campus_id: int) -> Entitlements:
+        entitlements = EntitlementService.get(db, campus_id)
+        if entitlements is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="校区没有有效的软件授权"
+            )
+        return entitlements
+
+    @staticmethod
+    def _load(db: Session, campus_id: int) -> Optional[Entitlements]:
+        now = datetime.now(timezone.utc)
+        license = db.query(License).filter(
+            License.campus_id == campus_id,
+            License.status == LicenseStatus.ACTIVE.value,
+            License.start_date <= now,
+            License.end_date >= now
+        ).order_by(License.end_date.desc()).first()
+        if license is None:
+            return None
+        end_date = license.end_date
+        if end_date.tzinfo is None:
+            end_date = end_date.replace(tzinfo=timezone.utc)
+        return Entitlements(
+            license_id=license.id,
+            license_type=license.license_type,
+            end_date=end_date,
+            features={field: bool(getattr(license, field)) for field, _ in FEATURES.values()},
+            max_users=license.max_users,
+            max_coaches=license.max_coaches,
+            max_students=license.max_students
+        )
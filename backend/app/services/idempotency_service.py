@@ -0,0 +1,138 @@
+"""
+写接口幂等处理
+
+客户端在请求头 Idempotency-Key 中携带唯一键，同一用户同一键的重试直接返回首次执行的响应，
+不会再次执行充值/扣费等操作。处理流程：
+1. 先插入 in_progress 记录（(user_id, key) 唯一索引保证只有一个请求能插入成功）
+2. 执行业务逻辑，成功后把响应写回记录；失败则删除记录，允许客户端重试
+进程在业务提交后、写回响应前崩溃时记录保持 in_progress，过期前一律返回409，宁可拒绝也不重复扣费。
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.dialect import to_utc
+from ..models.idempotency_key import IdempotencyKey
+from .background_job_service import BackgroundJobService
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+PURGE_JOB_NAME = "idempotency_purge"
+
+
+class IdempotencyService:
+    """幂等键服务"""
+
+    @staticmethod
+    def execute(
+        db: Session,
+        user_id: int,
+        key: Optional[str],
+        endpoint: str,
+        payload: Any,
+        func: Callable[[], Any]
+    ) -> Any:
+        """以幂等方式执行写操作，未提供幂等键时直接执行
+
+        返回值为 func 的结果；命中已完成的记录时返回缓存的响应（JSON 兼容结构）。
+        """
+        if not key:
+            return func()
+
+        request_hash = IdempotencyService._hash_request(endpoint, payload)
+        record = IdempotencyService._begin(db, user_id, key, endpoint, request_hash)
+        if record.status == STATUS_COMPLETED:
+            return json.loads(record.response_body)
+
+        record_id = record.id
+        try:
+            result = func()
+        except Exception:
+            db.rollback()
+            db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).delete(synchronize_session=False)
+            db.commit()
+            raise
+
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).update({
+            "status": STATUS_COMPLETED,
+            "response_code": status.HTTP_200_OK,
+            "response_body": json.dumps(jsonable_encoder(result), ensure_ascii=False)
+        }, synchronize_session=False)
+        db.commit()
+        return result
+
+    @staticmethod
+    def purge_expired(db: Session, now: Optional[datetime] = None) -> int:
+        """删除过期的幂等键"""
+        now = now or datetime.now(timezone.utc)
+        deleted = db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at < now
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def purge_scheduled() -> Optional[int]:
+        """调度器入口"""
+        return BackgroundJobService.run_with_lease(PURGE_JOB_NAME, IdempotencyService.purge_expired)
+
+    @staticmethod
+    def _begin(db: Session, user_id: int, key: str, endpoint: str, request_hash: str,
+               retry: bool = True) -> IdempotencyKey:
+        """查找或占用幂等键，返回已完成的记录或新插入的 in_progress 记录"""
+        now = datetime.now(timezone.utc)
+        record = db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key
+        ).first()
+
+        if record is not None:
+            if to_utc(record.expires_at) < now:
+                db.delete(record)
+                db.commit()
+            else:
+                if record.endpoint != endpoint or record.request_hash != request_hash:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="幂等键已用于其他请求，请更换幂等键"
+                    )
+                if record.status != STATUS_COMPLETED:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="相同请求正在处理中，请稍后重试"
+                    )
+                return record
+
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            endpoint=endpoint,
+            request_hash=request_hash,
+            status=STATUS_IN_PROGRESS,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        )
+        try:
+            db.add(record)
+            db.commit()
+        except IntegrityError:
+            # 并发请求抢先插入了同一个键
+            db.rollback()
+            if not retry:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="相同请求正在处理中，请稍后重试"
+                )
+            return IdempotencyService._begin(db, user_id, key, endpoint, request_hash, retry=False)
+        return record
+
+    @staticmethod
+    def _hash_request(endpoint: str, payload: Any) -> str:
+        body = json.dumps(jsonable_encoder(payload), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{endpoint}\n{body}".encode("utf-8")).hexdigest()
@@ -0,0 +1,284 @@
+"""
+复式记账服务
+
+每笔成功的支付生成一条会计分录（借贷平衡的两行）：
+- 充值:       借 外部资金          贷 用户余额
+- 课程/比赛:  借 用户余额          贷 校区收入
+- 退费:       借 校区收入          贷 用户余额
+- 软件授权:   借 外部资金          贷 平台收入
+账户表保存当前余额与分录行数，每 LEDGER_SNAPSHOT_INTERVAL 行生成一次余额快照；
+任意时刻的余额 = 该时刻之前最近的快照 + 快照之后至多 N 行分录。
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.ledger import (
+    JournalEntry, JournalLine, LedgerAccount, LedgerAccountType, LedgerBalanceSnapshot
+)
+from ..models.payment import Payment, PaymentStatus, PaymentType
+from ..models.user import User
+
+# 账户类型 -> 余额方向
+NORMAL_SIDES = {
+    LedgerAccountType.USER_WALLET.value: "credit",
+    LedgerAccountType.CAMPUS_REVENUE.value: "credit",
+    LedgerAccountType.PLATFORM_REVENUE.value: "credit",
+    LedgerAccountType.EXTERNAL_CASH.value: "debit",
+}
+
+Posting = Tuple[LedgerAccount, Decimal, Decimal]  # (账户, 借方, 贷方)
+
+
+class LedgerService:
+    """记账服务"""
+
+    @staticmethod
+    def get_account(db: Session, account_type: LedgerAccountType, owner_id: Optional[int] = None) -> LedgerAccount:
+        """获取账户，不存在时创建（并发创建时以唯一编码去重）"""
+        code = LedgerService._account_code(account_type, owner_id)
+        account = db.query(LedgerAccount).filter(LedgerAccount.code == code).first()
+        if account:
+            return account
+
+        try:
+            with db.begin_nested():
+                account = LedgerAccount(
+                    code=code,
+                    account_type=account_type.value,
+                    owner_id=owner_id,
+                    normal_side=NORMAL_SIDES[account_type.value],
+                    balance=Decimal("0"),
+                    entry_count=0
+                )
+                db.add(account)
+        except IntegrityError:
+            account = db.query(LedgerAccount).filter(LedgerAccount.code == code).one()
+        return account
+
+    @staticmethod
+    def post_payment(db: Session, payment: Payment, campus_id: Optional[int] = None) -> Optional[JournalEntry]:
+        """为成功的支付记录记账（不提交，随支付记录一起提交），重复调用不会重复记账"""
+        if payment.status != str(PaymentStatus.SUCCESS):
+            return None
+        if payment.id is None:
+            db.flush()
+        if db.query(JournalEntry.id).filter(JournalEntry.payment_id == payment.id).first():
+            return None
+
+        if campus_id is None:
+            campus_id = db.query(User.campus_id).filter(User.id == payment.user_id).scalar()
+        postings = LedgerService._payment_postings(db, payment.type, payment.user_id, campus_id, Decimal(payment.amount))
+        if not postings:
+            return None
+
+        # 实时记账以记账时刻为业务时间，保证同一账户的序号与时间同向递增
+        return LedgerService.post_entry(
+            db,
+            entry_type=payment.type.replace("PaymentType.", "").lower(),
+            postings=postings,
+            description=payment.description,
+            payment_id=payment.id
+        )
+
+    @staticmethod
+    def post_entry(
+        db: Session,
+        entry_type: str,
+        postings: List[Posting],
+        description: Optional[str] = None,
+        payment_id: Optional[int] = None,
+        occurred_at: Optional[datetime] = None
+    ) -> JournalEntry:
+        """写入一条借贷平衡的分录并更新账户余额（不提交）"""
+        total_debit = sum((debit for _, debit, _ in postings), Decimal("0"))
+        total_credit = sum((credit for _, _, credit in postings), Decimal("0"))
+        if total_debit != total_credit or total_debit <= 0:
+            raise ValueError(f"分录借贷不平衡: 借 {total_debit} / 贷 {total_credit}")
+
+        occurred_at = occurred_at or datetime.now(timezone.utc)
+        entry = JournalEntry(
+            payment_id=payment_id,
+            entry_type=entry_type,
+            description=description,
+            occurred_at=occurred_at
+        )
+        db.add(entry)
+        db.flush()
+
+        interval = settings.LEDGER_SNAPSHOT_INTERVAL
+        for account, debit, credit in postings:
+            delta = credit - debit if account.normal_side == "credit" else debit - credit
+            # 原子地递增序号并更新余额，并发记账时同一账户的序号不会重复
+            sequence, balance = db.execute(
+                update(LedgerAccount)
+                .where(LedgerAccount.id == account.id)
+                .values(entry_count=LedgerAccount.entry_count + 1, balance=LedgerAccount.balance + delta)
+                .returning(LedgerAccount.entry_count, LedgerAccount.balance)
+            ).one()
+            db.add(JournalLine(
+                entry_id=entry.id,
+                account_id=account.id,
+                sequence=sequence,
+                debit=debit,
+                credit=credit,
+                posted_at=occurred_at
+            ))
+            if sequence % interval == 0:
+                db.add(LedgerBalanceSnapshot(
+                    account_id=account.id,
+                    sequence=sequence,
+                    balance=balance,
+                    as_of=occurred_at
+                ))
+        db.flush()
+        return entry
+
+    @staticmethod
+    def get_balance(db: Session, account_id: int, at: Optional[datetime] = None) -> Dict:
+        """查询账户余额；指定时间时由最近的快照加上其后至多 N 行分录计算"""
+        account = db.query(LedgerAccount).filter(LedgerAccount.id == account_id).first()
+        if not account:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="账户不存在"
+            )
+        if at is None:
+            return LedgerService._balance_result(account, Decimal(account.balance), account.entry_count, None)
+
+        snapshot = db.query(LedgerBalanceSnapshot).filter(
+            LedgerBalanceSnapshot.account_id == account.id,
+            LedgerBalanceSnapshot.as_of <= at
+        ).order_by(LedgerBalanceSnapshot.sequence.desc()).first()
+        base_sequence = snapshot.sequence if snapshot else 0
+        base_balance = Decimal(snapshot.balance) if snapshot else Decimal("0")
+
+        # 下一个快照之后的分录必然晚于 at，尾部最多 N 行
+        debit, credit, last_sequence = db.execute(
+            select(
+                func.coalesce(func.sum(JournalLine.debit), 0),
+                func.coalesce(func.sum(JournalLine.credit), 0),
+                func.max(JournalLine.sequence)
+            ).where(
+                JournalLine.account_id == account.id,
+                JournalLine.sequence > base_sequence,
+                JournalLine.sequence <= base_sequence + settings.LEDGER_SNAPSHOT_INTERVAL,
+                JournalLine.posted_at <= at
+            )
+        ).one()
+        debit, credit = Decimal(str(debit)), Decimal(str(credit))
+        delta = credit - debit if account.normal_side == "credit" else debit - credit
+        return LedgerService._balance_result(account, base_balance + delta, last_sequence or base_sequence, at)
+
+    @staticmethod
+    def get_user_wallet(db: Session, user_id: int) -> Optional[LedgerAccount]:
+        """用户余额账户（尚无分录时返回 None）"""
+        code = LedgerService._account_code(LedgerAccountType.USER_WALLET, user_id)
+        return db.query(LedgerAccount).filter(LedgerAccount.code == code).first()
+
+    @staticmethod
+    def get_account_lines(db: Session, account_id: int, skip: int = 0, limit: int = 100) -> List[JournalLine]:
+        """账户分录明细（按序号倒序）"""
+        return db.query(JournalLine).filter(
+            JournalLine.account_id == account_id
+        ).order_by(JournalLine.sequence.desc()).offset(skip).limit(limit).all()
+
+    @staticmethod
+    def backfill_payments(db: Session, batch_size: int = 1000) -> int:
+        """为尚未记账的历史成功支付补记分录，按支付时间（未记录时取创建时间）顺序处理，返回补记数量
+
+        按时间查询余额依赖分录序号与业务发生时间同序，后确认的支付ID较小但支付时间较晚，因此不按支付ID排序。
+        只读取必要的列，不依赖 ORM 模型的完整字段。
+        """
+        posted = 0
+        campus_cache: Dict[int, Optional[int]] = {}
+        occurred = func.coalesce(Payment.paid_at, Payment.created_at)
+        last_key = None
+        while True:
+            query = select(
+                Payment.id, Payment.user_id, Payment.type, Payment.amount,
+                Payment.description, occurred
+            ).where(
+                Payment.status == str(PaymentStatus.SUCCESS),
+                ~select(JournalEntry.id).where(JournalEntry.payment_id == Payment.id).exists()
+            )
+            if last_key is not None:
+                last_occurred, last_id = last_key
+                query = query.where(or_(
+                    occurred > last_occurred,
+                    and_(occurred == last_occurred, Payment.id > last_id)
+                ))
+            rows = db.execute(query.order_by(occurred, Payment.id).limit(batch_size)).all()
+            if not rows:
+                break
+
+            for payment_id, user_id, payment_type, amount, description, occurred_at in rows:
+                if user_id not in campus_cache:
+                    campus_cache[user_id] = db.execute(
+                        select(User.campus_id).where(User.id == user_id)
+                    ).scalar()
+                postings = LedgerService._payment_postings(
+                    db, payment_type, user_id, campus_cache[user_id], Decimal(str(amount))
+                )
+                if postings:
+                    LedgerService.post_entry(
+                        db,
+                        entry_type=payment_type.replace("PaymentType.", "").lower(),
+                        postings=postings,
+                        description=description,
+                        payment_id=payment_id,
+                        occurred_at=occurred_at or datetime.now(timezone.utc)
+                    )
+                    posted += 1
+            last_key = (rows[-1][-1], rows[-1][0])
+            db.commit()
+        return posted
+
+    @staticmethod
+    def _payment_postings(db: Session, payment_type: str, user_id: int, campus_id: Optional[int],
+                          amount: Decimal) -> List[Posting]:
+        """按支付类型生成借贷行"""
+        if amount <= 0:
+            return []
+        if payment_type == str(PaymentType.RECHARGE):
+            debit_account = LedgerService.get_account(db, LedgerAccountType.EXTERNAL_CASH)
+            credit_account = LedgerService.get_account(db, LedgerAccountType.USER_WALLET, user_id)
+        elif payment_type in (str(PaymentType.BOOKING), str(PaymentType.COMPETITION)):
+            debit_account = LedgerService.get_account(db, LedgerAccountType.USER_WALLET, user_id)
+            credit_account = LedgerService.get_account(db, LedgerAccountType.CAMPUS_REVENUE, campus_id)
+        elif payment_type == str(PaymentType.REFUND):
+            debit_account = LedgerService.get_account(db, LedgerAccountType.CAMPUS_REVENUE, campus_id)
+            credit_account = LedgerService.get_account(db, LedgerAccountType.USER_WALLET, user_id)
+        elif payment_type == str(PaymentType.LICENSE):
+            debit_account = LedgerService.get_account(db, LedgerAccountType.EXTERNAL_CASH)
+            credit_account = LedgerService.get_account(db, LedgerAccountType.PLATFORM_REVENUE)
+        else:
+            return []
+        return [
+            (debit_account, amount, Decimal("0")),
+            (credit_account, Decimal("0"), amount),
+        ]
+
+    @staticmethod
+    def _account_code(account_type: LedgerAccountType, owner_id: Optional[int]) -> str:
+        if account_type in (LedgerAccountType.EXTERNAL_CASH, LedgerAccountType.PLATFORM_REVENUE):
+            return account_type.value
+        return f"{account_type.value}:{owner_id if owner_id is not None else 'unassigned'}"
+
+    @staticmethod
+    def _balance_result(account: LedgerAccount, balance: Decimal, sequence: int, at: Optional[datetime]) -> Dict:
+        return {
+            "account_id": account.id,
+            "code": account.code,
+            "account_type": account.account_type,
+            "owner_id": account.owner_id,
+            "balance": balance.quantize(Decimal("0.01")),
+            "sequence": sequence,
+            "as_of": at
+        }
@@ -0,0 +1,121 @@
+"""
+授权到期后台任务
+
+- 结束日期已过的有效授权 -> 已过期：一条集合式 UPDATE ... WHERE status = 'active' AND end_date < now，
+  走 (status, end_date) 索引，重复执行不会产生副作用
+- LICENSE_RENEWAL_REMINDER_DAYS 天内到期的有效授权向所属校区管理员发送续费提醒，
+  按结束日期分批处理，每批一个事务；renewal_reminded_at 记录已提醒，续费或修改结束日期后清空，下个周期重新提醒
+- 验证授权时不再写库：各进程按缓存中的结束日期判断是否过期，状态由本任务统一更新
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.campus import Campus
+from ..models.license import License, LicenseStatus
+from ..models.notification import Notification, NotificationPriority, NotificationType
+from ..models.user import User, UserRole
+from .background_job_service import BackgroundJobService
+
+JOB_NAME = "license_expiry"
+
+
+class LicenseExpiryService:
+    """授权到期服务"""
+
+    @staticmethod
+    def run_once(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """执行一轮到期清理和续费提醒"""
+        now = now or datetime.now(timezone.utc)
+        expired = LicenseExpiryService.expire(db, now)
+        reminded = LicenseExpiryService.send_renewal_reminders(db, now)
+        return {"expired": expired, "reminded": reminded}
+
+    @staticmethod
+    def run_scheduled() -> Optional[Dict[str, int]]:
+        """调度器入口，多进程下由租约保证只有一个进程执行"""
+        return BackgroundJobService.run_with_lease(JOB_NAME, LicenseExpiryService.run_once)
+
+    @staticmethod
+    def expire(db: Session, now: datetime) -> int:
+        """把已过结束日期的有效授权标记为过期，返回更新数量"""
+        expired = db.execute(
+            update(License)
+            .where(License.status == LicenseStatus.ACTIVE.value, License.end_date < now)
+            .values(status=LicenseStatus.EXPIRED.value, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return expired
+
+    @staticmethod
+    def send_renewal_reminders(db: Session, now: datetime, batch_size: Optional[int] = None) -> int:
+        """向即将到期且尚未提醒的授权发送续费提醒，返回提醒的授权数量"""
+        batch_size = batch_size or settings.LICENSE_RENEWAL_REMINDER_BATCH_SIZE
+        horizon = now + timedelta(days=settings.LICENSE_RENEWAL_REMINDER_DAYS)
+        total = 0
+        while True:
+            rows = db.query(
+                License.id, License.campus_id, License.organization_name, License.end_date
+            ).filter(
+                License.status == LicenseStatus.ACTIVE.value,
+                License.end_date >= now,
+                License.end_date <= horizon,
+                License.renewal_reminded_at.is_(None)
+            ).order_by(License.end_date).limit(batch_size).all()
+            if not rows:
+                break
+
+            # WHERE 中重复校验未提醒，重复执行时同一授权只提醒一次
+            db.execute(
+                update(License)
+                .where(License.id.in_([row[0] for row in rows]), License.renewal_reminded_at.is_(None))
+                .values(renewal_reminded_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            LicenseExpiryService._notify(db, rows, now)
+            db.commit()
+            total += len(rows)
+
+            if len(rows) < batch_size:
+                break
+        return total
+
+    @staticmethod
+    def _notify(db: Session, rows: Sequence[tuple], now: datetime) -> None:
+        """批量写入站内通知，接收者为校区负责人及该校区的校区管理员"""
+        campus_ids = {row[1] for row in rows}
+        recipients: Dict[int, Set[int]] = {campus_id: set() for campus_id in campus_ids}
+        for campus_id, admin_id in db.query(Campus.id, Campus.admin_id).filter(
+            Campus.id.in_(campus_ids), Campus.admin_id.isnot(None)
+        ):
+            recipients[campus_id].add(admin_id)
+        for user_id, campus_id in db.query(User.id, User.campus_id).filter(
+            User.role == UserRole.CAMPUS_ADMIN,
+            User.campus_id.in_(campus_ids),
+            User.is_active == 1
+        ):
+            recipients[campus_id].add(user_id)
+
+        notifications: List[Dict[str, Any]] = []
+        for license_id, campus_id, organization_name, end_date in rows:
+            days_left = max((end_date.replace(tzinfo=end_date.tzinfo or timezone.utc) - now).days, 0)
+            for recipient_id in sorted(recipients[campus_id]):
+                notifications.append({
+                    "title": "软件授权即将到期",
+                    "content": f"{organization_name} 的软件授权将于 {end_date.strftime('%Y-%m-%d')} 到期"
+                               f"（剩余{days_left}天），请及时续费",
+                    "type": NotificationType.SYSTEM.value,
+                    "priority": NotificationPriority.HIGH.value,
+                    "recipient_id": recipient_id,
+                    "resource_type": "license",
+                    "resource_id": license_id,
+                    "scheduled_at": now,
+                    "sent_at": now
+                })
+
+        if notifications:
+            db.execute(insert(Notification), notifications)
@@ -1,15 +1,27 @@
 """
 软件授权相关业务逻辑
+
+授权验证与心跳（客户端高频调用）：
+- 授权信息和激活记录按密钥缓存在进程内（LICENSE_CACHE_TTL_SECONDS），已激活的设备验证时不再读写数据库
+- 验证通过后签发 Ed25519 签名的授权令牌（见 LicenseTokenService），客户端在有效期内本地校验
+- 心跳时间和使用统计先记录在内存中，由定时任务和停机收尾批量写库
+- 新设备激活时仍直接写库，并使缓存失效；授权到期的状态更新由后台任务完成（见 LicenseExpiryService）
 """
+import logging
 import secrets
 import hashlib
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, time, timedelta, timezone
 from decimal import Decimal
-from typing import List, Optional, Dict, Any
+from typing import List, NamedTuple, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, func, desc, insert, update
 from fastapi import HTTPException, status
 
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..db.database import SessionLocal
+from ..db.dialect import date_bucket, to_utc
 from ..models.license import License, LicenseActivation, LicenseUsageLog, LicenseStatus, LicenseType
 from ..models.user import User, UserRole
 from ..models.campus import Campus
@@ -18,11 +30,37 @@ from ..schemas.license import (
     LicenseCreate, LicenseUpdate, LicenseQuery,
     LicenseValidationRequest, LicenseValidationResponse,
     LicenseActivationCreate, LicenseRenewalRequest,
-    LicenseUsageStats, LicenseStatistics, HeartbeatRequest
+    LicenseUsageStats, LicenseStatistics, HeartbeatRequest, LicenseResponse
 )
+from .entitlement_service import EntitlementService
+from .license_token_service import LicenseTokenService
 from .payment_service import PaymentService
 from .system_log_service import SystemLogService
 
+logger = logging.getLogger(__name__)
+
+
+class _CachedLicense(NamedTuple):
+    """验证和心跳所需的授权快照"""
+    id: int
+    status: str
+    start_date: datetime
+    end_date: datetime
+    activation_count: int
+    max_activations: int
+    features: Dict[str, Any]
+    activations: Dict[str, Tuple[int, bool]]  # 硬件指纹 -> (激活记录ID, 是否有效)
+    info: LicenseResponse
+
+
+_license_cache = TTLCache(ttl_seconds=settings.LICENSE_CACHE_TTL_SECONDS, max_entries=50000)
+
+# 待写库的心跳：授权ID -> (时间, 硬件指纹)，激活记录ID -> 时间；以及待写入的使用日志
+_heartbeat_lock = threading.Lock()
+_pending_license_heartbeats: Dict[int, Tuple[datetime, str]] = {}
+_pending_activation_heartbeats: Dict[int, datetime] = {}
+_pending_usage_logs: List[Dict[str, Any]] = []
+
 
 class LicenseService:
     """软件授权服务"""
@@ -30,7 +68,7 @@ class LicenseService:
     @staticmethod
     def create_license(db: Session, license_data: LicenseCreate, current_user: User) -> License:
         """创建软件授权"""
-        if current_user.role != UserRole.ADMIN:
+        if current_user.role != UserRole.SUPER_ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="只有管理员可以创建授权"
@@ -72,15 +110,16 @@ class LicenseService:
         db.add(license)
         db.commit()
         db.refresh(license)
+        EntitlementService.invalidate(license.campus_id)
         
         # 记录日志
         SystemLogService.log_action(
             db=db,
             user_id=current_user.id,
             action="create_license",
-            resource_type="license",
-            resource_id=license.id,
-            details=f"创建授权: {license.organization_name}"
+            target_type="license",
+            target_id=license.id,
+            description=f"创建授权: {license.organization_name}"
         )
         
         return license
@@ -132,7 +171,7 @@ class LicenseService:
     @staticmethod
     def update_license(db: Session, license_id: int, license_data: LicenseUpdate, current_user: User) -> License:
         """更新授权信息"""
-        if current_user.role != UserRole.ADMIN:
+        if current_user.role != UserRole.SUPER_ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="只有管理员可以更新授权"
@@ -140,31 +179,38 @@ class LicenseService:
         
         license = LicenseService.get_license(db, license_id)
         
-        for field, value in license_data.model_dump(exclude_unset=True).items():
+        changes = license_data.model_dump(exclude_unset=True)
+        for field, value in changes.items():
             setattr(license, field, value)
+        if "end_date" in changes:
+            license.renewal_reminded_at = None
         
         license.updated_at = datetime.now()
         db.commit()
         db.refresh(license)
+        _license_cache.invalidate(license.license_key)
+        EntitlementService.invalidate(license.campus_id)
         
         # 记录日志
         SystemLogService.log_action(
             db=db,
             user_id=current_user.id,
             action="update_license",
-            resource_type="license",
-            resource_id=license.id,
-            details=f"更新授权: {license.organization_name}"
+            target_type="license",
+            target_id=license.id,
+            description=f"更新授权: {license.organization_name}"
         )
         
         return license
     
     @staticmethod
     def validate_license(db: Session, validation_request: LicenseValidationRequest) -> LicenseValidationResponse:
-        """验证授权"""
-        try:
-            license = LicenseService.get_license_by_key(db, validation_request.license_key)
-        except HTTPException:
+        """验证授权，通过时签发授权令牌
+
+        已激活设备的验证只读缓存，心跳时间记入内存稍后批量写库；新设备激活时写库。
+        """
+        cached = LicenseService._get_cached(db, validation_request.license_key)
+        if cached is None:
             return LicenseValidationResponse(
                 valid=False,
                 message="授权密钥不存在",
@@ -172,102 +218,132 @@ class LicenseService:
             )
         
         # 检查授权状态
-        if license.status != LicenseStatus.ACTIVE.value:
+        if cached.status != LicenseStatus.ACTIVE.value:
             return LicenseValidationResponse(
                 valid=False,
-                license_info=license,
-                message=f"授权状态异常: {license.status}",
+                license_info=cached.info,
+                message=f"授权状态异常: {cached.status}",
                 features={}
             )
         
         # 检查有效期
-        current_time = datetime.now()
-        if current_time < license.start_date:
+        current_time = datetime.now(timezone.utc)
+        if current_time < cached.start_date:
             return LicenseValidationResponse(
                 valid=False,
-                license_info=license,
+                license_info=cached.info,
                 message="授权尚未生效",
                 features={}
             )
         
-        if current_time > license.end_date:
-            # 自动更新为过期状态
-            license.status = LicenseStatus.EXPIRED.value
-            db.commit()
-            
+        if current_time > cached.end_date:
+            # 状态由到期清理任务（LicenseExpiryService）统一更新，这里只判断不写库
             return LicenseValidationResponse(
                 valid=False,
-                license_info=license,
+                license_info=cached.info,
                 message="授权已过期",
                 features={}
             )
         
-        # 检查激活次数限制
-        if license.activation_count >= license.max_activations:
-            existing_activation = db.query(LicenseActivation).filter(
-                LicenseActivation.license_id == license.id,
-                LicenseActivation.hardware_fingerprint == validation_request.hardware_fingerprint,
-                LicenseActivation.is_active == True
-            ).first()
-            
-            if not existing_activation:
+        fingerprint = validation_request.hardware_fingerprint
+        activation_id, is_active = cached.activations.get(fingerprint, (None, False))
+        if is_active:
+            LicenseService._record_heartbeat(cached.id, fingerprint, activation_id, current_time)
+        else:
+            # 检查激活次数限制（新设备和重新启用已停用的设备都占用一个名额）；
+            # 缓存中的激活次数可能滞后，先按缓存快速拒绝，最终以 _activate 中的条件更新为准
+            if (cached.activation_count >= cached.max_activations
+                    or not LicenseService._activate(db, cached.id, validation_request, current_time)):
+                _license_cache.invalidate(validation_request.license_key)
                 return LicenseValidationResponse(
                     valid=False,
-                    license_info=license,
+                    license_info=cached.info,
                     message="超出最大激活次数限制",
                     features={}
                 )
+            _license_cache.invalidate(validation_request.license_key)
+            cached = LicenseService._get_cached(db, validation_request.license_key)
         
-        # 生成功能权限
-        features = {
-            "max_users": license.max_users,
-            "max_coaches": license.max_coaches,
-            "max_students": license.max_students,
-            "allow_competitions": license.allow_competitions,
-            "allow_evaluations": license.allow_evaluations,
-            "allow_advanced_reports": license.allow_advanced_reports,
-            "allow_api_access": license.allow_api_access,
-        }
-        
-        # 更新心跳时间
-        license.last_heartbeat = current_time
-        license.hardware_fingerprint = validation_request.hardware_fingerprint
-        
-        # 创建或更新激活记录
+        token, token_expires_at = LicenseService._issue_token(cached, validation_request.license_key, fingerprint, current_time)
+        return LicenseValidationResponse(
+            valid=True,
+            license_info=cached.info,
+            message="授权验证成功",
+            features=cached.features,
+            token=token,
+            token_expires_at=token_expires_at
+        )
+    
+    @staticmethod
+    def _activate(db: Session, license_id: int, validation_request: LicenseValidationRequest, current_time: datetime) -> bool:
+        """新设备激活（或重新启用已停用的激活记录），同时更新心跳；超出最大激活次数时返回 False
+
+        激活次数用 activation_count < max_activations 条件自增占用名额，多个进程并发激活也不会超出上限；
+        设备已被其他进程激活（本进程缓存未刷新）时不再占用名额。
+        """
+        fingerprint = validation_request.hardware_fingerprint
         activation = db.query(LicenseActivation).filter(
-            LicenseActivation.license_id == license.id,
-            LicenseActivation.hardware_fingerprint == validation_request.hardware_fingerprint
+            LicenseActivation.license_id == license_id,
+            LicenseActivation.hardware_fingerprint == fingerprint
         ).first()
         
-        if not activation:
-            activation = LicenseActivation(
-                license_id=license.id,
+        if activation is None:
+            needs_slot = True
+            db.add(LicenseActivation(
+                license_id=license_id,
                 activation_code=LicenseService._generate_activation_code(),
-                hardware_fingerprint=validation_request.hardware_fingerprint,
+                hardware_fingerprint=fingerprint,
                 client_info=validation_request.client_info
-            )
-            db.add(activation)
-            license.activation_count += 1
-            
-            if not license.activated_at:
-                license.activated_at = current_time
+            ))
         else:
-            activation.last_used = current_time
-            activation.is_active = True
-        
+            # 条件更新保证同一设备并发重新启用时只占用一个名额
+            needs_slot = db.query(LicenseActivation).filter(
+                LicenseActivation.id == activation.id,
+                LicenseActivation.is_active == False
+            ).update({
+                "is_active": True,
+                "deactivated_at": None,
+                "last_used": current_time
+            }, synchronize_session=False) == 1
+            if not needs_slot:
+                activation.last_used = current_time
+        
+        if needs_slot:
+            claimed = db.query(License).filter(
+                License.id == license_id,
+                License.activation_count < License.max_activations
+            ).update({"activation_count": License.activation_count + 1}, synchronize_session=False)
+            if not claimed:
+                db.rollback()
+                return False
+        
+        db.query(License).filter(License.id == license_id).update({
+            "last_heartbeat": current_time,
+            "hardware_fingerprint": fingerprint,
+            "activated_at": func.coalesce(License.activated_at, current_time)
+        }, synchronize_session=False)
         db.commit()
-        
-        return LicenseValidationResponse(
-            valid=True,
-            license_info=license,
-            message="授权验证成功",
-            features=features
-        )
+        return True
+    
+    @staticmethod
+    def _issue_token(cached: _CachedLicense, license_key: str, fingerprint: str, current_time: datetime) -> Tuple[str, datetime]:
+        """签发授权令牌，有效期不超过授权结束日期"""
+        expires_at = min(current_time + timedelta(hours=settings.LICENSE_TOKEN_TTL_HOURS), cached.end_date)
+        token = LicenseTokenService.issue({
+            "license_id": cached.id,
+            "license_key": license_key,
+            "license_type": cached.info.license_type,
+            "campus_id": cached.info.campus_id,
+            "hardware_fingerprint": fingerprint,
+            "license_expires_at": int(cached.end_date.timestamp()),
+            "features": cached.features,
+        }, expires_at)
+        return token, expires_at
     
     @staticmethod
     def renew_license(db: Session, renewal_request: LicenseRenewalRequest, current_user: User) -> License:
         """续费授权"""
-        if current_user.role != UserRole.ADMIN:
+        if current_user.role != UserRole.SUPER_ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="只有管理员可以续费授权"
@@ -300,70 +376,169 @@ class LicenseService:
         # 更新授权
         license.end_date = new_end_date
         license.status = LicenseStatus.ACTIVE.value
+        license.renewal_reminded_at = None
         license.updated_at = datetime.now()
         
         db.commit()
+        _license_cache.invalidate(license.license_key)
+        EntitlementService.invalidate(license.campus_id)
         
         # 记录日志
         SystemLogService.log_action(
             db=db,
             user_id=current_user.id,
             action="renew_license",
-            resource_type="license",
-            resource_id=license.id,
-            details=f"续费授权: {license.organization_name} 延长{renewal_request.extend_months}个月"
+            target_type="license",
+            target_id=license.id,
+            description=f"续费授权: {license.organization_name} 延长{renewal_request.extend_months}个月"
         )
         
         return license
     
     @staticmethod
     def heartbeat(db: Session, heartbeat_request: HeartbeatRequest) -> dict:
-        """授权心跳检测"""
-        try:
-            license = LicenseService.get_license_by_key(db, heartbeat_request.license_key)
-        except HTTPException:
+        """授权心跳检测（心跳时间和使用统计记入内存，定期批量写库）"""
+        cached = LicenseService._get_cached(db, heartbeat_request.license_key)
+        if cached is None:
             return {"status": "error", "message": "授权不存在"}
         
-        # 更新心跳时间
-        license.last_heartbeat = datetime.now()
-        license.hardware_fingerprint = heartbeat_request.hardware_fingerprint
-        
-        # 更新激活记录
-        activation = db.query(LicenseActivation).filter(
-            LicenseActivation.license_id == license.id,
-            LicenseActivation.hardware_fingerprint == heartbeat_request.hardware_fingerprint,
-            LicenseActivation.is_active == True
-        ).first()
-        
-        if activation:
-            activation.last_used = datetime.now()
+        current_time = datetime.now(timezone.utc)
+        fingerprint = heartbeat_request.hardware_fingerprint
+        activation_id, is_active = cached.activations.get(fingerprint, (None, False))
+        LicenseService._record_heartbeat(cached.id, fingerprint, activation_id if is_active else None, current_time)
         
         # 记录使用统计
         if heartbeat_request.usage_stats:
-            usage_log = LicenseUsageLog(
-                license_id=license.id,
-                date=datetime.now().date(),
-                active_users=heartbeat_request.usage_stats.current_users,
-                active_coaches=heartbeat_request.usage_stats.current_coaches,
-                active_students=heartbeat_request.usage_stats.current_students,
-                bookings_count=heartbeat_request.usage_stats.monthly_bookings,
-                competitions_count=heartbeat_request.usage_stats.monthly_competitions
-            )
-            db.add(usage_log)
-        
-        db.commit()
+            LicenseService._record_usage(cached.id, heartbeat_request, current_time)
         
-        return {
+        result = {
             "status": "success",
             "message": "心跳更新成功",
-            "license_status": license.status,
-            "expires_at": license.end_date.isoformat()
+            "license_status": cached.status,
+            "expires_at": cached.end_date.isoformat()
+        }
+        # 已激活设备顺带续签令牌
+        if is_active and cached.status == LicenseStatus.ACTIVE.value and cached.start_date <= current_time < cached.end_date:
+            result["token"], token_expires_at = LicenseService._issue_token(
+                cached, heartbeat_request.license_key, fingerprint, current_time
+            )
+            result["token_expires_at"] = token_expires_at.isoformat()
+        return result
+    
+    @staticmethod
+    def flush_heartbeats() -> Dict[str, int]:
+        """把内存中的心跳时间和使用统计批量写库（定时任务和停机收尾调用，各工作进程刷新各自的缓冲）"""
+        with _heartbeat_lock:
+            license_heartbeats = dict(_pending_license_heartbeats)
+            activation_heartbeats = dict(_pending_activation_heartbeats)
+            usage_logs = list(_pending_usage_logs)
+            _pending_license_heartbeats.clear()
+            _pending_activation_heartbeats.clear()
+            _pending_usage_logs.clear()
+        
+        result = {"licenses": len(license_heartbeats), "activations": len(activation_heartbeats), "usage_logs": len(usage_logs)}
+        if not any(result.values()):
+            return result
+        
+        db = SessionLocal()
+        try:
+            if license_heartbeats:
+                db.execute(update(License), [
+                    {"id": license_id, "last_heartbeat": beat_at, "hardware_fingerprint": fingerprint}
+                    for license_id, (beat_at, fingerprint) in license_heartbeats.items()
+                ])
+            if activation_heartbeats:
+                db.execute(update(LicenseActivation), [
+                    {"id": activation_id, "last_used": beat_at}
+                    for activation_id, beat_at in activation_heartbeats.items()
+                ])
+            if usage_logs:
+                db.execute(insert(LicenseUsageLog), usage_logs)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # 写库失败时放回缓冲区等待下次刷新（期间的新心跳优先）
+            with _heartbeat_lock:
+                for license_id, beat in license_heartbeats.items():
+                    _pending_license_heartbeats.setdefault(license_id, beat)
+                for activation_id, beat_at in activation_heartbeats.items():
+                    _pending_activation_heartbeats.setdefault(activation_id, beat_at)
+                _pending_usage_logs[:0] = usage_logs
+            raise
+        finally:
+            db.close()
+        return result
+    
+    @staticmethod
+    def _record_heartbeat(license_id: int, fingerprint: str, activation_id: Optional[int], beat_at: datetime) -> None:
+        with _heartbeat_lock:
+            _pending_license_heartbeats[license_id] = (beat_at, fingerprint)
+            if activation_id is not None:
+                _pending_activation_heartbeats[activation_id] = beat_at
+    
+    @staticmethod
+    def _record_usage(license_id: int, heartbeat_request: HeartbeatRequest, beat_at: datetime) -> None:
+        usage = heartbeat_request.usage_stats
+        with _heartbeat_lock:
+            _pending_usage_logs.append({
+                "license_id": license_id,
+                "date": datetime.combine(beat_at.date(), time.min, tzinfo=timezone.utc),
+                "active_users": usage.current_users,
+                "active_coaches": usage.current_coaches,
+                "active_students": usage.current_students,
+                "bookings_count": usage.monthly_bookings,
+                "competitions_count": usage.monthly_competitions,
+            })
+            backlog = len(_pending_usage_logs)
+        if backlog >= settings.LICENSE_HEARTBEAT_BUFFER_SIZE:
+            # 积压过多时不等定时任务，由当前请求顺带写库
+            LicenseService.flush_heartbeats()
+    
+    @staticmethod
+    def _get_cached(db: Session, license_key: str) -> Optional[_CachedLicense]:
+        """按密钥读取授权快照（含激活记录），缓存未命中时查库；密钥不存在返回 None（同样缓存）"""
+        return _license_cache.get_or_set(license_key, lambda: LicenseService._load_cached(db, license_key))
+    
+    @staticmethod
+    def _load_cached(db: Session, license_key: str) -> Optional[_CachedLicense]:
+        license = db.query(License).filter(License.license_key == license_key).first()
+        if not license:
+            return None
+        activations = {
+            fingerprint: (activation_id, bool(is_active))
+            for activation_id, fingerprint, is_active in db.query(
+                LicenseActivation.id, LicenseActivation.hardware_fingerprint, LicenseActivation.is_active
+            ).filter(LicenseActivation.license_id == license.id)
+        }
+        return _CachedLicense(
+            id=license.id,
+            status=license.status,
+            start_date=to_utc(license.start_date),
+            end_date=to_utc(license.end_date),
+            activation_count=license.activation_count or 0,
+            max_activations=license.max_activations,
+            features=LicenseService._features(license),
+            activations=activations,
+            info=LicenseResponse.from_orm(license)
+        )
+    
+    @staticmethod
+    def _features(license: License) -> Dict[str, Any]:
+        """授权包含的功能权限"""
+        return {
+            "max_users": license.max_users,
+            "max_coaches": license.max_coaches,
+            "max_students": license.max_students,
+            "allow_competitions": license.allow_competitions,
+            "allow_evaluations": license.allow_evaluations,
+            "allow_advanced_reports": license.allow_advanced_reports,
+            "allow_api_access": license.allow_api_access,
         }
     
     @staticmethod
     def deactivate_license(db: Session, license_id: int, hardware_fingerprint: str, current_user: User) -> bool:
         """停用授权激活"""
-        if current_user.role != UserRole.ADMIN:
+        if current_user.role != UserRole.SUPER_ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="只有管理员可以停用授权"
@@ -390,6 +565,8 @@ class LicenseService:
             license.activation_count -= 1
         
         db.commit()
+        if license:
+            _license_cache.invalidate(license.license_key)
         return True
     
     @staticmethod
@@ -397,17 +574,18 @@ class LicenseService:
         """获取授权统计信息"""
         total_licenses = db.query(License).count()
         active_licenses = db.query(License).filter(
-            License.status == str(LicenseStatus.ACTIVE)
+            License.status == LicenseStatus.ACTIVE.value
         ).count()
         expired_licenses = db.query(License).filter(
-            License.status == str(LicenseStatus.EXPIRED)
+            License.status == LicenseStatus.EXPIRED.value
         ).count()
 
         # 即将过期（30天内）
-        thirty_days_later = datetime.now() + timedelta(days=30)
+        now = datetime.now(timezone.utc)
         expiring_soon = db.query(License).filter(
-            License.status == str(LicenseStatus.ACTIVE),
-            License.end_date <= thirty_days_later
+            License.status == LicenseStatus.ACTIVE.value,
+            License.end_date >= now,
+            License.end_date <= now + timedelta(days=30)
         ).count()
         
         # 总收入
@@ -422,14 +600,17 @@ class LicenseService:
         ).group_by(License.license_type).all()
         
         # 月度激活统计（最近12个月）
-        twelve_months_ago = datetime.now() - timedelta(days=365)
+        twelve_months_ago = datetime.now(timezone.utc) - timedelta(days=365)
+        activation_month = date_bucket(db, License.activated_at, "month")
         monthly_stats = db.query(
-            func.date_trunc('month', License.activated_at).label('month'),
+            activation_month.label('month'),
             func.count(License.id).label('count')
         ).filter(
             License.activated_at >= twelve_months_ago
         ).group_by(
-            func.date_trunc('month', License.activated_at)
+            activation_month
+        ).order_by(
+            activation_month
         ).all()
         
         return LicenseStatistics(
@@ -439,7 +620,7 @@ class LicenseService:
             expiring_soon=expiring_soon,
             total_revenue=total_revenue,
             licenses_by_type=[{"type": type_, "count": count} for type_, count in type_stats],
-            monthly_activations=[{"month": month.strftime("%Y-%m"), "count": count} for month, count in monthly_stats if month]
+            monthly_activations=[{"month": month, "count": count} for month, count in monthly_stats if month]
         )
     
     @staticmethod
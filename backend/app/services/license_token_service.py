@@ -0,0 +1,139 @@
+"""
+授权令牌签发（Ed25519）
+
+- 验证通过后签发有时效的授权令牌，客户端用公钥（GET /licenses/public-key）在本地校验，
+  有效期内无需再请求服务器
+- 令牌格式：v1.<base64url(载荷JSON)>.<base64url(签名)>，签名覆盖 "v1.<载荷>" 部分
+- 私钥来自 LICENSE_SIGNING_KEY（PEM）；未配置时读取 LICENSE_SIGNING_KEY_FILE，文件不存在则生成并保存，
+  多个工作进程共用同一把密钥
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+SIGNING_ALGORITHM = "Ed25519"
+
+_private_key: Optional[Ed25519PrivateKey] = None
+_key_lock = threading.Lock()
+
+
+class LicenseTokenService:
+    """授权令牌服务"""
+
+    @staticmethod
+    def issue(claims: Dict[str, Any], expires_at: datetime) -> str:
+        """签发令牌，claims 中追加 kid / iat / exp（Unix 秒）"""
+        payload = dict(claims)
+        payload.update({
+            "kid": LicenseTokenService.key_id(),
+            "iat": int(datetime.now(timezone.utc).timestamp()),
+            "exp": int(expires_at.timestamp()),
+        })
+        body = LicenseTokenService._b64encode(
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        )
+        signing_input = f"{TOKEN_VERSION}.{body}"
+        signature = LicenseTokenService._private().sign(signing_input.encode("ascii"))
+        return f"{signing_input}.{LicenseTokenService._b64encode(signature)}"
+
+    @staticmethod
+    def verify(token: str, public_key: Optional[Ed25519PublicKey] = None, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """校验签名和有效期，通过时返回载荷，否则返回 None（客户端可使用同样的逻辑离线校验）"""
+        try:
+            version, body, signature = token.split(".")
+            if version != TOKEN_VERSION:
+                return None
+            key = public_key or LicenseTokenService._private().public_key()
+            key.verify(LicenseTokenService._b64decode(signature), f"{version}.{body}".encode("ascii"))
+            payload = json.loads(LicenseTokenService._b64decode(body))
+        except (ValueError, InvalidSignature):
+            return None
+
+        now = now or datetime.now(timezone.utc)
+        if payload.get("exp", 0) < now.timestamp():
+            return None
+        return payload
+
+    @staticmethod
+    def public_key_pem() -> str:
+        """公钥（PEM，SubjectPublicKeyInfo）"""
+        return LicenseTokenService._private().public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode("ascii")
+
+    @staticmethod
+    def key_id() -> str:
+        """公钥指纹，轮换密钥后客户端据此判断是否需要重新获取公钥"""
+        raw = LicenseTokenService._private().public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return hashlib.sha256(raw).hexdigest()[:16]
+
+    @staticmethod
+    def _private() -> Ed25519PrivateKey:
+        global _private_key
+        if _private_key is None:
+            with _key_lock:
+                if _private_key is None:
+                    _private_key = LicenseTokenService._load_key()
+        return _private_key
+
+    @staticmethod
+    def _load_key() -> Ed25519PrivateKey:
+        if settings.LICENSE_SIGNING_KEY:
+            pem = settings.LICENSE_SIGNING_KEY.replace("\\n", "\n").encode("ascii")
+            return LicenseTokenService._parse_key(pem)
+
+        path = settings.LICENSE_SIGNING_KEY_FILE
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return LicenseTokenService._parse_key(f.read())
+
+        key = Ed25519PrivateKey.generate()
+        pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        # 先写临时文件再硬链接到目标路径：多个工作进程同时启动时只有一个链接成功，
+        # 其余进程读取到的一定是完整写入的密钥
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                return LicenseTokenService._parse_key(f.read())
+        finally:
+            os.unlink(tmp_path)
+        logger.warning("未配置授权签名密钥，已生成新的密钥: %s", os.path.abspath(path))
+        return key
+
+    @staticmethod
+    def _parse_key(pem: bytes) -> Ed25519PrivateKey:
+        key = serialization.load_pem_private_key(pem, password=None)
+        if not isinstance(key, Ed25519PrivateKey):
+            raise ValueError("授权签名密钥必须是 Ed25519 私钥")
+        return key
+
+    @staticmethod
+    def _b64encode(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+    @staticmethod
+    def _b64decode(data: str) -> bytes:
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
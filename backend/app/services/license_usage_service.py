@@ -0,0 +1,236 @@
+"""
+授权使用汇总
+
+- 后台任务按使用日志ID游标增量读取新日志，按 (授权, 日) 和 (授权, 月) 聚合后合并进 license_usage_rollups：
+  峰值取较大者、累计值和日志条数相加，平均值在查询时由累计值 / 条数得出，因此无需重算历史
+- 只处理写入超过 LICENSE_ROLLUP_SETTLE_SECONDS 的日志，避免并发事务晚提交的小ID日志被游标跳过
+- 首次运行（没有游标）时从头处理全部历史日志，即回填
+- 趋势查询和超额检测只读汇总表；超额指某周期内的活跃用户/教练/学员峰值超过授权上限
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.dialect import GRANULARITIES, date_bucket
+from ..models.license import License, LicenseUsageLog, LicenseUsageRollup
+from .background_job_service import BackgroundJobService
+
+ROLLUP_JOB_NAME = "license_usage_rollup"
+# 单次合并时按授权ID分块查询已有汇总行，避免 IN 列表过长
+MERGE_CHUNK_SIZE = 500
+
+# (汇总列名后缀, 使用日志列, 对应的授权上限列)
+METRICS = (
+    ("active_users", LicenseUsageLog.active_users, "max_users"),
+    ("active_coaches", LicenseUsageLog.active_coaches, "max_coaches"),
+    ("active_students", LicenseUsageLog.active_students, "max_students"),
+    ("bookings", LicenseUsageLog.bookings_count, None),
+    ("competitions", LicenseUsageLog.competitions_count, None),
+)
+
+
+class LicenseUsageService:
+    """授权使用汇总服务"""
+
+    @staticmethod
+    def rollup(db: Session) -> Dict[str, Any]:
+        """把游标之后的新使用日志合并进日/月汇总，每批与游标一起提交"""
+        cursor = int(BackgroundJobService.get_cursor(db, ROLLUP_JOB_NAME) or 0)
+        settled_before = datetime.now(timezone.utc) - timedelta(seconds=settings.LICENSE_ROLLUP_SETTLE_SECONDS)
+
+        # 第一条尚未稳定的日志之前的部分才可以处理
+        unsettled = db.query(func.min(LicenseUsageLog.id)).filter(
+            LicenseUsageLog.id > cursor,
+            LicenseUsageLog.created_at > settled_before
+        ).scalar()
+
+        processed = 0
+        for _ in range(settings.LICENSE_ROLLUP_MAX_BATCHES):
+            candidates = db.query(LicenseUsageLog.id).filter(LicenseUsageLog.id > cursor)
+            if unsettled is not None:
+                candidates = candidates.filter(LicenseUsageLog.id < unsettled)
+            upto = candidates.order_by(LicenseUsageLog.id).offset(settings.LICENSE_ROLLUP_BATCH_SIZE - 1).limit(1).scalar()
+            if upto is None:
+                upto = candidates.with_entities(func.max(LicenseUsageLog.id)).scalar()
+            if upto is None:
+                break
+
+            merged = [
+                LicenseUsageService._merge(db, granularity, LicenseUsageService._aggregate(db, granularity, cursor, upto))
+                for granularity in GRANULARITIES
+            ]
+            processed += merged[0]
+            cursor = upto
+            BackgroundJobService.set_cursor(db, ROLLUP_JOB_NAME, str(cursor))
+            db.commit()
+
+        return {"processed_logs": processed, "cursor": cursor}
+
+    @staticmethod
+    def rollup_scheduled() -> Optional[Dict[str, Any]]:
+        """调度器入口"""
+        return BackgroundJobService.run_with_lease(ROLLUP_JOB_NAME, LicenseUsageService.rollup)
+
+    @staticmethod
+    def get_usage_trend(
+        db: Session,
+        license_id: int,
+        granularity: str = "day",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """单个授权的使用趋势（按周期升序）"""
+        if not db.query(License.id).filter(License.id == license_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="授权不存在"
+            )
+        period_from, period_to = LicenseUsageService._period_range(granularity, date_from, date_to)
+        rows = db.query(LicenseUsageRollup).filter(
+            LicenseUsageRollup.license_id == license_id,
+            LicenseUsageRollup.granularity == granularity,
+            LicenseUsageRollup.period >= period_from,
+            LicenseUsageRollup.period <= period_to
+        ).order_by(LicenseUsageRollup.period).all()
+        return [LicenseUsageService._point(row) for row in rows]
+
+    @staticmethod
+    def get_quota_violations(
+        db: Session,
+        granularity: str = "day",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        campus_id: Optional[int] = None,
+        license_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """使用峰值超过授权上限（用户/教练/学员数）的记录，按周期倒序、超出比例从高到低"""
+        period_from, period_to = LicenseUsageService._period_range(granularity, date_from, date_to)
+        limited = [(name, limit) for name, _, limit in METRICS if limit]
+        q = db.query(LicenseUsageRollup, License.organization_name, License.campus_id, *[
+            getattr(License, limit) for _, limit in limited
+        ]).join(
+            License, License.id == LicenseUsageRollup.license_id
+        ).filter(
+            LicenseUsageRollup.granularity == granularity,
+            LicenseUsageRollup.period >= period_from,
+            LicenseUsageRollup.period <= period_to,
+            or_(*[
+                getattr(LicenseUsageRollup, f"max_{name}") > getattr(License, limit)
+                for name, limit in limited
+            ])
+        )
+        if campus_id:
+            q = q.filter(License.campus_id == campus_id)
+        if license_id:
+            q = q.filter(LicenseUsageRollup.license_id == license_id)
+
+        violations = []
+        for rollup, organization_name, license_campus_id, *limits in q.all():
+            for (name, _), quota in zip(limited, limits):
+                peak = getattr(rollup, f"max_{name}")
+                if quota is None or peak <= quota:
+                    continue
+                violations.append({
+                    "license_id": rollup.license_id,
+                    "organization_name": organization_name,
+                    "campus_id": license_campus_id,
+                    "period": rollup.period,
+                    "metric": name,
+                    "quota": quota,
+                    "peak": peak,
+                    "average": LicenseUsageService._average(getattr(rollup, f"sum_{name}"), rollup.sample_count),
+                    "overage_rate": round((peak - quota) / quota, 4) if quota else None,
+                })
+        violations.sort(key=lambda item: (item["period"], item["overage_rate"] or 0), reverse=True)
+        return violations
+
+    @staticmethod
+    def _aggregate(db: Session, granularity: str, after_id: int, upto_id: int) -> Sequence[tuple]:
+        """按 (授权, 周期) 聚合 (after_id, upto_id] 范围内的日志"""
+        period = date_bucket(db, LicenseUsageLog.date, granularity)
+        columns = []
+        for _, column, _ in METRICS:
+            value = func.coalesce(column, 0)
+            columns.extend([func.max(value), func.sum(value)])
+        return db.query(
+            LicenseUsageLog.license_id, period, func.count(LicenseUsageLog.id), *columns
+        ).filter(
+            LicenseUsageLog.id > after_id,
+            LicenseUsageLog.id <= upto_id
+        ).group_by(LicenseUsageLog.license_id, period).all()
+
+    @staticmethod
+    def _merge(db: Session, granularity: str, rows: Sequence[tuple]) -> int:
+        """把聚合结果合并进汇总表（不提交），返回涉及的日志条数"""
+        batch: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for license_id, period, count, *values in rows:
+            item = {"license_id": license_id, "granularity": granularity, "period": period, "sample_count": count}
+            for index, (name, _, _) in enumerate(METRICS):
+                item[f"max_{name}"] = int(values[2 * index] or 0)
+                item[f"sum_{name}"] = int(values[2 * index + 1] or 0)
+            batch[(license_id, period)] = item
+
+        license_ids = sorted({license_id for license_id, _ in batch})
+        periods = sorted({period for _, period in batch})
+        existing: Dict[Tuple[int, str], LicenseUsageRollup] = {}
+        for offset in range(0, len(license_ids), MERGE_CHUNK_SIZE):
+            for rollup in db.query(LicenseUsageRollup).filter(
+                LicenseUsageRollup.granularity == granularity,
+                LicenseUsageRollup.license_id.in_(license_ids[offset:offset + MERGE_CHUNK_SIZE]),
+                LicenseUsageRollup.period.in_(periods)
+            ):
+                existing[(rollup.license_id, rollup.period)] = rollup
+
+        updates, inserts = [], []
+        for key, item in batch.items():
+            current = existing.get(key)
+            if current is None:
+                inserts.append(item)
+                continue
+            merged = {"id": current.id, "sample_count": current.sample_count + item["sample_count"]}
+            for name, _, _ in METRICS:
+                merged[f"max_{name}"] = max(getattr(current, f"max_{name}"), item[f"max_{name}"])
+                merged[f"sum_{name}"] = getattr(current, f"sum_{name}") + item[f"sum_{name}"]
+            updates.append(merged)
+
+        if updates:
+            db.execute(update(LicenseUsageRollup), updates)
+        if inserts:
+            db.execute(insert(LicenseUsageRollup), inserts)
+        return sum(item["sample_count"] for item in batch.values())
+
+    @staticmethod
+    def _period_range(granularity: str, date_from: Optional[date], date_to: Optional[date]) -> Tuple[str, str]:
+        """查询的周期范围（含首尾），默认最近30天 / 12个月"""
+        if granularity not in GRANULARITIES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的时间粒度: {granularity}"
+            )
+        date_to = date_to or datetime.now(timezone.utc).date()
+        date_from = date_from or date_to - timedelta(days=30 if granularity == "day" else 365)
+        if date_from > date_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="开始日期不能晚于结束日期"
+            )
+        fmt = "%Y-%m-%d" if granularity == "day" else "%Y-%m"
+        return date_from.strftime(fmt), date_to.strftime(fmt)
+
+    @staticmethod
+    def _point(rollup: LicenseUsageRollup) -> Dict[str, Any]:
+        point = {"period": rollup.period, "samples": rollup.sample_count}
+        for name, _, _ in METRICS:
+            point[f"max_{name}"] = getattr(rollup, f"max_{name}")
+            point[f"avg_{name}"] = LicenseUsageService._average(getattr(rollup, f"sum_{name}"), rollup.sample_count)
+        return point
+
+    @staticmethod
+    def _average(total: int, count: int) -> float:
+        if not count:
+            return 0.0
+        return round(total / count, 2)
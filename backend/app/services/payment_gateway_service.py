@@ -0,0 +1,201 @@
+"""
+支付网关回调处理
+
+回调接口只做验签和落库（收件箱表按 (网关, 通知ID) 去重），立即应答网关；
+后台任务按批领取待处理通知，校验金额与状态后确认支付并记账，一批一个事务；
+每条通知在各自的保存点中处理，单条处理异常时只回滚该条并标记为失败，不影响同批其他通知。
+签名: hex(HMAC-SHA256(PAYMENT_CALLBACK_SECRET, "{时间戳}.{原始请求体}"))，
+分别通过请求头 X-Gateway-Timestamp / X-Gateway-Signature 传递。
+"""
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.payment import Payment, PaymentStatus
+from ..models.payment_gateway import GatewayNotificationStatus, PaymentGatewayNotification
+from ..models.system_log import SystemLog
+from .background_job_service import BackgroundJobService
+from .ledger_service import LedgerService
+
+SUPPORTED_GATEWAYS = ("wechat", "alipay")
+TRADE_SUCCESS = "success"
+TRADE_FAILED = "failed"
+JOB_NAME = "payment_gateway_inbox"
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentGatewayService:
+    """支付网关服务"""
+
+    @staticmethod
+    def sign(body: bytes, timestamp: str, secret: Optional[str] = None) -> str:
+        """计算回调签名"""
+        secret = settings.PAYMENT_CALLBACK_SECRET if secret is None else secret
+        message = timestamp.encode("utf-8") + b"." + body
+        return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def receive_notification(db: Session, gateway: str, body: bytes,
+                             timestamp: Optional[str], signature: Optional[str]) -> bool:
+        """验签并写入收件箱，返回是否为新通知（重复通知返回 False）"""
+        if gateway not in SUPPORTED_GATEWAYS:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="不支持的支付网关"
+            )
+        PaymentGatewayService._verify_signature(body, timestamp, signature)
+
+        try:
+            payload = json.loads(body)
+            notify_id = str(payload["notify_id"])
+            payment_id = int(payload["payment_id"])
+            amount = Decimal(str(payload["amount"]))
+            trade_status = str(payload["trade_status"])
+        except (ValueError, KeyError, TypeError, InvalidOperation):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="回调内容格式错误"
+            )
+        if trade_status not in (TRADE_SUCCESS, TRADE_FAILED) or not notify_id or len(notify_id) > 64:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="回调内容格式错误"
+            )
+
+        transaction_id = payload.get("transaction_id")
+        db.add(PaymentGatewayNotification(
+            gateway=gateway,
+            notify_id=notify_id,
+            payment_id=payment_id,
+            transaction_id=str(transaction_id)[:100] if transaction_id else None,
+            amount=amount,
+            trade_status=trade_status,
+            payload=body.decode("utf-8", errors="replace"),
+            status=GatewayNotificationStatus.PENDING.value
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # 网关重复推送同一通知
+            db.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def process_inbox(db: Session, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """分批处理待处理通知，返回各处理结果的数量"""
+        batch_size = batch_size or settings.PAYMENT_INBOX_BATCH_SIZE
+        counts = {status_item.value: 0 for status_item in GatewayNotificationStatus if status_item != GatewayNotificationStatus.PENDING}
+
+        while True:
+            notifications = db.query(PaymentGatewayNotification).filter(
+                PaymentGatewayNotification.status == GatewayNotificationStatus.PENDING.value
+            ).order_by(PaymentGatewayNotification.id).limit(batch_size).all()
+            if not notifications:
+                break
+
+            payment_ids = {notification.payment_id for notification in notifications}
+            payments = {
+                payment.id: payment
+                for payment in db.query(Payment).filter(Payment.id.in_(payment_ids)).all()
+            }
+
+            now = datetime.now(timezone.utc)
+            for notification in notifications:
+                try:
+                    with db.begin_nested():
+                        result, error = PaymentGatewayService._apply(
+                            db, notification, payments.get(notification.payment_id), now
+                        )
+                except Exception as exc:
+                    logger.exception("处理支付网关通知 %s 失败", notification.id)
+                    result, error = GatewayNotificationStatus.FAILED.value, f"处理异常: {exc}"
+                notification.status = result
+                notification.error = error
+                notification.processed_at = now
+                counts[result] += 1
+            db.commit()
+
+            if len(notifications) < batch_size:
+                break
+        return counts
+
+    @staticmethod
+    def run_scheduled() -> Optional[Dict[str, int]]:
+        """调度器入口"""
+        return BackgroundJobService.run_with_lease(JOB_NAME, PaymentGatewayService.process_inbox)
+
+    @staticmethod
+    def gateway_pay_url(gateway: str, payment: Payment) -> str:
+        """网关支付页地址（二维码内容）"""
+        return f"{settings.PAYMENT_GATEWAY_URL.rstrip('/')}/pay/{gateway}?payment_id={payment.id}&amount={payment.amount}"
+
+    @staticmethod
+    def _apply(db: Session, notification: PaymentGatewayNotification, payment: Optional[Payment], now: datetime):
+        """根据单条通知更新支付记录，返回 (处理状态, 失败原因)"""
+        if payment is None:
+            return GatewayNotificationStatus.FAILED.value, "支付记录不存在"
+        if payment.payment_method != notification.gateway:
+            return GatewayNotificationStatus.FAILED.value, "支付方式与网关不一致"
+        if Decimal(str(notification.amount)) != Decimal(str(payment.amount)):
+            return GatewayNotificationStatus.FAILED.value, "通知金额与订单金额不一致"
+        if payment.status == str(PaymentStatus.SUCCESS):
+            return GatewayNotificationStatus.IGNORED.value, "支付已确认"
+        if payment.status != str(PaymentStatus.PENDING):
+            return GatewayNotificationStatus.IGNORED.value, "支付状态无法更新"
+
+        if notification.trade_status == TRADE_FAILED:
+            payment.status = str(PaymentStatus.FAILED)
+            return GatewayNotificationStatus.PROCESSED.value, None
+
+        payment.status = str(PaymentStatus.SUCCESS)
+        payment.transaction_id = notification.transaction_id
+        payment.paid_at = now
+        LedgerService.post_payment(db, payment)
+        db.add(SystemLog(
+            user_id=payment.user_id,
+            action="payment_success",
+            target_type="payment",
+            target_id=payment.id,
+            description=f"支付成功: {payment.amount}元 ({notification.gateway}回调)"
+        ))
+        return GatewayNotificationStatus.PROCESSED.value, None
+
+    @staticmethod
+    def _verify_signature(body: bytes, timestamp: Optional[str], signature: Optional[str]) -> None:
+        if not settings.PAYMENT_CALLBACK_SECRET:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="未配置支付回调密钥"
+            )
+        if not timestamp or not signature:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="缺少回调签名"
+            )
+        try:
+            skew = abs(time.time() - int(timestamp))
+        except ValueError:
+            skew = None
+        if skew is None or skew > settings.PAYMENT_CALLBACK_TOLERANCE_SECONDS:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="回调时间戳无效"
+            )
+        expected = PaymentGatewayService.sign(body, timestamp)
+        if not hmac.compare_digest(expected, signature.lower()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="回调签名校验失败"
+            )
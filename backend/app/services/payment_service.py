@@ -1,14 +1,29 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Optional, Dict, Any
+from datetime import datetime, date, time, timedelta, timezone
 from decimal import Decimal
 from fastapi import HTTPException, status
 
+from ..core.config import settings
+from ..db.dialect import date_bucket
 from ..models.payment import Payment, PaymentStatus, PaymentType
 from ..models.user import User, UserRole
+from ..models.campus import Campus
 from ..models.student import Student
+from ..models.system_log import SystemLog
 from ..schemas.payment import RechargeRequest, PaymentResponse
 from ..services.system_log_service import SystemLogService
+from ..services.ledger_service import LedgerService
+from ..services.payment_gateway_service import PaymentGatewayService, SUPPORTED_GATEWAYS
+
+# 存储的支付类型 -> 汇总分类
+PAYMENT_CATEGORIES = {
+    str(PaymentType.RECHARGE): "recharge",
+    str(PaymentType.BOOKING): "expense",
+    str(PaymentType.COMPETITION): "expense",
+    str(PaymentType.REFUND): "refund",
+}
 
 class PaymentService:
     """支付服务"""
@@ -22,52 +37,165 @@ class PaymentService:
     @staticmethod
     def get_user_balance(db: Session, user_id: int) -> Decimal:
         """获取用户账户余额"""
-        # 计算充值总额
-        recharge_total = db.query(Payment).filter(
-            Payment.user_id == user_id,
-            Payment.type == str(PaymentType.RECHARGE),
-            Payment.status == str(PaymentStatus.SUCCESS)
-        ).with_entities(Payment.amount).all()
+        return PaymentService.get_user_totals(db, user_id)["balance"]
 
-        recharge_sum = sum([p.amount for p in recharge_total]) if recharge_total else Decimal('0')
+    @staticmethod
+    def get_user_totals(db: Session, user_id: int) -> Dict[str, Any]:
+        """用一次 GROUP BY 查询得到用户各类金额合计与记录数"""
+        rows = db.query(
+            Payment.type,
+            Payment.status,
+            func.coalesce(func.sum(Payment.amount), 0),
+            func.count(Payment.id)
+        ).filter(
+            Payment.user_id == user_id
+        ).group_by(Payment.type, Payment.status).all()
+        return PaymentService._classify_totals(rows)
 
-        # 计算消费总额
-        expense_total = db.query(Payment).filter(
-            Payment.user_id == user_id,
-            Payment.type.in_([str(PaymentType.BOOKING), str(PaymentType.COMPETITION)]),
-            Payment.status == str(PaymentStatus.SUCCESS)
-        ).with_entities(Payment.amount).all()
+    @staticmethod
+    def _classify_totals(rows) -> Dict[str, Any]:
+        """将 (类型, 状态, 金额合计, 记录数) 行归并为充值/消费/退费合计，只有成功的记录计入金额"""
+        totals = {"recharge": Decimal("0"), "expense": Decimal("0"), "refund": Decimal("0"), "count": 0}
+        for payment_type, payment_status, amount, count in rows:
+            totals["count"] += count
+            if payment_status != str(PaymentStatus.SUCCESS):
+                continue
+            category = PAYMENT_CATEGORIES.get(payment_type)
+            if category:
+                totals[category] += Decimal(str(amount))
+        totals["balance"] = totals["recharge"] - totals["expense"] + totals["refund"]
+        return totals
+
+    @staticmethod
+    def get_campus_summary(db: Session, current_user: User, campus_id: Optional[int] = None,
+                           date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict[str, Any]]:
+        """按校区汇总支付金额（payments 关联 users.campus_id）"""
+        campus_id = PaymentService._scope_campus(current_user, campus_id)
 
-        expense_sum = sum([p.amount for p in expense_total]) if expense_total else Decimal('0')
+        query = db.query(
+            User.campus_id,
+            Payment.type,
+            Payment.status,
+            func.coalesce(func.sum(Payment.amount), 0),
+            func.count(Payment.id)
+        ).join(User, Payment.user_id == User.id)
+        query = PaymentService._filter_range(query, date_from, date_to)
+        if campus_id is not None:
+            query = query.filter(User.campus_id == campus_id)
+        rows = query.group_by(User.campus_id, Payment.type, Payment.status).all()
 
-        # 计算退费总额
-        refund_total = db.query(Payment).filter(
-            Payment.user_id == user_id,
-            Payment.type == str(PaymentType.REFUND),
-            Payment.status == str(PaymentStatus.SUCCESS)
-        ).with_entities(Payment.amount).all()
+        grouped: Dict[Optional[int], list] = {}
+        for row_campus_id, payment_type, payment_status, amount, count in rows:
+            grouped.setdefault(row_campus_id, []).append((payment_type, payment_status, amount, count))
+
+        campus_names = dict(db.query(Campus.id, Campus.name).filter(
+            Campus.id.in_([key for key in grouped if key is not None])
+        ).all()) if grouped else {}
+
+        summaries = []
+        for row_campus_id in sorted(grouped, key=lambda key: (key is None, key or 0)):
+            totals = PaymentService._classify_totals(grouped[row_campus_id])
+            summaries.append({
+                "campus_id": row_campus_id,
+                "campus_name": campus_names.get(row_campus_id),
+                "total_recharge": totals["recharge"],
+                "total_expense": totals["expense"],
+                "total_refund": totals["refund"],
+                "net_amount": totals["balance"],
+                "payment_count": totals["count"]
+            })
+        return summaries
+
+    @staticmethod
+    def get_payment_timeseries(db: Session, current_user: User, granularity: str = "day",
+                               date_from: Optional[date] = None, date_to: Optional[date] = None,
+                               campus_id: Optional[int] = None) -> Dict[str, Any]:
+        """按日/月分桶统计成功支付金额，供财务看板使用"""
+        if granularity not in ("day", "month"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="统计粒度必须是 day 或 month"
+            )
+        campus_id = PaymentService._scope_campus(current_user, campus_id)
 
-        refund_sum = sum([p.amount for p in refund_total]) if refund_total else Decimal('0')
+        bucket = date_bucket(db, Payment.created_at, granularity)
+        query = db.query(
+            bucket,
+            Payment.type,
+            Payment.status,
+            func.coalesce(func.sum(Payment.amount), 0),
+            func.count(Payment.id)
+        ).filter(Payment.status == str(PaymentStatus.SUCCESS))
+        query = PaymentService._filter_range(query, date_from, date_to)
+        if campus_id is not None:
+            query = query.join(User, Payment.user_id == User.id).filter(User.campus_id == campus_id)
+        rows = query.group_by(bucket, Payment.type, Payment.status).order_by(bucket).all()
 
-        return recharge_sum - expense_sum + refund_sum
+        grouped: Dict[str, list] = {}
+        for period, payment_type, payment_status, amount, count in rows:
+            grouped.setdefault(period, []).append((payment_type, payment_status, amount, count))
+
+        points = []
+        for period, period_rows in grouped.items():
+            totals = PaymentService._classify_totals(period_rows)
+            points.append({
+                "period": period,
+                "total_recharge": totals["recharge"],
+                "total_expense": totals["expense"],
+                "total_refund": totals["refund"],
+                "net_amount": totals["balance"],
+                "payment_count": totals["count"]
+            })
+        return {"granularity": granularity, "campus_id": campus_id, "points": points}
+
+    @staticmethod
+    def _scope_campus(current_user: User, campus_id: Optional[int]) -> Optional[int]:
+        """管理员统计范围：校区管理员只能查看本校区"""
+        if current_user.role not in [UserRole.SUPER_ADMIN, UserRole.CAMPUS_ADMIN]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="权限不足"
+            )
+        if current_user.role == UserRole.CAMPUS_ADMIN:
+            if current_user.campus_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="校区管理员未分配校区"
+                )
+            return current_user.campus_id
+        return campus_id
+
+    @staticmethod
+    def _filter_range(query, date_from: Optional[date], date_to: Optional[date]):
+        """按创建时间（UTC）过滤 [date_from, date_to]"""
+        if date_from:
+            query = query.filter(Payment.created_at >= datetime.combine(date_from, time.min, tzinfo=timezone.utc))
+        if date_to:
+            query = query.filter(Payment.created_at < datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc))
+        return query
     
     @staticmethod
     def create_recharge(db: Session, user_id: int, amount: Decimal, payment_method: str, description: Optional[str] = None) -> Payment:
         """创建充值记录
-        说明：为方便当前环境演示，线上充值创建后即视为成功并计入余额。
-        如需真实支付流程，可改为 PENDING 并通过回调/管理接口置为 SUCCESS。
+        说明：未接入支付网关时（PAYMENT_GATEWAY_ENABLED=False），线上充值创建后即视为成功并计入余额；
+        接入网关后微信/支付宝充值记为 PENDING，由网关回调置为 SUCCESS。
         """
+        via_gateway = settings.PAYMENT_GATEWAY_ENABLED and payment_method in SUPPORTED_GATEWAYS
         payment = Payment(
             user_id=user_id,
             type=str(PaymentType.RECHARGE),
             amount=amount,
             payment_method=payment_method,
-            status=str(PaymentStatus.SUCCESS),
+            status=str(PaymentStatus.PENDING if via_gateway else PaymentStatus.SUCCESS),
             description=description or f"账户充值 {amount}元",
-            paid_at=datetime.now()
+            paid_at=None if via_gateway else datetime.now()
         )
         
         db.add(payment)
+        if via_gateway:
+            db.flush()
+            payment.qr_code_url = PaymentGatewayService.gateway_pay_url(payment_method, payment)
+        LedgerService.post_payment(db, payment)
         db.commit()
         db.refresh(payment)
         
@@ -92,6 +220,7 @@ class PaymentService:
         payment.status = str(PaymentStatus.SUCCESS)
         payment.transaction_id = transaction_id
         payment.paid_at = datetime.now()
+        LedgerService.post_payment(db, payment)
         
         db.commit()
         
@@ -108,7 +237,7 @@ class PaymentService:
         return payment
     
     @staticmethod
-    def deduct_balance(db: Session, user_id: int, amount: Decimal, description: str) -> bool:
+    def deduct_balance(db: Session, user_id: int, amount: Decimal, description: str, campus_id: Optional[int] = None) -> bool:
         """扣除用户余额"""
         # 检查余额
         if not PaymentService.check_balance(db, user_id, amount):
@@ -126,6 +255,7 @@ class PaymentService:
         )
         
         db.add(payment)
+        LedgerService.post_payment(db, payment, campus_id)
         db.commit()
         
         # 记录系统日志
@@ -141,8 +271,12 @@ class PaymentService:
         return True
     
     @staticmethod
-    def refund_balance(db: Session, user_id: int, amount: Decimal, description: str) -> Payment:
-        """退费到用户余额"""
+    def refund_balance(db: Session, user_id: int, amount: Decimal, description: str, campus_id: Optional[int] = None,
+                       commit: bool = True) -> Payment:
+        """退费到用户余额
+
+        commit=False 时只 flush，退费记录和日志由调用方与其他变更一起提交。
+        """
         payment = Payment(
             user_id=user_id,
             type=str(PaymentType.REFUND),
@@ -154,6 +288,17 @@ class PaymentService:
         )
         
         db.add(payment)
+        LedgerService.post_payment(db, payment, campus_id)
+        if not commit:
+            db.flush()
+            db.add(SystemLog(
+                user_id=user_id,
+                action="balance_refund",
+                target_type="payment",
+                target_id=payment.id,
+                description=f"余额退费: {amount}元 - {description}"
+            ))
+            return payment
         db.commit()
         db.refresh(payment)
         
@@ -177,11 +322,14 @@ class PaymentService:
         payment_type: "PaymentType",
         description: Optional[str] = None,
         method: str = "balance",
+        campus_id: Optional[int] = None,
+        commit: bool = True,
     ) -> Payment:
         """创建通用支付记录（当前环境直接记为成功）。
 
         说明：为了便于演示，直接把支付状态置为 SUCCESS，并写入 paid_at；
         如需接入真实支付，可改为 PENDING 并由回调置成功。
+        commit=False 时只 flush，由调用方与其他变更一起提交。
         """
         payment = Payment(
             user_id=user_id,
@@ -194,6 +342,10 @@ class PaymentService:
         )
 
         db.add(payment)
+        LedgerService.post_payment(db, payment, campus_id)
+        if not commit:
+            db.flush()
+            return payment
         db.commit()
         db.refresh(payment)
 
@@ -213,6 +365,7 @@ class PaymentService:
         )
         
         db.add(payment)
+        LedgerService.post_payment(db, payment)
         db.commit()
         db.refresh(payment)
         
@@ -275,8 +428,9 @@ class PaymentService:
                 detail="支付记录不存在"
             )
         
-        # 这里应该调用微信支付API生成二维码
-        # 现在返回模拟的二维码URL
+        # 接入支付网关时返回网关支付页，否则返回模拟的二维码URL
+        if settings.PAYMENT_GATEWAY_ENABLED:
+            return PaymentGatewayService.gateway_pay_url("wechat", payment)
         qr_url = f"https://api.tabletennis.com/wechat/pay?payment_id={payment_id}&amount={payment.amount}"
         
         return qr_url
@@ -291,8 +445,9 @@ class PaymentService:
                 detail="支付记录不存在"
             )
         
-        # 这里应该调用支付宝API生成二维码
-        # 现在返回模拟的二维码URL
+        # 接入支付网关时返回网关支付页，否则返回模拟的二维码URL
+        if settings.PAYMENT_GATEWAY_ENABLED:
+            return PaymentGatewayService.gateway_pay_url("alipay", payment)
         qr_url = f"https://api.tabletennis.com/alipay/pay?payment_id={payment_id}&amount={payment.amount}"
         
         return qr_url
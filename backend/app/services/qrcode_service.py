@@ -0,0 +1,133 @@
+"""
+支付二维码图片生成
+
+图片按内容哈希命名保存在 UPLOAD_DIR/qrcodes 下，相同内容（含金额）直接复用已生成的文件；
+渲染在专用线程池中执行，不阻塞事件循环，同一内容的并发请求只渲染一次。
+文件通过 /static 挂载点提供并附带长期缓存头，超过 QR_CODE_TTL_HOURS 未被使用的文件由定时任务清理。
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+import qrcode
+import qrcode.image.svg
+from fastapi import HTTPException, status
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QR_CODE_SUBDIR = "qrcodes"
+QR_CODE_FORMATS = ("png", "svg")
+
+_executor = ThreadPoolExecutor(max_workers=settings.QR_CODE_RENDER_WORKERS, thread_name_prefix="qrcode")
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.RLock()  # 已完成的 future 会在 add_done_callback 中同步回调
+
+
+class QRCodeService:
+    """二维码服务"""
+
+    @staticmethod
+    async def get_image_url(content: str, fmt: str = "png") -> str:
+        """返回二维码图片的静态地址，图片不存在时在线程池中渲染"""
+        if fmt not in QR_CODE_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不支持的二维码格式"
+            )
+        file_name = QRCodeService._file_name(content, fmt)
+        path = os.path.join(QRCodeService._directory(), file_name)
+
+        if not QRCodeService._touch(path):
+            with _inflight_lock:
+                future = _inflight.get(file_name)
+                if future is None:
+                    future = _executor.submit(QRCodeService.render, content, fmt, path)
+                    _inflight[file_name] = future
+                    future.add_done_callback(lambda _: QRCodeService._release(file_name))
+            await asyncio.wrap_future(future)
+
+        return f"/static/{QR_CODE_SUBDIR}/{file_name}"
+
+    @staticmethod
+    def render(content: str, fmt: str, path: str) -> str:
+        """渲染二维码并原子地写入文件（先写临时文件再改名，读取方不会看到半个文件）"""
+        if os.path.exists(path):
+            return path
+
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=2)
+        qr.add_data(content)
+        qr.make(fit=True)
+        if fmt == "svg":
+            image = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        else:
+            image = qr.make_image(fill_color="black", back_color="white")
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            image.save(f)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def purge_expired(max_age_hours: Optional[int] = None) -> int:
+        """删除超过保留时间未被使用的二维码图片，返回删除数量"""
+        max_age_hours = settings.QR_CODE_TTL_HOURS if max_age_hours is None else max_age_hours
+        directory = QRCodeService._directory()
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    # 其他工作进程已经删除
+                    continue
+        return removed
+
+    @staticmethod
+    def purge_scheduled() -> int:
+        """调度器入口（文件在本机磁盘上，各进程重复清理无副作用，无需租约）"""
+        removed = QRCodeService.purge_expired()
+        if removed:
+            logger.info("已清理过期二维码图片 %d 个", removed)
+        return removed
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """文件存在时刷新修改时间（用于过期判断），返回是否存在"""
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        # 最近刷新过的文件不再重复写入元数据
+        if time.time() - mtime > settings.QR_CODE_TTL_HOURS * 3600 / 4:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return False
+        return True
+
+    @staticmethod
+    def _file_name(content: str, fmt: str) -> str:
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return f"{digest}.{fmt}"
+
+    @staticmethod
+    def _directory() -> str:
+        directory = os.path.join(settings.UPLOAD_DIR, QR_CODE_SUBDIR)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def _release(file_name: str) -> None:
+        with _inflight_lock:
+            _inflight.pop(file_name, None)
@@ -0,0 +1,211 @@
+"""
+学员等级分（Elo）
+
+- 比赛结果录入后增量更新双方等级分：期望胜率 E = 1 / (1 + 10^((Rb - Ra) / 400))，新分 = 旧分 + K x (实际 - E)
+- 前 RATING_PROVISIONAL_MATCHES 场使用更大的 K 值，新选手更快接近真实水平
+- 对阵的 rated_at 记录计分时间，全量重算按 rated_at 顺序重放所有已完成对阵，结果与增量计算一致；
+  修改已计分对阵的胜者时触发全量重算
+- 抽签和小组赛分组按等级分决定种子顺序（未计分的选手按初始分）
+"""
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.competition import CompetitionMatch
+from ..models.player_rating import PlayerRating
+from ..models.student import Student
+from ..models.user import User
+
+
+class _RatingState:
+    """全量重算时的内存状态（字段与 PlayerRating 同名，计算逻辑共用）"""
+    __slots__ = ("rating", "matches_played", "wins", "losses", "last_group_type", "last_match_at")
+
+    def __init__(self):
+        self.rating = settings.RATING_INITIAL
+        self.matches_played = 0
+        self.wins = 0
+        self.losses = 0
+        self.last_group_type = None
+        self.last_match_at = None
+
+
+class RatingService:
+    """等级分服务"""
+
+    @staticmethod
+    def apply_match(db: Session, match: CompetitionMatch, now: Optional[datetime] = None) -> bool:
+        """把一场已完成的对阵计入双方等级分（轮空、无胜者或已计分的对阵跳过），由调用方提交"""
+        if not RatingService._is_rateable(match) or match.rated_at is not None:
+            return False
+
+        now = now or datetime.now(timezone.utc)
+        ratings = {
+            rating.student_id: rating
+            for rating in db.query(PlayerRating).filter(
+                PlayerRating.student_id.in_([match.player1_id, match.player2_id])
+            ).with_for_update()
+        }
+        for student_id in (match.player1_id, match.player2_id):
+            if student_id not in ratings:
+                ratings[student_id] = PlayerRating(
+                    student_id=student_id, rating=settings.RATING_INITIAL, matches_played=0, wins=0, losses=0
+                )
+                db.add(ratings[student_id])
+
+        RatingService._apply(
+            ratings[match.player1_id], ratings[match.player2_id],
+            match.winner_id == match.player1_id, match.group_type, now
+        )
+        match.rated_at = now
+        return True
+
+    @staticmethod
+    def recompute_all(db: Session) -> Dict[str, Any]:
+        """按计分顺序重放全部已完成对阵，重建所有学员的等级分
+
+        只读取计算所需的列并在内存中单次遍历，结果整体替换 player_ratings。
+        历史上未计分的已完成对阵同时补记 rated_at（按实际结束时间），之后的增量计算保持同一顺序。
+        """
+        started = datetime.now(timezone.utc)
+        rated_order = func.coalesce(
+            CompetitionMatch.rated_at, CompetitionMatch.actual_end_time,
+            CompetitionMatch.updated_at, CompetitionMatch.created_at
+        )
+        rateable = (
+            CompetitionMatch.match_status == "completed",
+            CompetitionMatch.player1_id.isnot(None),
+            CompetitionMatch.player2_id.isnot(None),
+            CompetitionMatch.winner_id.isnot(None),
+        )
+        rows = db.connection().execute(
+            select(
+                CompetitionMatch.player1_id, CompetitionMatch.player2_id, CompetitionMatch.winner_id,
+                CompetitionMatch.group_type, rated_order
+            ).where(*rateable).order_by(rated_order, CompetitionMatch.id)
+        )
+
+        states: Dict[int, _RatingState] = {}
+        match_count = 0
+        for player1_id, player2_id, winner_id, group_type, rated_at in rows:
+            player1 = states.get(player1_id)
+            if player1 is None:
+                player1 = states[player1_id] = _RatingState()
+            player2 = states.get(player2_id)
+            if player2 is None:
+                player2 = states[player2_id] = _RatingState()
+            RatingService._apply(player1, player2, winner_id == player1_id, group_type, rated_at)
+            match_count += 1
+
+        db.execute(delete(PlayerRating))
+        if states:
+            db.execute(insert(PlayerRating), [
+                {
+                    "student_id": student_id,
+                    "rating": state.rating,
+                    "matches_played": state.matches_played,
+                    "wins": state.wins,
+                    "losses": state.losses,
+                    "last_group_type": state.last_group_type,
+                    "last_match_at": state.last_match_at,
+                }
+                for student_id, state in states.items()
+            ])
+        db.execute(
+            update(CompetitionMatch).where(*rateable, CompetitionMatch.rated_at.is_(None)).values(
+                rated_at=func.coalesce(CompetitionMatch.actual_end_time, CompetitionMatch.updated_at, CompetitionMatch.created_at)
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return {
+            "matches": match_count,
+            "players": len(states),
+            "elapsed_seconds": round((datetime.now(timezone.utc) - started).total_seconds(), 3),
+        }
+
+    @staticmethod
+    def get_leaderboard(
+        db: Session,
+        campus_id: Optional[int] = None,
+        group_type: Optional[str] = None,
+        min_matches: int = 0,
+        skip: int = 0,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """等级分排行榜，可按校区、最近参赛组别筛选"""
+        q = db.query(PlayerRating, User.real_name, User.campus_id).join(
+            Student, Student.id == PlayerRating.student_id
+        ).join(
+            User, User.id == Student.user_id
+        )
+        if campus_id:
+            q = q.filter(User.campus_id == campus_id)
+        if group_type:
+            q = q.filter(PlayerRating.last_group_type == group_type)
+        if min_matches:
+            q = q.filter(PlayerRating.matches_played >= min_matches)
+
+        rows = q.order_by(PlayerRating.rating.desc(), PlayerRating.student_id).offset(skip).limit(limit).all()
+        return [
+            {
+                "rank": skip + index,
+                "student_id": rating.student_id,
+                "real_name": real_name,
+                "campus_id": user_campus_id,
+                "rating": round(rating.rating, 1),
+                "matches_played": rating.matches_played,
+                "wins": rating.wins,
+                "losses": rating.losses,
+                "last_group_type": rating.last_group_type,
+            }
+            for index, (rating, real_name, user_campus_id) in enumerate(rows, start=1)
+        ]
+
+    @staticmethod
+    def seed(db: Session, student_ids: Sequence[int]) -> List[int]:
+        """按等级分从高到低排出种子顺序，同分（含未计分）随机"""
+        ratings = dict(
+            db.query(PlayerRating.student_id, PlayerRating.rating).filter(
+                PlayerRating.student_id.in_(student_ids)
+            ).all()
+        ) if student_ids else {}
+        seeded = list(student_ids)
+        random.shuffle(seeded)
+        seeded.sort(key=lambda student_id: ratings.get(student_id, settings.RATING_INITIAL), reverse=True)
+        return seeded
+
+    @staticmethod
+    def _is_rateable(match: CompetitionMatch) -> bool:
+        return (
+            match.match_status == "completed"
+            and match.player1_id is not None
+            and match.player2_id is not None
+            and match.winner_id is not None
+        )
+
+    @staticmethod
+    def _apply(player1, player2, player1_won: bool, group_type: Optional[str], played_at: Optional[datetime]) -> None:
+        """按一场结果更新双方（PlayerRating 或 _RatingState）"""
+        expected = 1.0 / (1.0 + 10 ** ((player2.rating - player1.rating) / 400.0))
+        delta = (1.0 if player1_won else 0.0) - expected
+        player1.rating += RatingService._k_factor(player1) * delta
+        player2.rating -= RatingService._k_factor(player2) * delta
+
+        for player, won in ((player1, player1_won), (player2, not player1_won)):
+            player.matches_played += 1
+            if won:
+                player.wins += 1
+            else:
+                player.losses += 1
+            player.last_group_type = group_type
+            player.last_match_at = played_at
+
+    @staticmethod
+    def _k_factor(player) -> float:
+        if player.matches_played < settings.RATING_PROVISIONAL_MATCHES:
+            return settings.RATING_PROVISIONAL_K_FACTOR
+        return settings.RATING_K_FACTOR
@@ -0,0 +1,261 @@
+"""
+支付对账
+
+把网关导出的对账单（CSV，至少包含 transaction_id、amount 两列）与 payments 表按交易号归并比对：
+两侧都按交易号有序流式读取，同时只持有当前交易号的一组记录，内存占用与对账单行数无关。
+对账单未排序时先做外部排序（分块排序写入临时文件后多路归并）。
+差异分类：
+- missing_in_payments:  对账单有、系统无
+- missing_in_statement: 系统已成功、对账单无
+- duplicate_in_statement / duplicate_in_payments: 同一交易号出现多次
+- amount_mismatch:      金额不一致
+- status_mismatch:      对账单有、系统记录未成功
+"""
+import csv
+import heapq
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.dialect import binary_order
+from ..models.payment import Payment, PaymentStatus
+from .payment_gateway_service import SUPPORTED_GATEWAYS
+
+DIFF_CATEGORIES = (
+    "missing_in_payments",
+    "missing_in_statement",
+    "duplicate_in_statement",
+    "duplicate_in_payments",
+    "amount_mismatch",
+    "status_mismatch",
+)
+
+
+class StatementRow(NamedTuple):
+    """对账单行"""
+    transaction_id: str
+    amount: Decimal
+    line: int
+
+
+class PaymentRow(NamedTuple):
+    """参与对账的支付记录（只取必要的列）"""
+    transaction_id: str
+    payment_id: int
+    amount: Decimal
+    status: str
+
+
+class ReconciliationService:
+    """对账服务"""
+
+    @staticmethod
+    def reconcile(
+        db: Session,
+        statement: Iterable[str],
+        gateway: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        presorted: bool = False
+    ) -> Dict[str, Any]:
+        """对账，statement 为 CSV 文本行的可迭代对象（文件对象即可）"""
+        if gateway is not None and gateway not in SUPPORTED_GATEWAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不支持的支付网关"
+            )
+        rows = ReconciliationService.read_statement(statement)
+        if not presorted:
+            rows = ReconciliationService.sort_statement(rows)
+        payments = ReconciliationService.stream_payments(db, gateway, date_from, date_to)
+        report = ReconciliationService.merge_join(rows, payments)
+        report.update({"gateway": gateway, "date_from": date_from, "date_to": date_to})
+        return report
+
+    @staticmethod
+    def read_statement(lines: Iterable[str]) -> Iterator[StatementRow]:
+        """逐行解析对账单"""
+        reader = csv.reader(lines)
+        header = [name.strip().lower() for name in next(reader, [])]
+        if "transaction_id" not in header or "amount" not in header:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="对账单缺少 transaction_id 或 amount 列"
+            )
+        id_index, amount_index = header.index("transaction_id"), header.index("amount")
+
+        for line, record in enumerate(reader, start=2):
+            if not record:
+                continue
+            try:
+                transaction_id = record[id_index].strip()
+                amount = Decimal(record[amount_index].strip())
+            except (IndexError, InvalidOperation):
+                transaction_id, amount = "", None
+            if not transaction_id or amount is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"对账单第{line}行格式错误"
+                )
+            yield StatementRow(transaction_id, amount, line)
+
+    @staticmethod
+    def sort_statement(rows: Iterable[StatementRow], chunk_rows: Optional[int] = None) -> Iterator[StatementRow]:
+        """按交易号外部排序：每 chunk_rows 行排序后写入临时文件，再多路归并"""
+        chunk_rows = chunk_rows or settings.RECONCILIATION_SORT_CHUNK_ROWS
+        with tempfile.TemporaryDirectory(prefix="reconcile-") as directory:
+            chunk_paths: List[str] = []
+            chunk: List[StatementRow] = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    chunk_paths.append(ReconciliationService._write_chunk(directory, len(chunk_paths), chunk))
+                    chunk = []
+
+            if not chunk_paths:
+                # 一个分块就能放下，不落盘
+                chunk.sort()
+                yield from chunk
+                return
+            if chunk:
+                chunk_paths.append(ReconciliationService._write_chunk(directory, len(chunk_paths), chunk))
+                chunk = []
+
+            files = [open(path, newline="", encoding="utf-8") for path in chunk_paths]
+            try:
+                readers = [
+                    (StatementRow(record[0], Decimal(record[1]), int(record[2])) for record in csv.reader(f))
+                    for f in files
+                ]
+                yield from heapq.merge(*readers)
+            finally:
+                for f in files:
+                    f.close()
+
+    @staticmethod
+    def stream_payments(
+        db: Session,
+        gateway: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Iterator[PaymentRow]:
+        """按交易号顺序分批流式读取网关支付记录"""
+        query = select(
+            Payment.transaction_id, Payment.id, Payment.amount, Payment.status
+        ).where(
+            Payment.transaction_id.isnot(None),
+            Payment.payment_method.in_([gateway] if gateway else SUPPORTED_GATEWAYS)
+        )
+        if date_from:
+            query = query.where(Payment.paid_at >= datetime.combine(date_from, time.min, tzinfo=timezone.utc))
+        if date_to:
+            query = query.where(Payment.paid_at < datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc))
+        query = query.order_by(binary_order(db, Payment.transaction_id), Payment.id)
+
+        # 只读取标量列，直接走连接执行，省去 ORM 结果处理的开销
+        result = db.connection().execute(query.execution_options(yield_per=settings.RECONCILIATION_DB_BATCH_SIZE))
+        try:
+            for row in result:
+                yield PaymentRow._make(row)
+        finally:
+            result.close()
+
+    @staticmethod
+    def merge_join(statement_rows: Iterable[StatementRow], payment_rows: Iterable[PaymentRow]) -> Dict[str, Any]:
+        """归并比对两个按交易号有序的序列"""
+        max_details = settings.RECONCILIATION_MAX_DETAILS
+        counts = {category: 0 for category in DIFF_CATEGORIES}
+        details: Dict[str, List[Dict[str, Any]]] = {category: [] for category in DIFF_CATEGORIES}
+        totals = {"statement_rows": 0, "payment_rows": 0, "matched": 0, "matched_amount": Decimal("0")}
+        success = str(PaymentStatus.SUCCESS)
+
+        def report(category: str, transaction_id: str, statement_group=(), payment_group=()):
+            counts[category] += 1
+            if len(details[category]) < max_details:
+                details[category].append({
+                    "transaction_id": transaction_id,
+                    "statement_amount": statement_group[0].amount if statement_group else None,
+                    "payment_amount": payment_group[0].amount if payment_group else None,
+                    "payment_ids": [row.payment_id for row in payment_group],
+                    "statement_lines": [row.line for row in statement_group],
+                })
+
+        statements = ReconciliationService._groups(statement_rows, "对账单")
+        payments = ReconciliationService._groups(payment_rows, "支付记录")
+        statement = next(statements, None)
+        payment = next(payments, None)
+
+        while statement is not None or payment is not None:
+            if payment is None or (statement is not None and statement[0] < payment[0]):
+                transaction_id, group = statement
+                totals["statement_rows"] += len(group)
+                report("missing_in_payments", transaction_id, statement_group=group)
+                statement = next(statements, None)
+                continue
+            if statement is None or payment[0] < statement[0]:
+                transaction_id, group = payment
+                totals["payment_rows"] += len(group)
+                # 未成功的支付本来就不应出现在对账单中
+                if any(row.status == success for row in group):
+                    report("missing_in_statement", transaction_id, payment_group=group)
+                payment = next(payments, None)
+                continue
+
+            transaction_id, statement_group = statement
+            _, payment_group = payment
+            totals["statement_rows"] += len(statement_group)
+            totals["payment_rows"] += len(payment_group)
+            clean = True
+            if len(statement_group) > 1:
+                report("duplicate_in_statement", transaction_id, statement_group, payment_group)
+                clean = False
+            if len(payment_group) > 1:
+                report("duplicate_in_payments", transaction_id, statement_group, payment_group)
+                clean = False
+            if statement_group[0].amount != payment_group[0].amount:
+                report("amount_mismatch", transaction_id, statement_group, payment_group)
+                clean = False
+            if payment_group[0].status != success:
+                report("status_mismatch", transaction_id, statement_group, payment_group)
+                clean = False
+            if clean:
+                totals["matched"] += 1
+                totals["matched_amount"] += statement_group[0].amount
+            statement = next(statements, None)
+            payment = next(payments, None)
+
+        return {
+            **totals,
+            "counts": counts,
+            "details": details,
+            "truncated": any(counts[category] > len(details[category]) for category in DIFF_CATEGORIES),
+        }
+
+    @staticmethod
+    def _groups(rows: Iterable[Tuple], source: str) -> Iterator[Tuple[str, List]]:
+        """按交易号分组（同一交易号的行相邻），并校验顺序"""
+        previous = None
+        for transaction_id, group in groupby(rows, key=lambda row: row.transaction_id):
+            if previous is not None and transaction_id < previous:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{source}未按交易号排序: {transaction_id} 出现在 {previous} 之后"
+                )
+            previous = transaction_id
+            yield transaction_id, list(group)
+
+    @staticmethod
+    def _write_chunk(directory: str, index: int, chunk: List[StatementRow]) -> str:
+        chunk.sort()
+        path = os.path.join(directory, f"chunk-{index}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows((row.transaction_id, str(row.amount), row.line) for row in chunk)
+        return path
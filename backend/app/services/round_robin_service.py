@@ -0,0 +1,244 @@
+"""
+小组循环赛排程
+
+- 分组：按种子顺序蛇形分入各小组，各组人数最多相差 1
+- 轮次：组内用轮转法（circle method）生成，每轮每名选手最多一场，人数为奇数时每轮一人轮空
+- 排程：时间按单场时长切分为时段，逐个时段把可开赛的对阵分配到空闲球台（贪心列表调度）：
+  - 选手必须休息够 rest_minutes 才能开始下一场
+  - 优先安排剩余场次最多的选手（他们决定了总时长的下界），其次按轮次先后
+  - 同校区已被预约或其他比赛占用的球台时段跳过
+  - 每个比赛日从开赛时刻起排 COMPETITION_DAY_HOURS 小时，排不下顺延到下一天
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.dialect import to_utc
+from ..models.booking import Booking, BookingStatus
+from ..models.competition import Competition, CompetitionMatch, MatchStage
+from .booking_service import BookingService
+
+
+class PoolMatch(NamedTuple):
+    """待排程的小组赛对阵"""
+    pool_number: int
+    round_number: int
+    match_number: int
+    player1_id: int
+    player2_id: int
+
+
+class RoundRobinService:
+    """小组循环赛服务"""
+
+    @staticmethod
+    def split_pools(seeded_players: Sequence[int], pool_size: int) -> List[List[int]]:
+        """按种子顺序蛇形分组：1..k 号种子分别进入 1..k 组，k+1..2k 号种子倒序进入 k..1 组，依此类推"""
+        pool_count = max(1, math.ceil(len(seeded_players) / pool_size))
+        pools: List[List[int]] = [[] for _ in range(pool_count)]
+        for index, player_id in enumerate(seeded_players):
+            row, column = divmod(index, pool_count)
+            pools[column if row % 2 == 0 else pool_count - 1 - column].append(player_id)
+        return pools
+
+    @staticmethod
+    def circle_rounds(players: Sequence[int]) -> List[List[Tuple[int, int]]]:
+        """轮转法生成组内各轮对阵：固定第一个位置，其余位置每轮顺时针转动一格"""
+        slots: List[Optional[int]] = list(players)
+        if len(slots) % 2 == 1:
+            slots.append(None)  # None 代表本轮轮空
+        half = len(slots) // 2
+
+        rounds = []
+        for _ in range(len(slots) - 1):
+            pairs = [(slots[i], slots[-1 - i]) for i in range(half)]
+            rounds.append([pair for pair in pairs if pair[0] is not None and pair[1] is not None])
+            slots = [slots[0], slots[-1]] + slots[1:-1]
+        return rounds
+
+    @staticmethod
+    def build_matches(seeded_players: Sequence[int], pool_size: int) -> List[PoolMatch]:
+        """生成所有小组的全部对阵"""
+        matches = []
+        for pool_number, pool in enumerate(RoundRobinService.split_pools(seeded_players, pool_size), start=1):
+            for round_number, pairs in enumerate(RoundRobinService.circle_rounds(pool), start=1):
+                for match_number, (player1_id, player2_id) in enumerate(pairs, start=1):
+                    matches.append(PoolMatch(pool_number, round_number, match_number, player1_id, player2_id))
+        return matches
+
+    @staticmethod
+    def assign_slots(
+        matches: Sequence[PoolMatch],
+        tables: Sequence[str],
+        start_time: datetime,
+        blocked: Dict[str, List[Tuple[datetime, datetime]]],
+        match_minutes: int,
+        rest_minutes: int
+    ) -> List[Tuple[str, datetime]]:
+        """为每场对阵分配 (球台, 开始时间)，顺序与 matches 一致；blocked 为各球台已占用的时间段
+
+        在 COMPETITION_SCHEDULE_MAX_DAYS 天内排不完时抛出400。
+        """
+        slots_per_day = settings.COMPETITION_DAY_HOURS * 60 // match_minutes
+        total_slots = slots_per_day * settings.COMPETITION_SCHEDULE_MAX_DAYS
+        if slots_per_day < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="单场比赛时长超过了每日比赛时长"
+            )
+
+        def slot_start(slot: int) -> int:
+            """时段开始时间（距开赛时刻的分钟数）"""
+            day, index = divmod(slot, slots_per_day)
+            return day * 24 * 60 + index * match_minutes
+
+        # 已占用的球台时段预先展开成时段编号集合
+        blocked_slots: Dict[str, Set[int]] = {table: set() for table in tables}
+        for table, intervals in blocked.items():
+            if table not in blocked_slots:
+                continue
+            for busy_from, busy_to in intervals:
+                busy_from = (busy_from - start_time).total_seconds() / 60
+                busy_to = (busy_to - start_time).total_seconds() / 60
+                day = max(0, int(busy_from // (24 * 60)))
+                while day < settings.COMPETITION_SCHEDULE_MAX_DAYS and day * 24 * 60 < busy_to:
+                    for index in range(slots_per_day):
+                        begin = day * 24 * 60 + index * match_minutes
+                        if begin < busy_to and begin + match_minutes > busy_from:
+                            blocked_slots[table].add(day * slots_per_day + index)
+                    day += 1
+
+        remaining: Dict[int, int] = {}
+        for match in matches:
+            remaining[match.player1_id] = remaining.get(match.player1_id, 0) + 1
+            remaining[match.player2_id] = remaining.get(match.player2_id, 0) + 1
+        ready_at: Dict[int, int] = {}  # 选手最早可以开始下一场的时间（分钟）
+
+        assignment: List[Optional[Tuple[str, datetime]]] = [None] * len(matches)
+        pending = list(range(len(matches)))
+        for slot in range(total_slots):
+            if not pending:
+                break
+            free_tables = [table for table in tables if slot not in blocked_slots[table]]
+            if not free_tables:
+                continue
+            begin = slot_start(slot)
+            pending.sort(key=lambda i: (
+                -max(remaining[matches[i].player1_id], remaining[matches[i].player2_id]),
+                matches[i].round_number,
+                matches[i].pool_number,
+                matches[i].match_number
+            ))
+
+            playing: Set[int] = set()
+            still_pending = []
+            for i in pending:
+                match = matches[i]
+                if (
+                    len(playing) // 2 >= len(free_tables)
+                    or match.player1_id in playing or match.player2_id in playing
+                    or ready_at.get(match.player1_id, 0) > begin
+                    or ready_at.get(match.player2_id, 0) > begin
+                ):
+                    still_pending.append(i)
+                    continue
+                assignment[i] = (free_tables[len(playing) // 2], start_time + timedelta(minutes=begin))
+                playing.update((match.player1_id, match.player2_id))
+                for player_id in (match.player1_id, match.player2_id):
+                    remaining[player_id] -= 1
+                    ready_at[player_id] = begin + match_minutes + rest_minutes
+            pending = still_pending
+
+        if pending:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{settings.COMPETITION_SCHEDULE_MAX_DAYS}天内无法排完全部{len(matches)}场比赛，请增加球台或缩短单场时长"
+            )
+        return assignment
+
+    @staticmethod
+    def load_blocked(
+        db: Session,
+        campus_id: int,
+        start_time: datetime,
+        end_time: datetime,
+        match_minutes: int,
+        exclude: Tuple[int, str]
+    ) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """校区内各球台在排程时间范围内已被占用的时间段：有效预约 + 本校区其他比赛已排定的对阵
+
+        exclude 为 (比赛ID, 组别)，即将重新排程的小组赛不计入占用。
+        """
+        blocked: Dict[str, List[Tuple[datetime, datetime]]] = {}
+        bookings = db.query(Booking.table_number, Booking.start_time, Booking.end_time).filter(
+            Booking.campus_id == campus_id,
+            Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]),
+            Booking.start_time < end_time,
+            Booking.end_time > start_time,
+            Booking.table_number.isnot(None)
+        ).all()
+        for table, busy_from, busy_to in bookings:
+            blocked.setdefault(table, []).append((to_utc(busy_from), to_utc(busy_to)))
+
+        competition_id, group_type = exclude
+        scheduled = db.query(
+            CompetitionMatch.table_number, CompetitionMatch.scheduled_time,
+            CompetitionMatch.competition_id, CompetitionMatch.group_type, CompetitionMatch.stage
+        ).join(
+            Competition, Competition.id == CompetitionMatch.competition_id
+        ).filter(
+            Competition.campus_id == campus_id,
+            CompetitionMatch.scheduled_time >= start_time - timedelta(minutes=match_minutes),
+            CompetitionMatch.scheduled_time < end_time,
+            CompetitionMatch.table_number.isnot(None)
+        ).all()
+        for table, scheduled_time, match_competition_id, match_group_type, stage in scheduled:
+            if (match_competition_id, match_group_type, stage) == (competition_id, group_type, MatchStage.GROUP.value):
+                continue
+            busy_from = to_utc(scheduled_time)
+            blocked.setdefault(table, []).append((busy_from, busy_from + timedelta(minutes=match_minutes)))
+        return blocked
+
+    @staticmethod
+    def schedule(
+        db: Session,
+        competition: Competition,
+        group_type: str,
+        seeded_players: Sequence[int],
+        pool_size: int,
+        start_time: Optional[datetime] = None,
+        table_count: Optional[int] = None,
+        match_minutes: Optional[int] = None,
+        rest_minutes: Optional[int] = None
+    ) -> List[CompetitionMatch]:
+        """生成并排定小组赛对阵（只构造对象不写库，由调用方统一提交）"""
+        match_minutes = match_minutes or settings.COMPETITION_MATCH_MINUTES
+        rest_minutes = settings.COMPETITION_REST_MINUTES if rest_minutes is None else rest_minutes
+        start_time = to_utc(start_time or competition.competition_date)
+        tables = BookingService._table_numbers()[:table_count] if table_count else BookingService._table_numbers()
+
+        pool_matches = RoundRobinService.build_matches(seeded_players, pool_size)
+        end_time = start_time + timedelta(days=settings.COMPETITION_SCHEDULE_MAX_DAYS)
+        blocked = RoundRobinService.load_blocked(db, competition.campus_id, start_time, end_time, match_minutes, (competition.id, group_type))
+        assignment = RoundRobinService.assign_slots(pool_matches, tables, start_time, blocked, match_minutes, rest_minutes)
+
+        return [
+            CompetitionMatch(
+                competition_id=competition.id,
+                group_type=group_type,
+                stage=MatchStage.GROUP.value,
+                pool_number=match.pool_number,
+                round_number=match.round_number,
+                match_number=match.match_number,
+                player1_id=match.player1_id,
+                player2_id=match.player2_id,
+                match_status="pending",
+                table_number=table,
+                scheduled_time=scheduled_time
+            )
+            for match, (table, scheduled_time) in zip(pool_matches, assignment)
+        ]
@@ -0,0 +1,247 @@
+"""
+比赛实时比分
+
+- 每场比赛缓存一份预先序列化好的全量对阵快照（JSON 字节串，含选手姓名），版本号为 competitions.results_version；
+  录入结果、生成对阵时在同一事务内递增版本号，只有版本号变化时才重建快照，观众再多也只是返回同一份字节串
+- SSE 推送：每个工作进程内，每场有观众的比赛只有一个轮询任务，每 SCOREBOARD_POLL_SECONDS 秒读取一次版本号
+  （本进程录入结果后立即唤醒）；版本变化时重建快照并与上一份逐场对比，只把有变化的对阵推送给订阅者
+- 版本号保存在数据库中，其他工作进程录入的结果同样会在下一次轮询时推送给本进程的观众
+- 订阅者消费过慢（队列已满）时丢弃其积压的增量，改为重发一次全量快照
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, NamedTuple, Optional, Set
+
+from fastapi import HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..db.database import SessionLocal
+from ..models.competition import Competition, CompetitionMatch
+from .bracket_service import BracketService
+
+logger = logging.getLogger(__name__)
+
+EVENT_SNAPSHOT = "snapshot"
+EVENT_MATCHES = "matches"
+KEEPALIVE_MESSAGE = b": ping\n\n"
+
+
+class Snapshot(NamedTuple):
+    """某一版本的全量对阵"""
+    version: int
+    payload: bytes                       # 序列化后的全量快照（JSON）
+    event: bytes                         # 同一快照的 SSE 消息
+    matches: Dict[int, Dict[str, Any]]   # 对阵ID -> 对阵数据，用于计算增量
+
+
+class _Feed:
+    """一场比赛在本进程内的推送状态（只在事件循环线程中访问）"""
+
+    def __init__(self, competition_id: int, loop: asyncio.AbstractEventLoop):
+        self.competition_id = competition_id
+        self.loop = loop
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.wakeup = asyncio.Event()
+        self.snapshot: Optional[Snapshot] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+_snapshots = TTLCache(ttl_seconds=None, max_entries=settings.SCOREBOARD_CACHE_SIZE)
+_build_locks: Dict[int, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+_feeds: Dict[int, _Feed] = {}
+
+
+class ScoreboardService:
+    """实时比分服务"""
+
+    @staticmethod
+    def mark_changed(db: Session, competition_id: int) -> None:
+        """递增比赛的结果版本号，与对阵的修改在同一事务内提交"""
+        db.query(Competition).filter(Competition.id == competition_id).update(
+            {Competition.results_version: Competition.results_version + 1}, synchronize_session=False
+        )
+
+    @staticmethod
+    def notify(competition_id: int) -> None:
+        """提交后调用：唤醒本进程内该比赛的推送任务，不必等到下一次轮询（可在任意线程调用）"""
+        feed = _feeds.get(competition_id)
+        if feed is not None:
+            feed.loop.call_soon_threadsafe(feed.wakeup.set)
+
+    @staticmethod
+    def get_snapshot(db: Session, competition_id: int) -> Snapshot:
+        """返回最新的全量快照，版本号未变化时直接复用缓存（同一比赛并发重建只执行一次）"""
+        version = db.query(Competition.results_version).filter(Competition.id == competition_id).scalar()
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="比赛不存在"
+            )
+
+        snapshot = _snapshots.get(competition_id)
+        if snapshot is not None and snapshot.version >= version:
+            return snapshot
+
+        with _build_locks_guard:
+            lock = _build_locks.setdefault(competition_id, threading.Lock())
+        with lock:
+            snapshot = _snapshots.get(competition_id)
+            if snapshot is not None and snapshot.version >= version:
+                return snapshot
+            snapshot = ScoreboardService._build(db, competition_id, version)
+            _snapshots.set(competition_id, snapshot)
+            return snapshot
+
+    @staticmethod
+    def load(competition_id: int) -> Snapshot:
+        """使用独立会话读取快照（供事件循环通过线程调用）"""
+        db = SessionLocal()
+        try:
+            return ScoreboardService.get_snapshot(db, competition_id)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def stream(competition_id: int, request: Request) -> AsyncIterator[bytes]:
+        """SSE 消息流：先发送全量快照，之后只发送有变化的对阵，空闲时定期发送注释行保活"""
+        queue = ScoreboardService._subscribe(competition_id)
+        try:
+            # 先订阅再读取快照，两者之间产生的变化会以增量的形式到达，不会遗漏
+            snapshot = await asyncio.to_thread(ScoreboardService.load, competition_id)
+            sent_version = snapshot.version
+            yield snapshot.event
+
+            while not await request.is_disconnected():
+                try:
+                    version, message = await asyncio.wait_for(queue.get(), timeout=settings.SCOREBOARD_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_MESSAGE
+                    continue
+                # 增量携带的是对阵的完整数据，重复应用无副作用；已包含在所发快照中的跳过
+                if version <= sent_version:
+                    continue
+                sent_version = version
+                yield message
+        finally:
+            ScoreboardService._unsubscribe(competition_id, queue)
+
+    @staticmethod
+    def _build(db: Session, competition_id: int, version: int) -> Snapshot:
+        """一次查询读取比赛全部组别、赛段的对阵并序列化"""
+        rows = BracketService.query_with_names(db).filter(
+            CompetitionMatch.competition_id == competition_id
+        ).order_by(
+            CompetitionMatch.group_type, CompetitionMatch.stage, CompetitionMatch.pool_number,
+            CompetitionMatch.round_number, CompetitionMatch.match_number
+        ).all()
+
+        matches = {
+            match.id: jsonable_encoder({
+                "id": match.id,
+                "group_type": match.group_type,
+                "stage": match.stage,
+                "pool_number": match.pool_number,
+                "round_number": match.round_number,
+                "match_number": match.match_number,
+                "player1_id": match.player1_id,
+                "player1_name": player1_name,
+                "player2_id": match.player2_id,
+                "player2_name": player2_name,
+                "player1_score": match.player1_score,
+                "player2_score": match.player2_score,
+                "winner_id": match.winner_id,
+                "match_status": match.match_status,
+                "table_number": match.table_number,
+                "scheduled_time": match.scheduled_time,
+            })
+            for match, player1_name, player2_name in rows
+        }
+        payload = ScoreboardService._dumps({
+            "competition_id": competition_id,
+            "version": version,
+            "matches": list(matches.values()),
+        })
+        return Snapshot(version, payload, ScoreboardService._event(EVENT_SNAPSHOT, version, payload), matches)
+
+    @staticmethod
+    def _subscribe(competition_id: int) -> asyncio.Queue:
+        feed = _feeds.get(competition_id)
+        if feed is None:
+            feed = _feeds[competition_id] = _Feed(competition_id, asyncio.get_running_loop())
+            feed.task = asyncio.create_task(ScoreboardService._run_feed(competition_id, feed))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SCOREBOARD_QUEUE_SIZE)
+        feed.subscribers.add(queue)
+        return queue
+
+    @staticmethod
+    def _unsubscribe(competition_id: int, queue: asyncio.Queue) -> None:
+        feed = _feeds.get(competition_id)
+        if feed is not None:
+            feed.subscribers.discard(queue)
+            if not feed.subscribers:
+                feed.wakeup.set()  # 推送任务随即退出
+
+    @staticmethod
+    async def _run_feed(competition_id: int, feed: _Feed) -> None:
+        """推送任务：比赛还有订阅者时轮询版本号，变化时计算增量并分发"""
+        try:
+            while feed.subscribers:
+                feed.wakeup.clear()
+                try:
+                    snapshot = await asyncio.to_thread(ScoreboardService.load, competition_id)
+                except HTTPException:
+                    snapshot = None  # 比赛已被删除，订阅者断开后任务结束
+                except Exception:
+                    logger.exception("刷新比赛 %s 的实时比分失败", competition_id)
+                    snapshot = None
+                if snapshot is not None and (feed.snapshot is None or snapshot.version > feed.snapshot.version):
+                    ScoreboardService._publish(feed, snapshot)
+
+                try:
+                    await asyncio.wait_for(feed.wakeup.wait(), timeout=settings.SCOREBOARD_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if _feeds.get(competition_id) is feed:
+                del _feeds[competition_id]
+
+    @staticmethod
+    def _publish(feed: _Feed, snapshot: Snapshot) -> None:
+        """与上一份快照对比，把增量（或首份快照）放入每个订阅者的队列"""
+        previous, feed.snapshot = feed.snapshot, snapshot
+        if previous is None:
+            message = snapshot.event
+        else:
+            changed = [data for match_id, data in snapshot.matches.items() if previous.matches.get(match_id) != data]
+            removed = [match_id for match_id in previous.matches if match_id not in snapshot.matches]
+            if not changed and not removed:
+                return
+            message = ScoreboardService._event(EVENT_MATCHES, snapshot.version, ScoreboardService._dumps({
+                "competition_id": feed.competition_id,
+                "version": snapshot.version,
+                "matches": changed,
+                "removed": removed,
+            }))
+
+        for queue in feed.subscribers:
+            try:
+                queue.put_nowait((snapshot.version, message))
+            except asyncio.QueueFull:
+                # 消费过慢：丢弃积压的增量，改发全量快照
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((snapshot.version, snapshot.event))
+
+    @staticmethod
+    def _dumps(data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _event(name: str, version: int, data: bytes) -> bytes:
+        return b"event: %s\nid: %d\ndata: %s\n\n" % (name.encode(), version, data)
@@ -0,0 +1,212 @@
+"""
+球台占用热力图服务
+
+把已确认/已完成预约按 (校区, 球台, 周内小时) 分桶，得到每个校区 球台 × 168小时 的占用矩阵。
+按自然周（周一 00:00 UTC 起）计算：已结束的周数据不再变化，按周缓存；当前及未来的周每次重新计算。
+"""
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..db import dialect
+from ..models.booking import Booking, BookingStatus
+from ..models.campus import Campus
+from ..models.user import User, UserRole
+from .booking_service import BookingService
+
+HOURS_PER_WEEK = 7 * 24
+OCCUPIED_STATUSES = [BookingStatus.CONFIRMED.value, BookingStatus.COMPLETED.value]
+# 以某个周一 00:00 UTC 为原点，便于用整除得到周序号与周内小时
+_EPOCH = datetime(1970, 1, 5, tzinfo=timezone.utc)
+
+# 周一日期 -> {校区ID: {球台编号: [168个小时的占用时长]}}
+WeekBuckets = Dict[int, Dict[str, List[float]]]
+_week_cache = TTLCache(ttl_seconds=settings.TABLE_OCCUPANCY_CACHE_TTL_SECONDS, max_entries=1000)
+
+
+class TableOccupancyService:
+    """球台占用分析服务"""
+
+    @staticmethod
+    def get_heatmap(db: Session, date_from: date, date_to: date, current_user: User,
+                    campus_id: Optional[int] = None) -> Dict:
+        """获取 [date_from, date_to] 覆盖的各自然周内，各校区球台 × 周内小时的占用率矩阵"""
+        if date_from > date_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="开始日期不能晚于结束日期"
+            )
+        if (date_to - date_from).days > settings.TABLE_OCCUPANCY_MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"统计范围不能超过{settings.TABLE_OCCUPANCY_MAX_DAYS}天"
+            )
+        if current_user.role == UserRole.CAMPUS_ADMIN:
+            if current_user.campus_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="校区管理员未分配校区"
+                )
+            campus_id = current_user.campus_id
+
+        first_week = date_from - timedelta(days=date_from.weekday())
+        weeks = [first_week + timedelta(weeks=i) for i in range((date_to - first_week).days // 7 + 1)]
+        week_buckets = TableOccupancyService._load_weeks(db, weeks)
+
+        # 合并各周的分桶
+        merged: Dict[int, Dict[str, List[float]]] = {}
+        for week_start in weeks:
+            for bucket_campus_id, tables in week_buckets[week_start].items():
+                if campus_id is not None and bucket_campus_id != campus_id:
+                    continue
+                campus_tables = merged.setdefault(bucket_campus_id, {})
+                for table_number, hours in tables.items():
+                    target = campus_tables.get(table_number)
+                    if target is None:
+                        campus_tables[table_number] = list(hours)
+                    else:
+                        for index, value in enumerate(hours):
+                            if value:
+                                target[index] += value
+
+        campus_query = db.query(Campus.id, Campus.name)
+        if campus_id is not None:
+            campus_query = campus_query.filter(Campus.id == campus_id)
+        campus_names = dict(campus_query.all())
+
+        week_count = len(weeks)
+        campuses = []
+        for heatmap_campus_id in sorted(set(campus_names) | set(merged)):
+            tables = merged.get(heatmap_campus_id, {})
+            table_numbers = BookingService._table_numbers()
+            table_numbers += sorted(set(tables) - set(table_numbers))
+
+            rows = []
+            total_hours = 0.0
+            for table_number in table_numbers:
+                hours = tables.get(table_number) or [0.0] * HOURS_PER_WEEK
+                booked = sum(hours)
+                total_hours += booked
+                rows.append({
+                    "table_number": table_number,
+                    "booked_hours": round(booked, 2),
+                    "utilization_rate": round(booked / (HOURS_PER_WEEK * week_count), 4),
+                    "occupancy": [round(value / week_count, 3) for value in hours]
+                })
+
+            hour_totals = [0.0] * HOURS_PER_WEEK
+            for table_hours in tables.values():
+                for index, value in enumerate(table_hours):
+                    hour_totals[index] += value
+            table_count = len(table_numbers)
+            campuses.append({
+                "campus_id": heatmap_campus_id,
+                "campus_name": campus_names.get(heatmap_campus_id),
+                "table_count": table_count,
+                "booked_hours": round(total_hours, 2),
+                "utilization_rate": round(total_hours / (HOURS_PER_WEEK * week_count * table_count), 4),
+                # 每个周内小时平均同时占用的球台数，峰值即所需球台数的参考
+                "concurrent_tables": [round(value / week_count, 3) for value in hour_totals],
+                "peak_concurrent_tables": round(max(hour_totals) / week_count, 3),
+                "tables": rows
+            })
+
+        return {
+            "date_from": weeks[0],
+            "date_to": weeks[-1] + timedelta(days=6),
+            "weeks": week_count,
+            "hours_per_week": HOURS_PER_WEEK,
+            "campuses": campuses
+        }
+
+    @staticmethod
+    def _load_weeks(db: Session, weeks: List[date]) -> Dict[date, WeekBuckets]:
+        """读取各周分桶：已结束的周走缓存，其余周用一次查询批量计算"""
+        current_week = datetime.now(timezone.utc).date()
+        current_week -= timedelta(days=current_week.weekday())
+
+        result: Dict[date, WeekBuckets] = {}
+        missing: List[date] = []
+        for week_start in weeks:
+            cached = _week_cache.get(week_start) if week_start < current_week else None
+            if cached is None:
+                missing.append(week_start)
+            else:
+                result[week_start] = cached
+
+        if missing:
+            computed = TableOccupancyService._compute_weeks(db, missing[0], missing[-1] + timedelta(weeks=1))
+            for week_start in missing:
+                buckets = computed.get(week_start, {})
+                result[week_start] = buckets
+                if week_start < current_week:
+                    _week_cache.set(week_start, buckets)
+        return result
+
+    @staticmethod
+    def _compute_weeks(db: Session, range_start: date, range_end: date) -> Dict[date, WeekBuckets]:
+        """对 [range_start, range_end) 内的预约按小时分桶
+
+        只取四列并以元组方式遍历；单次预约最长数小时，每条记录只涉及少量小时桶。
+        未安装 NumPy（非项目依赖），用纯 Python 循环完成分桶。
+        """
+        start_dt = datetime.combine(range_start, time.min, tzinfo=timezone.utc)
+        end_dt = datetime.combine(range_end, time.min, tzinfo=timezone.utc)
+        epoch_seconds = _EPOCH.timestamp()
+        # 时间直接以时间戳形式取出，省去逐行解析 datetime 的开销
+        rows = db.connection().execute(
+            select(
+                Booking.campus_id,
+                Booking.table_number,
+                dialect.epoch_seconds(db, Booking.start_time),
+                dialect.epoch_seconds(db, Booking.end_time)
+            ).where(
+                Booking.status.in_(OCCUPIED_STATUSES),
+                Booking.table_number.isnot(None),
+                Booking.start_time < end_dt,
+                Booking.end_time > start_dt
+            )
+        ).all()
+
+        range_first_hour = (start_dt.timestamp() - epoch_seconds) / 3600
+        range_last_hour = (end_dt.timestamp() - epoch_seconds) / 3600
+
+        # (周序号, 校区ID, 球台编号) -> 168个小时的占用时长
+        cells: Dict[tuple, List[float]] = {}
+        for campus_id, table_number, start_seconds, end_seconds in rows:
+            start_hour = (float(start_seconds) - epoch_seconds) / 3600
+            end_hour = (float(end_seconds) - epoch_seconds) / 3600
+            if start_hour < range_first_hour:
+                start_hour = range_first_hour
+            if end_hour > range_last_hour:
+                end_hour = range_last_hour
+
+            hour = math.floor(start_hour)
+            week_index, hour_of_week = divmod(hour, HOURS_PER_WEEK)
+            key = (week_index, campus_id, table_number)
+            hours = cells.get(key)
+            if hours is None:
+                hours = cells[key] = [0.0] * HOURS_PER_WEEK
+            while hour < end_hour:
+                if hour_of_week == HOURS_PER_WEEK:
+                    # 跨周的预约，剩余部分计入下一周
+                    week_index, hour_of_week = week_index + 1, 0
+                    key = (week_index, campus_id, table_number)
+                    hours = cells.get(key)
+                    if hours is None:
+                        hours = cells[key] = [0.0] * HOURS_PER_WEEK
+                hours[hour_of_week] += min(end_hour, hour + 1) - max(start_hour, hour)
+                hour += 1
+                hour_of_week += 1
+
+        result: Dict[date, WeekBuckets] = {}
+        for (week_index, campus_id, table_number), hours in cells.items():
+            week_start = (_EPOCH + timedelta(weeks=week_index)).date()
+            result.setdefault(week_start, {}).setdefault(campus_id, {})[table_number] = hours
+        return result
@@ -4,9 +4,16 @@ from ..models.user import User, UserRole
 from ..models.student import Student
 from ..models.coach import Coach
 from ..schemas.user import UserCreate, UserUpdate, UserLogin
-from ..core.security import get_password_hash, verify_password, create_access_token
+from ..core.config import settings
+from ..core.rate_limit import SlidingWindowLimiter
+from ..core.security import get_password_hash, verify_password, verify_and_update_password, password_hash_slot
+from ..services.entitlement_service import EntitlementService
 from ..services.system_log_service import SystemLogService
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+# 按用户名限制登录尝试次数，避免暴力破解流量占满密码校验线程池
+_login_limiter = SlidingWindowLimiter(settings.LOGIN_RATE_LIMIT_ATTEMPTS, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
 
 class UserService:
     """用户服务"""
@@ -31,6 +38,9 @@ class UserService:
         # 统一角色值
         role = UserService._normalize_role(user_data.role)
 
+        # 校区授权的席位上限
+        EntitlementService.check_seats(db, user_data.campus_id, role)
+
         # 创建用户
         hashed_password = get_password_hash(user_data.password)
         db_user = User(
@@ -122,15 +132,32 @@ class UserService:
         )
     
     @staticmethod
-    def authenticate_user(db: Session, login_data: UserLogin) -> Optional[User]:
-        """用户认证"""
-        user = db.query(User).filter(User.username == login_data.username).first()
-        if not user:
-            return None
-        if not verify_password(login_data.password, user.password_hash):
-            return None
-        if not user.is_active:
+    async def authenticate_user(db: Session, login_data: UserLogin) -> Optional[User]:
+        """用户认证（每次尝试在校验前先占用一次限流计数，登录成功后清除；哈希参数变更时顺带升级密码哈希）
+
+        在事件循环中执行：先占用限流计数和密码校验名额，数据库操作交给线程池，密码校验在专用线程池中等待，
+        不会在校验期间占用请求线程。校验前占用计数，同一用户名的并发请求也不会超出限流次数。
+        """
+        retry_after = _login_limiter.hit(login_data.username)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="登录尝试过于频繁，请稍后再试",
+                headers={"Retry-After": str(retry_after)}
+            )
+        with password_hash_slot():
+            user = await run_in_threadpool(
+                lambda: db.query(User).filter(User.username == login_data.username).first()
+            )
+            verified, new_hash = False, None
+            if user:
+                verified, new_hash = await verify_and_update_password(login_data.password, user.password_hash)
+        if not verified or not user.is_active:
             return None
+        _login_limiter.reset(login_data.username)
+        if new_hash:
+            user.password_hash = new_hash
+            await run_in_threadpool(db.commit)
         return user
     
     @staticmethod
@@ -348,6 +375,8 @@ class UserService:
             )
         
         user.password_hash = get_password_hash(new_password)
+        # 修改密码后其他设备上的登录全部失效
+        user.token_version = (user.token_version or 0) + 1
         db.commit()
         
         # 记录系统日志
@@ -436,6 +465,7 @@ class UserService:
         # 生成随机密码
         new_password = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
         user.password_hash = get_password_hash(new_password)
+        user.token_version = (user.token_version or 0) + 1
         db.commit()
         
         # 记录系统日志
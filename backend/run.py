@@ -8,26 +8,136 @@ uv run python backend/run.py
 或者使用项目脚本:
 uv run dev  # 开发模式
 uv run start  # 生产模式
+
+生产模式:
+- 安装了 gunicorn 时由 gunicorn 管理 uvicorn 工作进程（支持 max-requests 抖动），否则使用 uvicorn 自带的多进程
+- 工作进程数默认等于可用CPU核数，其余参数见 core/config.py 中的 SERVER_* 配置
+- 已安装 uvloop / httptools 时自动使用
+- 数据表在主进程中创建后再启动工作进程
+- 停机时先在 SERVER_GRACEFUL_TIMEOUT_SECONDS 内等待进行中的请求（含实时比分长连接），
+  再执行后台任务的收尾函数（如写入缓冲中的授权心跳）
 """
 
-import uvicorn
-import sys
+import importlib.util
+import inspect
+import logging
 import os
+import sys
+
+import uvicorn
 
 # 添加backend目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.main import app
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP = "backend.app.main:app"
+# 为停机收尾函数预留的时间（与 Scheduler.stop 的单个收尾函数超时一致）
+SHUTDOWN_HOOK_SECONDS = 30
 
 def main():
     """主函数，用于uv脚本调用"""
     uvicorn.run(
-        "backend.app.main:app",
+        APP,
         host="0.0.0.0",
         port=8000,
         reload=True,
         log_level="info"
     )
 
+def start():
+    """生产模式：多工作进程，不自动重载"""
+    logging.basicConfig(level=logging.INFO)
+    workers = _worker_count()
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    _create_schema()
+
+    if importlib.util.find_spec("gunicorn") is not None:
+        logger.info("使用 gunicorn 启动 %d 个工作进程 (loop=%s, http=%s)", workers, loop, http)
+        _run_gunicorn(workers, loop, http)
+    else:
+        logger.info("未安装 gunicorn，使用 uvicorn 启动 %d 个工作进程 (loop=%s, http=%s)", workers, loop, http)
+        _run_uvicorn(workers, loop, http)
+
+def _worker_count() -> int:
+    """配置的工作进程数，未配置时取当前进程可用的CPU核数（容器中受 CPU 亲和性限制）"""
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _create_schema() -> None:
+    """启动工作进程前在主进程中建表一次
+
+    各工作进程导入应用时仍会执行 create_all，但表已存在时只做检查，避免空库上多个进程并发建表失败。
+    建表后释放连接池，fork 出的工作进程不会继承主进程的数据库连接。
+    """
+    import app.models  # noqa: F401  注册全部模型
+    from app.db.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+def _run_uvicorn(workers: int, loop: str, http: str) -> None:
+    options = {
+        "host": settings.SERVER_HOST,
+        "port": settings.SERVER_PORT,
+        "workers": workers,
+        "loop": loop,
+        "http": http,
+        "backlog": settings.SERVER_BACKLOG,
+        "timeout_keep_alive": settings.SERVER_KEEPALIVE_SECONDS,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "log_level": "info",
+    }
+    if settings.SERVER_MAX_REQUESTS:
+        # 达到上限的工作进程退出后由 uvicorn 重新拉起；抖动参数只有较新版本的 uvicorn 支持
+        options["limit_max_requests"] = settings.SERVER_MAX_REQUESTS
+        if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+            options["limit_max_requests_jitter"] = settings.SERVER_MAX_REQUESTS_JITTER
+    uvicorn.run(APP, **options)
+
+def _run_gunicorn(workers: int, loop: str, http: str) -> None:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+    try:
+        from uvicorn_worker import UvicornWorker
+    except ImportError:
+        from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        # 只等待进行中的请求 SERVER_GRACEFUL_TIMEOUT_SECONDS，剩余时间留给收尾函数，
+        # 避免长连接占满 gunicorn 的 graceful_timeout 导致工作进程被强制结束
+        CONFIG_KWARGS = {
+            "loop": loop,
+            "http": http,
+            "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+                "workers": workers,
+                "worker_class": Worker,
+                "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+                "backlog": settings.SERVER_BACKLOG,
+                "max_requests": settings.SERVER_MAX_REQUESTS,
+                "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+                "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + SHUTDOWN_HOOK_SECONDS,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(APP)
+
+    Application().run()
+
 if __name__ == "__main__":
     main()
@@ -8,6 +8,16 @@ export const authApi = {
     return request.post('/auth/login', data)
   },
 
+  // 刷新令牌（旧刷新令牌随即失效）
+  refresh: (refreshToken: string) => {
+    return request.post('/auth/refresh', { refresh_token: refreshToken })
+  },
+
+  // 退出登录（吊销刷新令牌）
+  logout: (refreshToken: string) => {
+    return request.post('/auth/logout', { refresh_token: refreshToken })
+  },
+
   // 学员注册
   registerStudent: (data: RegisterForm) => {
     return request.post('/auth/register/student', data)
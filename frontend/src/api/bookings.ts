@@ -76,6 +76,118 @@ export interface ScheduleItem {
   student_name?: string
 }
 
+export interface BookingSlot {
+  start_time: string
+  end_time: string
+  table_number?: string
+}
+
+export interface BookingBulkCreate {
+  coach_id: number
+  campus_id: number
+  slots?: BookingSlot[]
+  recurrence?: {
+    first_start_time: string
+    duration_hours: number
+    interval_days?: number
+    occurrences: number
+  }
+  booking_message?: string
+}
+
+export interface BookingSlotResult {
+  index: number
+  start_time: string
+  end_time: string
+  success: boolean
+  booking_id?: number
+  table_number?: string
+  message?: string
+}
+
+export interface BookingBulkResponse {
+  total: number
+  succeeded: number
+  failed: number
+  total_cost: number
+  results: BookingSlotResult[]
+}
+
+export interface AvailabilityDay {
+  date: string
+  busy_bitmap: string  // 十六进制位图，第i位为1表示第i个时间槽已占用
+}
+
+export interface CoachAvailability {
+  coach_id: number
+  coach_name?: string
+  hourly_rate?: number
+  days: AvailabilityDay[]
+}
+
+export interface AvailabilityGrid {
+  window_start: string
+  window_days: number
+  slot_minutes: number
+  slots_per_day: number
+  coaches: CoachAvailability[]
+}
+
+export interface CoachUtilization {
+  coach_id: number
+  coach_name?: string
+  booked_hours: number
+  available_hours: number
+  utilization_rate: number
+}
+
+export interface MonthlyBookingStatistics {
+  year: number
+  month: number
+  total_bookings: number
+  by_status: Record<string, number>
+  booked_hours: number
+  revenue: number
+  cancellations: number
+  cancellation_rate: number
+  campus_id?: number
+  coach_id?: number
+  student_id?: number
+  coach_utilization?: CoachUtilization[]
+  table_occupancy?: {
+    table_count: number
+    booked_hours: number
+    available_hours: number
+    occupancy_rate: number
+  }
+}
+
+export interface TableOccupancyRow {
+  table_number: string
+  booked_hours: number
+  utilization_rate: number
+  occupancy: number[]  // 168个周内小时的平均占用率
+}
+
+export interface CampusTableOccupancy {
+  campus_id: number
+  campus_name?: string
+  table_count: number
+  booked_hours: number
+  utilization_rate: number
+  concurrent_tables: number[]
+  peak_concurrent_tables: number
+  tables: TableOccupancyRow[]
+}
+
+export interface TableOccupancyHeatmap {
+  date_from: string
+  date_to: string
+  weeks: number
+  hours_per_week: number
+  campuses: CampusTableOccupancy[]
+}
+
 // 预约相关API
 export const bookingApi = {
   // 创建预约
@@ -83,6 +195,11 @@ export const bookingApi = {
     return request.post<BookingResponse>('/bookings/', data)
   },
 
+  // 批量/周期创建预约
+  createBulkBookings: (data: BookingBulkCreate) => {
+    return request.post<BookingBulkResponse>('/bookings/bulk', data)
+  },
+
   // 获取预约列表
   getBookings: (params?: BookingQuery) => {
     return request.get<BookingResponse[]>('/bookings/', { params })
@@ -108,6 +225,26 @@ export const bookingApi = {
     return request.get<ScheduleItem[]>(`/bookings/schedule/coach/${params.coach_id}?date_from=${params.date_from}&date_to=${params.date_to}`)
   },
 
+  // 获取教练空闲时间网格
+  getCoachAvailability: (coachId: number) => {
+    return request.get<AvailabilityGrid>(`/bookings/availability/coach/${coachId}`)
+  },
+
+  // 获取校区所有教练空闲时间网格
+  getCampusAvailability: (campusId: number) => {
+    return request.get<AvailabilityGrid>(`/bookings/availability/campus/${campusId}`)
+  },
+
+  // 获取月度预约统计
+  getMonthlyStatistics: (params: { year: number; month: number; campus_id?: number }) => {
+    return request.get<MonthlyBookingStatistics>('/bookings/statistics/monthly', { params })
+  },
+
+  // 获取球台占用热力图（管理员）
+  getTableOccupancy: (params: { date_from: string; date_to: string; campus_id?: number }) => {
+    return request.get<TableOccupancyHeatmap>('/bookings/analytics/table-occupancy', { params })
+  },
+
   // 获取可用球台
   getAvailableCourts: (params: CourtQuery) => {
     return request.get<string[]>(`/bookings/tables/available?campus_id=${params.campus_id}&start_time=${params.start_time}&end_time=${params.end_time}`)
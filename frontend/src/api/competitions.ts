@@ -52,6 +52,8 @@ export interface CompetitionResponse extends CompetitionBase {
   created_at: string
   updated_at?: string
   registered_count: number
+  reserved_count: number
+  confirmed_count: number
 }
 
 // 比赛查询参数
@@ -76,6 +78,7 @@ export interface CompetitionRegistrationResponse extends CompetitionRegistration
   student_id: number
   payment_id?: number
   is_confirmed: boolean
+  is_waitlisted: boolean
   created_at: string
   student?: any
 }
@@ -85,6 +88,8 @@ export interface CompetitionMatch {
   id: number
   competition_id: number
   group_type: string
+  stage: 'group' | 'knockout'
+  pool_number?: number
   round_number: number
   match_number: number
   player1_id?: number
@@ -96,13 +101,66 @@ export interface CompetitionMatch {
   scheduled_time?: string
   actual_start_time?: string
   actual_end_time?: string
-  table_id?: number
+  table_number?: string
   referee_notes?: string
   created_at: string
   updated_at?: string
-  player1?: any
-  player2?: any
-  winner?: any
+}
+
+// 签表中的一场对阵
+export interface BracketMatch {
+  id: number
+  match_number: number
+  player1_id?: number
+  player1_name?: string
+  player2_id?: number
+  player2_name?: string
+  player1_score?: number
+  player2_score?: number
+  winner_id?: number
+  match_status: string
+  is_bye: boolean
+}
+
+// 单败淘汰签表
+export interface Bracket {
+  competition_id: number
+  group_type: string
+  bracket_size: number
+  rounds: { round_number: number; matches: BracketMatch[] }[]
+  champion_id?: number
+}
+
+// 实时比分中的一场对阵
+export interface ScoreboardMatch {
+  id: number
+  group_type: string
+  stage: 'group' | 'knockout'
+  pool_number?: number
+  round_number: number
+  match_number: number
+  player1_id?: number
+  player1_name?: string
+  player2_id?: number
+  player2_name?: string
+  player1_score?: number
+  player2_score?: number
+  winner_id?: number
+  match_status: string
+  table_number?: string
+  scheduled_time?: string
+}
+
+// 实时比分全量快照
+export interface Scoreboard {
+  competition_id: number
+  version: number
+  matches: ScoreboardMatch[]
+}
+
+// 实时比分增量（有变化的对阵和被删除的对阵ID）
+export interface ScoreboardDelta extends Scoreboard {
+  removed: number[]
 }
 
 // 比赛对阵更新
@@ -122,6 +180,29 @@ export interface DrawRequest {
   group_type: string
 }
 
+// 小组循环赛排程请求
+export interface RoundRobinRequest {
+  group_type: string
+  pool_size?: number
+  start_time?: string
+  table_count?: number
+  match_minutes?: number
+  rest_minutes?: number
+}
+
+// 等级分排行榜条目
+export interface PlayerRating {
+  rank: number
+  student_id: number
+  real_name?: string
+  campus_id?: number
+  rating: number
+  matches_played: number
+  wins: number
+  losses: number
+  last_group_type?: string
+}
+
 // 比赛统计
 export interface CompetitionStatistics {
   total_competitions: number
@@ -180,6 +261,11 @@ export const competitionApi = {
     )
   },
 
+  // 取消报名（候补选手自动递补）
+  cancelRegistration: (registrationId: number) => {
+    return request.post(`/competitions/registrations/${registrationId}/cancel`)
+  },
+
   // 生成对阵
   generateDraw: (competitionId: number, groupType: string) => {
     return request.post<CompetitionMatch[]>(
@@ -187,16 +273,46 @@ export const competitionApi = {
     )
   },
 
+  // 生成小组循环赛
+  generateRoundRobin: (competitionId: number, data: RoundRobinRequest) => {
+    return request.post<CompetitionMatch[]>(`/competitions/${competitionId}/round-robin`, data)
+  },
+
   // 获取对阵列表
-  getMatches: (competitionId: number, groupType?: string) => {
+  getMatches: (competitionId: number, groupType?: string, stage?: string) => {
     const params: any = {}
     if (groupType) params.group_type = groupType
+    if (stage) params.stage = stage
     return request.get<CompetitionMatch[]>(
       `/competitions/${competitionId}/matches`,
       { params }
     )
   },
 
+  // 获取淘汰赛签表
+  getBracket: (competitionId: number, groupType: string) => {
+    return request.get<Bracket>(
+      `/competitions/${competitionId}/bracket`,
+      { params: { group_type: groupType } }
+    )
+  },
+
+  // 获取实时比分快照
+  getScoreboard: (competitionId: number) => {
+    return request.get<Scoreboard>(`/competitions/${competitionId}/scoreboard`)
+  },
+
+  // 订阅实时比分（SSE），返回的 EventSource 在离开页面时需要 close()
+  subscribeLive: (
+    competitionId: number,
+    handlers: { onSnapshot: (snapshot: Scoreboard) => void; onDelta: (delta: ScoreboardDelta) => void }
+  ) => {
+    const source = new EventSource(`/api/v1/competitions/${competitionId}/live`)
+    source.addEventListener('snapshot', (event) => handlers.onSnapshot(JSON.parse((event as MessageEvent).data)))
+    source.addEventListener('matches', (event) => handlers.onDelta(JSON.parse((event as MessageEvent).data)))
+    return source
+  },
+
   // 更新比赛结果
   updateMatchResult: (matchId: number, data: CompetitionMatchUpdate) => {
     return request.put<CompetitionMatch>(`/competitions/matches/${matchId}`, data)
@@ -207,6 +323,16 @@ export const competitionApi = {
     return request.get<CompetitionRegistrationResponse[]>('/competitions/my-registrations')
   },
 
+  // 等级分排行榜
+  getRatingLeaderboard: (params?: { campus_id?: number; group_type?: string; min_matches?: number; page?: number; size?: number }) => {
+    return request.get<PlayerRating[]>('/competitions/ratings/leaderboard', { params })
+  },
+
+  // 重算等级分（超级管理员）
+  recomputeRatings: () => {
+    return request.post<{ matches: number; players: number; elapsed_seconds: number }>('/competitions/ratings/recompute')
+  },
+
   // 获取比赛统计
   getStatistics: () => {
     return request.get<CompetitionStatistics>('/competitions/statistics/summary')
@@ -42,6 +42,31 @@ export interface PaymentSummary {
   payment_count: number
 }
 
+export interface CampusPaymentSummary {
+  campus_id?: number
+  campus_name?: string
+  total_recharge: number
+  total_expense: number
+  total_refund: number
+  net_amount: number
+  payment_count: number
+}
+
+export interface PaymentTimeseriesPoint {
+  period: string
+  total_recharge: number
+  total_expense: number
+  total_refund: number
+  net_amount: number
+  payment_count: number
+}
+
+export interface PaymentTimeseries {
+  granularity: 'day' | 'month'
+  campus_id?: number
+  points: PaymentTimeseriesPoint[]
+}
+
 export interface RefundRequest {
   amount: number
   reason: string
@@ -54,6 +79,7 @@ export interface PaymentStatusUpdate {
 
 export interface QRCodeResponse {
   qr_code_url: string
+  qr_image_url: string  // 服务端渲染的二维码图片（/static/qrcodes/...）
 }
 
 export interface PaymentQuery {
@@ -75,13 +101,13 @@ export const paymentApi = {
   },
 
   // 生成微信支付二维码
-  generateWechatQR: (paymentId: number) => {
-    return request.post<QRCodeResponse>(`/payments/wechat-qr/${paymentId}`)
+  generateWechatQR: (paymentId: number, format: 'png' | 'svg' = 'png') => {
+    return request.post<QRCodeResponse>(`/payments/wechat-qr/${paymentId}`, undefined, { params: { format } })
   },
 
   // 生成支付宝支付二维码
-  generateAlipayQR: (paymentId: number) => {
-    return request.post<QRCodeResponse>(`/payments/alipay-qr/${paymentId}`)
+  generateAlipayQR: (paymentId: number, format: 'png' | 'svg' = 'png') => {
+    return request.post<QRCodeResponse>(`/payments/alipay-qr/${paymentId}`, undefined, { params: { format } })
   },
 
   // 线下充值录入（管理员）
@@ -124,6 +150,16 @@ export const paymentApi = {
     return request.get<PaymentSummary>('/payments/summary')
   },
 
+  // 获取校区支付汇总（管理员）
+  getCampusPaymentSummary: (params?: { campus_id?: number; date_from?: string; date_to?: string }) => {
+    return request.get<CampusPaymentSummary[]>('/payments/summary/campus', { params })
+  },
+
+  // 获取支付时间序列（管理员）
+  getPaymentTimeseries: (params: { granularity: 'day' | 'month'; date_from?: string; date_to?: string; campus_id?: number }) => {
+    return request.get<PaymentTimeseries>('/payments/summary/timeseries', { params })
+  },
+
   // 申请退款（管理员）
   requestRefund: (data: RefundRequest) => {
     return request.post<PaymentResponse>('/payments/refund', data)
@@ -22,7 +22,7 @@ export const useUserStore = defineStore('user', () => {
   const login = async (loginForm: LoginForm) => {
     try {
       const response = await authApi.login(loginForm)
-      const { access_token, user: userInfo } = response
+      const { access_token, refresh_token, user: userInfo } = response
       
       // 保存token和用户信息
       token.value = access_token
@@ -31,6 +31,7 @@ export const useUserStore = defineStore('user', () => {
       
       // 保存到localStorage
       localStorage.setItem('token', access_token)
+      localStorage.setItem('refresh_token', refresh_token)
       localStorage.setItem('user', JSON.stringify(userInfo))
       
       ElMessage.success('登录成功')
@@ -41,14 +42,39 @@ export const useUserStore = defineStore('user', () => {
     }
   }
 
+  // 刷新令牌，成功返回新的访问令牌
+  const refreshTokens = async (): Promise<string | null> => {
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (!refreshToken) {
+      return null
+    }
+    try {
+      const response = await authApi.refresh(refreshToken)
+      token.value = response.access_token
+      user.value = response.user
+      localStorage.setItem('token', response.access_token)
+      localStorage.setItem('refresh_token', response.refresh_token)
+      localStorage.setItem('user', JSON.stringify(response.user))
+      return response.access_token
+    } catch (error) {
+      return null
+    }
+  }
+
   // 登出
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (refreshToken) {
+      authApi.logout(refreshToken).catch(() => {})
+    }
+
     user.value = null
     token.value = ''
     isLoggedIn.value = false
     
     // 清除localStorage
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
     localStorage.removeItem('user')
     
     // 跳转到登录页
@@ -126,6 +152,7 @@ export const useUserStore = defineStore('user', () => {
     // 方法
     login,
     logout,
+    refreshTokens,
     checkLoginStatus,
     updateUserInfo,
     changePassword
@@ -11,6 +11,9 @@ const request: AxiosInstance = axios.create({
   }
 })
 
+// 正在进行的令牌刷新
+let refreshing: Promise<string | null> | null = null
+
 // 请求拦截器
 request.interceptors.request.use(
   (config: AxiosRequestConfig) => {
@@ -43,9 +46,29 @@ request.interceptors.response.use(
     ElMessage.error(data.message || '请求失败')
     return Promise.reject(new Error(data.message || '请求失败'))
   },
-  (error) => {
+  async (error) => {
     console.error('响应错误:', error)
 
+    // 访问令牌过期时用刷新令牌换取新令牌并重试一次（并发请求共用同一次刷新）
+    const original = error.config
+    if (
+      error.response?.status === 401 &&
+      original &&
+      !original._retried &&
+      !String(original.url).startsWith('/auth/')
+    ) {
+      original._retried = true
+      const userStore = useUserStore()
+      refreshing = refreshing || userStore.refreshTokens().finally(() => {
+        refreshing = null
+      })
+      const newToken = await refreshing
+      if (newToken) {
+        original.headers.Authorization = `Bearer ${newToken}`
+        return request(original)
+      }
+    }
+
     if (error.response) {
       const { status, data } = error.response
 
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+回填预约日汇总表脚本
+用法: python scripts/backfill_booking_stats.py [开始日期 YYYY-MM-DD] [结束日期 YYYY-MM-DD]
+不指定日期时重建全部历史预约的汇总数据
+"""
+
+import sys
+import os
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from backend.app.db.database import SessionLocal
+from backend.app.models import *
+from backend.app.models.booking import Booking
+from backend.app.services.booking_stats_service import BookingStatsService
+
+def backfill_booking_stats(date_from=None, date_to=None):
+    """回填预约日汇总"""
+    db = SessionLocal()
+    try:
+        if date_from is None or date_to is None:
+            first_start, last_start = db.query(func.min(Booking.start_time), func.max(Booking.start_time)).one()
+            if first_start is None:
+                print("没有预约数据，无需回填")
+                return
+            date_from = date_from or BookingStatsService.key_for(0, first_start)[1]
+            date_to = date_to or BookingStatsService.key_for(0, last_start)[1]
+
+        print(f"回填预约日汇总: {date_from} ~ {date_to}")
+        days = BookingStatsService.backfill(db, date_from, date_to)
+        print(f"✅ 回填完成，共处理 {days} 天")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    args = [date.fromisoformat(arg) for arg in sys.argv[1:3]]
+    backfill_booking_stats(*args)
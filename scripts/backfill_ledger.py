@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+补记账本分录脚本
+为尚未记账的历史成功支付记录生成复式记账分录（可重复执行，已记账的支付会被跳过）
+升级到 7a8b9c0d1e2f（add_ledger_tables）迁移后运行一次
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.db.database import SessionLocal
+from backend.app.models import *
+from backend.app.services.ledger_service import LedgerService
+
+def backfill_ledger():
+    """补记分录"""
+    db = SessionLocal()
+    try:
+        posted = LedgerService.backfill_payments(db)
+        print(f"✅ 补记完成，共生成 {posted} 条分录")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_ledger()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+比赛报名并发压测脚本
+模拟报名开放瞬间大量学员同时报名同一场比赛，校验名额不超卖、没有孤立的支付记录，
+并验证取消报名后候补选手按报名先后自动递补。
+
+脚本会写入测试用的校区、学员和比赛，请在测试库上运行：
+
+    DATABASE_URL=sqlite:///./loadtest.db python scripts/competition_registration_load_test.py
+    python scripts/competition_registration_load_test.py --registrations 1000 --seats 32 --workers 64
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from backend.app.db.database import Base, SessionLocal, engine
+from backend.app.models import *
+from backend.app.models.competition import CompetitionStatus
+from backend.app.models.payment import PaymentType
+from backend.app.schemas.competition import CompetitionRegistrationCreate
+from backend.app.services.competition_service import CompetitionService
+
+def prepare(registrations: int, seats: int):
+    """创建测试校区、管理员、学员和一场报名中的比赛"""
+    Base.metadata.create_all(bind=engine)
+    run_id = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        campus = Campus(name=f"压测校区-{run_id}", address="-", contact_person="-", contact_phone="-")
+        db.add(campus)
+        db.flush()
+
+        admin = User(username=f"lt_admin_{run_id}", password_hash="-", real_name="压测管理员", phone="-",
+                     role=UserRole.SUPER_ADMIN, campus_id=campus.id)
+        users = [
+            User(username=f"lt_{run_id}_{i}", password_hash="-", real_name=f"压测学员{i}", phone="-",
+                 role=UserRole.STUDENT, campus_id=campus.id)
+            for i in range(registrations)
+        ]
+        db.add(admin)
+        db.add_all(users)
+        db.flush()
+        db.add_all([Student(user_id=user.id) for user in users])
+
+        now = datetime.now(timezone.utc)
+        competition = Competition(
+            title=f"报名压测-{run_id}",
+            competition_date=now + timedelta(days=7),
+            registration_deadline=now + timedelta(days=1),
+            max_participants=seats,
+            status=CompetitionStatus.REGISTRATION.value,
+            campus_id=campus.id
+        )
+        db.add(competition)
+        db.commit()
+        return competition.id, admin.id, [user.id for user in users]
+    finally:
+        db.close()
+
+def register(competition_id: int, user_id: int, start: threading.Event):
+    """单个学员报名，返回 (结果, 耗时秒)"""
+    start.wait()
+    db = SessionLocal()
+    began = time.perf_counter()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        registration = CompetitionService.register_competition(
+            db, CompetitionRegistrationCreate(competition_id=competition_id, group_type="A"), user
+        )
+        outcome = "waitlisted" if registration.is_waitlisted else "seated"
+    except HTTPException as exc:
+        outcome = f"rejected: {exc.detail}"
+    except Exception as exc:  # 数据库锁超时等
+        outcome = f"error: {type(exc).__name__}"
+    finally:
+        db.close()
+    return outcome, time.perf_counter() - began
+
+def run(args):
+    competition_id, admin_id, user_ids = prepare(args.registrations, args.seats)
+    print(f"🏓 比赛 {competition_id}: {args.registrations} 人并发报名 {args.seats} 个名额（{args.workers} 并发）")
+
+    start = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(register, competition_id, user_id, start) for user_id in user_ids]
+        began = time.perf_counter()
+        start.set()
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - began
+
+    outcomes = {}
+    for outcome, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    latencies = sorted(latency for _, latency in results)
+    print(f"   耗时 {elapsed:.2f}s，吞吐 {len(results) / elapsed:.0f} 次/秒，"
+          f"延迟 p50 {statistics.median(latencies) * 1000:.0f}ms / p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"   {outcome}: {count}")
+
+    db = SessionLocal()
+    failures = []
+    try:
+        competition = db.query(Competition).filter(Competition.id == competition_id).first()
+        seated = db.query(CompetitionRegistration).filter(
+            CompetitionRegistration.competition_id == competition_id,
+            CompetitionRegistration.is_waitlisted == False
+        ).count()
+        waitlisted = db.query(CompetitionRegistration).filter(
+            CompetitionRegistration.competition_id == competition_id,
+            CompetitionRegistration.is_waitlisted == True
+        ).count()
+        fees = db.query(Payment).filter(
+            Payment.user_id.in_(user_ids),
+            Payment.type == str(PaymentType.COMPETITION)
+        ).count()
+
+        expected_seated = min(args.seats, args.registrations)
+        if competition.reserved_count != expected_seated or seated != expected_seated:
+            failures.append(f"名额计数 {competition.reserved_count}、占座报名 {seated}，应为 {expected_seated}")
+        if seated + waitlisted != outcomes.get("seated", 0) + outcomes.get("waitlisted", 0):
+            failures.append(f"报名记录 {seated + waitlisted} 与成功请求数不一致")
+        if fees != seated:
+            failures.append(f"报名费支付 {fees} 笔，占座报名 {seated} 个（存在孤立支付）")
+
+        # 取消一个占座报名，最早的候补应自动递补
+        if waitlisted:
+            first_waitlisted = db.query(CompetitionRegistration).filter(
+                CompetitionRegistration.competition_id == competition_id,
+                CompetitionRegistration.is_waitlisted == True
+            ).order_by(CompetitionRegistration.id).first()
+            cancelled = db.query(CompetitionRegistration).filter(
+                CompetitionRegistration.competition_id == competition_id,
+                CompetitionRegistration.is_waitlisted == False
+            ).first()
+            admin = db.query(User).filter(User.id == admin_id).first()
+            CompetitionService.cancel_registration(db, cancelled.id, admin)
+            db.expire_all()
+            if first_waitlisted.is_waitlisted or first_waitlisted.payment_id is None:
+                failures.append("取消报名后最早的候补未被递补")
+            if competition.reserved_count != expected_seated:
+                failures.append(f"递补后名额计数 {competition.reserved_count}，应为 {expected_seated}")
+    finally:
+        db.close()
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ 名额未超卖，无孤立支付，候补递补正常")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比赛报名并发压测")
+    parser.add_argument("--registrations", type=int, default=1000, help="并发报名人数")
+    parser.add_argument("--seats", type=int, default=32, help="比赛名额")
+    parser.add_argument("--workers", type=int, default=64, help="并发线程数")
+    run(parser.parse_args())
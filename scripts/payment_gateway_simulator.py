@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+本地支付网关模拟器
+
+replay 模式: 按网关签名规则并发推送支付结果通知（可按比例重复推送同一通知），统计吞吐量
+    python scripts/payment_gateway_simulator.py replay --from-db --duplicate-ratio 0.3
+    python scripts/payment_gateway_simulator.py replay --payment-ids 1,2,3 --amount 100
+serve 模式: 启动模拟网关，访问二维码中的支付页 /pay/{gateway}?payment_id=..&amount=.. 即推送成功通知
+    python scripts/payment_gateway_simulator.py serve --port 9000
+签名密钥默认读取 PAYMENT_CALLBACK_SECRET（与后端配置一致）。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from backend.app.core.config import settings
+from backend.app.services.payment_gateway_service import PaymentGatewayService, SUPPORTED_GATEWAYS
+
+DEFAULT_BACKEND = "http://127.0.0.1:8000/api/v1"
+
+
+def build_notification(payment_id, amount, gateway, trade_status="success"):
+    """构造一条通知 (网关, 请求体)"""
+    notify_id = uuid.uuid4().hex
+    body = json.dumps({
+        "notify_id": notify_id,
+        "payment_id": payment_id,
+        "amount": str(amount),
+        "trade_status": trade_status,
+        "transaction_id": f"{gateway.upper()}{notify_id[:20]}"
+    }).encode("utf-8")
+    return gateway, body
+
+
+async def send_notification(client, backend, secret, gateway, body):
+    """签名并推送一条通知，返回结果分类"""
+    timestamp = str(int(time.time()))
+    headers = {
+        "Content-Type": "application/json",
+        "X-Gateway-Timestamp": timestamp,
+        "X-Gateway-Signature": PaymentGatewayService.sign(body, timestamp, secret),
+    }
+    try:
+        response = await client.post(f"{backend}/payments/callbacks/{gateway}", content=body, headers=headers)
+    except httpx.HTTPError as exc:
+        return f"error:{type(exc).__name__}"
+    if response.status_code != 200:
+        return f"http_{response.status_code}"
+    return response.json().get("message", "OK").lower()
+
+
+def load_pending_payments(limit):
+    """从数据库读取待支付的微信/支付宝订单"""
+    from backend.app.db.database import SessionLocal
+    from backend.app.models import Payment, PaymentStatus
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Payment.id, Payment.amount, Payment.payment_method).filter(
+            Payment.status == str(PaymentStatus.PENDING),
+            Payment.payment_method.in_(SUPPORTED_GATEWAYS)
+        ).order_by(Payment.id).limit(limit).all()
+        return [(payment_id, amount, method) for payment_id, amount, method in rows]
+    finally:
+        db.close()
+
+
+async def replay(args):
+    if args.from_db:
+        payments = load_pending_payments(args.count)
+    else:
+        ids = [int(item) for item in args.payment_ids.split(",") if item] if args.payment_ids else range(1, args.count + 1)
+        payments = [(payment_id, args.amount, args.gateway) for payment_id in ids]
+    if not payments:
+        print("❌ 没有可推送的支付记录")
+        return
+
+    notifications = [build_notification(payment_id, amount, gateway) for payment_id, amount, gateway in payments]
+    # 网关的重试: 按比例原样重发已推送过的通知
+    duplicates = [random.choice(notifications) for _ in range(int(len(notifications) * args.duplicate_ratio))]
+    queue = notifications + duplicates
+    random.shuffle(queue)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        async def worker(item):
+            async with semaphore:
+                return await send_notification(client, args.backend, args.secret, *item)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(worker(item) for item in queue))
+        elapsed = time.perf_counter() - started
+
+    print(f"✅ 推送 {len(queue)} 条通知（其中重复 {len(duplicates)} 条），耗时 {elapsed:.2f}s，"
+          f"吞吐量 {len(queue) / elapsed:.0f} 条/秒")
+    for result, count in sorted(Counter(results).items()):
+        print(f"   {result}: {count}")
+
+
+def serve(args):
+    """模拟网关支付页：打开即支付成功并回调后端"""
+    import uvicorn
+    from fastapi import FastAPI
+
+    app = FastAPI(title="支付网关模拟器")
+
+    @app.get("/pay/{gateway}")
+    async def pay(gateway: str, payment_id: int, amount: str, trade_status: str = "success"):
+        item = build_notification(payment_id, amount, gateway, trade_status)
+        async with httpx.AsyncClient(timeout=args.timeout) as client:
+            result = await send_notification(client, args.backend, args.secret, *item)
+        return {"payment_id": payment_id, "gateway": gateway, "callback": result}
+
+    print(f"🚀 模拟网关已启动: http://{args.host}:{args.port}，回调地址 {args.backend}/payments/callbacks/{{gateway}}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地支付网关模拟器")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, help="后端 API 地址")
+    parser.add_argument("--secret", default=settings.PAYMENT_CALLBACK_SECRET, help="回调签名密钥")
+    parser.add_argument("--timeout", type=float, default=10.0, help="请求超时(秒)")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    replay_parser = subparsers.add_parser("replay", help="并发推送通知")
+    replay_parser.add_argument("--from-db", action="store_true", help="从数据库读取待支付订单")
+    replay_parser.add_argument("--payment-ids", help="逗号分隔的支付记录ID")
+    replay_parser.add_argument("--count", type=int, default=1000, help="通知数量（未指定支付ID时）")
+    replay_parser.add_argument("--amount", default="100.00", help="通知金额（未使用 --from-db 时）")
+    replay_parser.add_argument("--gateway", choices=SUPPORTED_GATEWAYS, default="wechat")
+    replay_parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="重复推送比例")
+    replay_parser.add_argument("--concurrency", type=int, default=100, help="并发连接数")
+
+    serve_parser = subparsers.add_parser("serve", help="启动模拟网关")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=9000)
+
+    args = parser.parse_args()
+    if not args.secret:
+        print("❌ 未配置回调签名密钥，请设置 PAYMENT_CALLBACK_SECRET 或使用 --secret")
+        sys.exit(1)
+
+    if args.mode == "replay":
+        asyncio.run(replay(args))
+    else:
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
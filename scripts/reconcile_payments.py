@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+支付对账脚本
+将网关导出的对账单（CSV，包含 transaction_id、amount 列）与系统支付记录按交易号流式比对，
+适用于百万行级别的月度对账单（两侧都不会整体读入内存）。
+
+    python scripts/reconcile_payments.py statement.csv --gateway wechat --from 2026-09-01 --to 2026-09-30
+    python scripts/reconcile_payments.py statement.csv --presorted --output report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from backend.app.db.database import SessionLocal
+from backend.app.models import *
+from backend.app.services.reconciliation_service import ReconciliationService, DIFF_CATEGORIES
+
+CATEGORY_LABELS = {
+    "missing_in_payments": "对账单有、系统无",
+    "missing_in_statement": "系统有、对账单无",
+    "duplicate_in_statement": "对账单重复",
+    "duplicate_in_payments": "系统记录重复",
+    "amount_mismatch": "金额不一致",
+    "status_mismatch": "系统记录未成功",
+}
+
+def reconcile(args):
+    """执行对账"""
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(args.statement, newline="", encoding="utf-8-sig") as f:
+            report = ReconciliationService.reconcile(
+                db, f, args.gateway, args.date_from, args.date_to, args.presorted
+            )
+    except HTTPException as exc:
+        print(f"❌ 对账失败: {exc.detail}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"✅ 对账完成，耗时 {time.perf_counter() - started:.1f}s")
+    print(f"   对账单 {report['statement_rows']} 行，系统记录 {report['payment_rows']} 行，"
+          f"匹配 {report['matched']} 笔，金额 {report['matched_amount']}元")
+    for category in DIFF_CATEGORIES:
+        print(f"   {CATEGORY_LABELS[category]}: {report['counts'][category]}")
+    if report["truncated"]:
+        print("   （差异明细已截断，仅保留每类前 RECONCILIATION_MAX_DETAILS 条）")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(jsonable_encoder(report), f, ensure_ascii=False, indent=2)
+        print(f"   明细已写入 {args.output}")
+
+    if any(report["counts"].values()):
+        sys.exit(2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="支付对账")
+    parser.add_argument("statement", help="网关对账单CSV文件")
+    parser.add_argument("--gateway", choices=["wechat", "alipay"], help="支付网关，为空时对账全部网关")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="支付开始日期 YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="支付结束日期 YYYY-MM-DD")
+    parser.add_argument("--presorted", action="store_true", help="对账单已按交易号排序")
+    parser.add_argument("--output", help="差异明细输出文件(JSON)")
+    reconcile(parser.parse_args())